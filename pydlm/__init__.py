@@ -1,6 +1,7 @@
 # This is the PyDLM package
 
-__all__ = ['dlm', 'trend', 'seasonality', 'dynamic', 'autoReg', 'longSeason']
+__all__ = ['dlm', 'trend', 'seasonality', 'dynamic', 'autoReg', 'longSeason',
+           'fourierSeason']
 
 from pydlm.dlm import dlm
 from pydlm.modeler.trends import trend
@@ -8,3 +9,4 @@ from pydlm.modeler.seasonality import seasonality
 from pydlm.modeler.dynamic import dynamic
 from pydlm.modeler.autoReg import autoReg
 from pydlm.modeler.longSeason import longSeason
+from pydlm.modeler.fourierSeason import fourierSeason
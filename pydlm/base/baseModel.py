@@ -22,6 +22,12 @@ class baseModel:
         evaluation: the evaluation F
         noiseVar: the variance of the observation noise
         sysVar: the covariance of the underlying states
+        sysVarFactor: a factor S of the covariance with sysVar = S S', kept by
+                      the square root filter (None otherwise)
+        precision: the inverse of sysVar, kept by the information filter
+                   (None otherwise)
+        information: the precision times the state, kept by the information
+                     filter (None otherwise)
         innovation: the incremnent of the latent covariance W
         state: the latent states
         df: the degree of freedom (= number of data points)
@@ -40,6 +46,9 @@ class baseModel:
         self.evaluation = evaluation
         self.noiseVar = noiseVar
         self.sysVar = sysVar
+        self.sysVarFactor = None
+        self.precision = None
+        self.information = None
         self.innovation = innovation
         self.state = state
         self.df = df
@@ -87,4 +96,6 @@ class __model__:
         self.state = state
         self.obs = obs
         self.sysVar = sysVar
+        self.sysVarFactor = None
+        self.precision = None
         self.obsVar = obsVar
@@ -0,0 +1,271 @@
+"""
+===============================================
+
+Gradient-based optimization of the discount factors
+
+===============================================
+
+This module maximizes the one-step predictive log-likelihood of a model
+over the discount factors of its components. The derivatives of the
+log-likelihood with respect to the discounts are computed in the same
+pass as the forward filter, by propagating the derivatives of the state,
+the covariance and the noise variance alongside @kalmanFilter.forwardFilter
+(forward-mode sensitivity recursions). The search is a quasi-Newton
+(BFGS) method projected on the bounds of the discounts, so each iteration
+costs one or a few filter passes.
+
+In the filter, the prior covariance of a date is R = P * K (elementwise)
+with P = G C G' and K_ij = s_i s_j, s_i = 1 / sqrt(discount_i), on the
+entries that receive innovation (see @kalmanFilter.innovationScale). The
+derivative of K with respect to the discount of a component c is
+
+    dK_ij = -0.5 * K_ij * ([i in c] + [j in c]) / discount_c,
+
+and the derivatives of the rest of the filter follow from the update
+equations by the product rule.
+
+"""
+import numpy as np
+from numpy import matrix
+from copy import deepcopy
+from pydlm.base.tools import logPredictiveDensity
+
+
+class discountOptimizer:
+    """ The gradient-based optimizer of the discount factors.
+
+    Attributes:
+        Filter: the @kalmanFilter whose discount is optimized
+        model: the @baseModel in the prior status
+        evaluations: the evaluation of each date, a numpy array of size n x d
+        data: the observations, None for missing
+        groups: the (start, end) indices of the latent states of each
+                discount to optimize
+        passes: the number of filter passes run so far
+
+    Methods:
+        logLikelihood: the log-likelihood and its gradient for a discount
+        optimize: maximize the log-likelihood within bounds
+    """
+
+    def __init__(self, Filter, model, evaluations, data, groups):
+        """ Initializing the discountOptimizer class
+
+        Args:
+            Filter: the @kalmanFilter to run, its discount is replaced with
+                    updateDiscount
+            model: the @baseModel in the prior status
+            evaluations: the evaluation of each date, a numpy array of size
+                         n x d
+            data: the observations, None for missing
+            groups: a list of (start, end) indices (inclusive), one for each
+                    discount to optimize. The latent states in a group share
+                    the discount.
+        """
+        self.Filter = Filter
+        self.model = model
+        self.evaluations = np.asarray(evaluations, dtype=float)
+        self.data = data
+        self.groups = groups
+        self.passes = 0
+
+        d = self.evaluations.shape[1]
+        self._indicator = np.zeros((len(groups), d))
+        for k, (start, end) in enumerate(groups):
+            self._indicator[k, start:(end + 1)] = 1.0
+
+        # the entries of the covariance that receive innovation
+        self._mask = np.ones((d, d))
+        if Filter.updateInnovation == 'component':
+            self._mask = np.zeros((d, d))
+            for name in Filter.index:
+                start, end = Filter.index[name]
+                self._mask[start:(end + 1), start:(end + 1)] = 1.0
+        elif Filter.updateInnovation != 'whole':
+            self._mask = np.zeros((d, d))
+
+    def logLikelihood(self, discount):
+        """ Run the forward filter with the discount and compute the
+        log-likelihood with its gradient.
+
+        Args:
+            discount: the discount of all latent states, a vector of length d.
+                      The states in the same group have to share the value.
+
+        Returns:
+            A tuple of (log-likelihood, gradient), the gradient with respect
+            to the discount of each group.
+        """
+        self.passes += 1
+        discount = np.asarray(discount, dtype=float)
+        Filter = deepcopy(self.Filter)
+        model = deepcopy(self.model)
+        Filter.updateDiscount(discount)
+        G = np.asarray(model.transition)
+
+        # K and its derivatives with respect to the discount of each group
+        s = 1.0 / np.sqrt(discount)
+        K = self._mask * np.outer(s, s) + 1.0 - self._mask
+        ds = -0.5 * self._indicator * (s / discount)
+        dK = self._mask * (ds[:, :, None] * s[None, None, :] +
+                           s[None, :, None] * ds[:, None, :])
+
+        p, d = self._indicator.shape
+        dState = np.zeros((p, d))
+        dCov = np.zeros((p, d, d))
+        dNoise = np.zeros(p)
+        value = 0.0
+        gradient = np.zeros(p)
+
+        for step in range(len(self.data)):
+            y = self.data[step]
+            F = self.evaluations[step]
+            model.evaluation = self.evaluations[step:(step + 1)].view(matrix)
+            discounted = model.prediction.step == 0
+            cov = np.asarray(model.sysVar)
+            noise = model.noiseVar.item()
+
+            Filter.forwardFilter(model, y)
+
+            # the derivatives of the prior of the date
+            dPriorState = np.matmul(dState, G.T)
+            dPriorCov = np.matmul(np.matmul(G, dCov), G.T)
+            if discounted:
+                dPriorCov = dPriorCov * K + \
+                    np.dot(np.dot(G, cov), G.T)[None, :, :] * dK
+
+            if y is None:
+                dState, dCov = dPriorState, dPriorCov
+                continue
+
+            # the derivatives of the prediction
+            R = np.asarray(model.prediction.sysVar)
+            Q = model.prediction.obsVar.item()
+            err = y - model.prediction.obs.item()
+            dQ = np.einsum('i,pij,j->p', F, dPriorCov, F) + dNoise
+            dErr = -np.dot(dPriorState, F)
+
+            # the log density with the degree of freedom before the update
+            df = model.df - 1
+            density = logPredictiveDensity(y, model.prediction.obs.item(),
+                                           Q, df)
+            if density == density:
+                value += density
+                u = err * err / (df * Q)
+                du = (2.0 * err * dErr * Q - err * err * dQ) / (df * Q * Q)
+                gradient += -0.5 * dQ / Q - (df + 1.0) / 2.0 * du / (1.0 + u)
+
+            # the derivatives of the update
+            A = np.dot(R, F) / Q
+            dA = (np.dot(dPriorCov, F) - A[None, :] * dQ[:, None]) / Q
+            newNoise = model.noiseVar.item()
+            dNewNoise = dNoise * (1.0 - 1.0 / model.df +
+                                  err * err / (model.df * Q)) + \
+                noise * (2.0 * err * dErr / (model.df * Q) -
+                         err * err * dQ / (model.df * Q * Q))
+            ratio = newNoise / noise
+            dRatio = (dNewNoise - ratio * dNoise) / noise
+            M = R - np.outer(A, A) * Q
+            dM = dPriorCov - (dA[:, :, None] * A[None, None, :] +
+                              A[None, :, None] * dA[:, None, :]) * Q - \
+                np.outer(A, A)[None, :, :] * dQ[:, None, None]
+
+            dState = dPriorState + dA * err + A[None, :] * dErr[:, None]
+            dCov = dRatio[:, None, None] * M + ratio * dM
+            dNoise = dNewNoise
+
+        return (value, gradient)
+
+    def optimize(self, start, lower, upper, maxIter=50, tol=1e-6):
+        """ Maximize the log-likelihood over the discounts of the groups
+        within the bounds, with a BFGS search projected on the bounds.
+
+        The variables on a bound whose gradient points outside are fixed in
+        an iteration, and the search direction of the others comes from the
+        BFGS approximation of the inverse Hessian. The step is found by
+        backtracking along the projected path.
+
+        Args:
+            start: the discount vector (of all latent states) to start from
+            lower: the lower bound of each group
+            upper: the upper bound of each group
+            maxIter: the maximum number of iterations
+            tol: the search stops when no discount moves by more than tol
+
+        Returns:
+            A tuple of (discount, log-likelihood, path), with path the list of
+            (discount of the groups, log-likelihood) of every iteration.
+        """
+        lower = np.asarray(lower, dtype=float)
+        upper = np.asarray(upper, dtype=float)
+        start = np.asarray(start, dtype=float)
+        x = np.clip(self._groupValues(start), lower, upper)
+        value, gradient = self.logLikelihood(self._discount(start, x))
+        path = [(x.copy(), value)]
+        if not np.isfinite(value):
+            raise NameError('The forward filter fails at the start point.')
+
+        # minimize the negative log-likelihood
+        f, g = -value, -gradient
+        H = None
+        for iteration in range(maxIter):
+            free = ~(((x <= lower) & (g > 0)) | ((x >= upper) & (g < 0)))
+            if not np.any(free):
+                break
+            if H is None:
+                # the first step moves the discounts by at most 0.1 of the
+                # width of the bounds
+                H = np.eye(len(x)) * np.min(0.1 * (upper - lower)) / \
+                    max(np.max(np.abs(g)), 1e-12)
+            direction = np.zeros(len(x))
+            direction[free] = -np.dot(H[np.ix_(free, free)], g[free])
+            if np.dot(direction, g) >= 0:
+                H = np.eye(len(x)) * np.min(0.1 * (upper - lower)) / \
+                    max(np.max(np.abs(g)), 1e-12)
+                direction[free] = -np.dot(H[np.ix_(free, free)], g[free])
+
+            # backtracking along the projected path
+            alpha = 1.0
+            while True:
+                newX = np.clip(x + alpha * direction, lower, upper)
+                if np.max(np.abs(newX - x)) < tol:
+                    return (self._discount(start, x), -f, path)
+                newValue, newGradient = \
+                    self.logLikelihood(self._discount(start, newX))
+                if np.isfinite(newValue) and \
+                   -newValue <= f + 1e-4 * np.dot(g, newX - x):
+                    break
+                alpha *= 0.5
+
+            # the BFGS update of the inverse Hessian
+            sx = newX - x
+            sg = -newGradient - g
+            if np.dot(sx, sg) > 1e-12:
+                rho = 1.0 / np.dot(sx, sg)
+                I = np.eye(len(x))
+                H = np.dot(np.dot(I - rho * np.outer(sx, sg), H),
+                           I - rho * np.outer(sg, sx)) + \
+                    rho * np.outer(sx, sx)
+
+            moved = np.max(np.abs(newX - x))
+            x, f, g = newX, -newValue, -newGradient
+            path.append((x.copy(), -f))
+            if moved < tol:
+                break
+
+        return (self._discount(start, x), -f, path)
+
+    def _groupValues(self, discount):
+        """ The discount of each group, taken from its first latent state
+
+        """
+        return np.array([discount[start] for start, end in self.groups])
+
+    def _discount(self, discount, values):
+        """ The discount vector with the groups set to values
+
+        """
+        discount = np.array(discount, dtype=float)
+        for (start, end), value in zip(self.groups, values):
+            discount[start:(end + 1)] = value
+        return discount
@@ -0,0 +1,254 @@
+"""
+===============================================
+
+Parallel tuner of the discount factors
+
+===============================================
+
+This module evaluates candidate discount vectors and noise priors of a
+model by running @kalmanFilter on each of them, on a process pool. The
+loss of a candidate is the negative one-step predictive log-likelihood
+('loglik') or the sum of the squared prediction errors ('mse') over the
+data.
+
+The data and the evaluation of every date (the design matrix) are
+written once to shared memory, which the worker processes attach to, so
+only the filter and the prior status are sent with each candidate.
+
+A candidate is stopped early when its running loss is hopeless compared
+to the best candidate finished so far. The running loss is checked on a
+number of checkpoint dates. For 'mse', the running loss only grows, so a
+candidate is stopped once it exceeds the final loss of the best one.
+For 'loglik', a candidate is stopped once its running loss exceeds the
+running loss of the best one on the same checkpoint by more than
+stopMargin (in the unit of the log-likelihood). The losses of the
+finished candidates are kept in shared memory as well, which the workers
+read when they check.
+
+"""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from copy import deepcopy
+from multiprocessing import shared_memory
+from os import cpu_count
+from numpy import matrix
+from pydlm.base.tools import logPredictiveDensity
+
+# the shared arrays attached by a worker process, see @_attachShared
+_shared = {}
+
+
+class discountTuner:
+    """ The parallel tuner of the discount factors and the noise prior.
+
+    Attributes:
+        metric: the loss to compare the candidates, 'loglik' or 'mse'
+        workers: the number of processes
+        stopMargin: the margin of the early stopping for 'loglik'
+        checkpoints: the number of dates where the running loss is checked
+
+    Methods:
+        evaluate: evaluate a list of candidates on the data
+    """
+
+    def __init__(self, metric='loglik', workers=None, stopMargin=10.0,
+                 checkpoints=20):
+        """ Initializing the discountTuner class
+
+        Args:
+            metric: 'loglik' or 'mse'. Default to 'loglik'.
+            workers: the number of processes. Default to the number of cpus.
+            stopMargin: a 'loglik' candidate is stopped when its running
+                        loss is worse than the best one by this margin.
+                        None to turn off the early stopping.
+            checkpoints: the number of dates where the running loss is
+                         checked.
+        """
+        if metric not in ['loglik', 'mse']:
+            raise NameError('The metric has to be loglik or mse.')
+        self.metric = metric
+        self.workers = workers if workers is not None else cpu_count() or 1
+        self.stopMargin = stopMargin
+        self.checkpoints = checkpoints
+
+    def evaluate(self, Filter, model, evaluations, data, candidates):
+        """ Evaluate the candidates by filtering the data from the model
+        status.
+
+        Args:
+            Filter: the @kalmanFilter to run, its discount is replaced by the
+                    one of each candidate with updateDiscount
+            model: the @baseModel in the prior status
+            evaluations: the evaluation of each date, a numpy array of size
+                         n x d
+            data: the observations, None or NaN for missing
+            candidates: a list of (discount, noise) with the discount vector
+                        of length d and the noise prior (None to keep the
+                        one of the model)
+
+        Returns:
+            A list of (loss, stoppedAt), one for each candidate. stoppedAt
+            is the date where the candidate was stopped early, or None, in
+            which case loss is the final loss.
+        """
+        n = len(data)
+        y = np.array([np.nan if value is None else value for value in data],
+                     dtype=float)
+        dates = np.unique(np.linspace(0, n - 1, self.checkpoints + 1)
+                          .astype(int)[1:])
+        tasks = [(Filter, model, discount, noise, dates)
+                 for discount, noise in candidates]
+
+        if self.workers == 1 or len(tasks) == 1:
+            return self._evaluateSerial(tasks, evaluations, y, dates)
+        return self._evaluateParallel(tasks, evaluations, y, dates)
+
+    def _evaluateSerial(self, tasks, evaluations, y, dates):
+        """ Evaluate the candidates one by one in this process
+
+        """
+        arrays = {'evaluations': np.asarray(evaluations, dtype=float),
+                  'data': y,
+                  'best': np.full(len(dates), np.inf)}
+        results = []
+        for task in tasks:
+            Filter, model, discount, noise, dates = task
+            result = _runCandidate(deepcopy(Filter), deepcopy(model),
+                                   discount, noise, dates, self.metric,
+                                   self.stopMargin, arrays)
+            self._updateBest(arrays['best'], result)
+            results.append(result[:2])
+        return results
+
+    def _evaluateParallel(self, tasks, evaluations, y, dates):
+        """ Evaluate the candidates on the process pool, with the data, the
+        evaluations and the losses of the best candidate in shared memory.
+
+        """
+        arrays = {'evaluations': np.asarray(evaluations, dtype=float),
+                  'data': y,
+                  'best': np.full(len(dates), np.inf)}
+        blocks = {}
+        shared = {}
+        try:
+            for name in arrays:
+                blocks[name] = shared_memory.SharedMemory(
+                    create=True, size=max(arrays[name].nbytes, 1))
+                shared[name] = np.ndarray(arrays[name].shape, dtype=float,
+                                          buffer=blocks[name].buf)
+                shared[name][...] = arrays[name]
+            layout = dict((name, (blocks[name].name, arrays[name].shape))
+                          for name in arrays)
+
+            results = [None] * len(tasks)
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     initializer=_attachShared,
+                                     initargs=(layout,)) as executor:
+                futures = dict((executor.submit(_runTask, task, self.metric,
+                                                self.stopMargin), i)
+                               for i, task in enumerate(tasks))
+                # only this process writes the losses of the best candidate
+                for future in as_completed(futures):
+                    result = future.result()
+                    self._updateBest(shared['best'], result)
+                    results[futures[future]] = result[:2]
+            return results
+        finally:
+            # the views have to be released before the blocks are closed
+            shared.clear()
+            for name in blocks:
+                blocks[name].close()
+                blocks[name].unlink()
+
+    def _updateBest(self, best, result):
+        """ Keep the running losses of the best finished candidate
+
+        """
+        loss, stoppedAt, curve = result
+        if stoppedAt is None and loss < best[-1]:
+            best[:] = curve
+
+
+def _attachShared(layout):
+    """ Attach the shared arrays in a worker process
+
+    """
+    for name in layout:
+        blockName, shape = layout[name]
+        block = shared_memory.SharedMemory(name=blockName)
+        _shared[name + 'Block'] = block
+        _shared[name] = np.ndarray(shape, dtype=float, buffer=block.buf)
+
+
+def _runTask(task, metric, stopMargin):
+    """ Evaluate one candidate in a worker process
+
+    """
+    Filter, model, discount, noise, dates = task
+    return _runCandidate(Filter, model, discount, noise, dates, metric,
+                         stopMargin, _shared)
+
+
+def _runCandidate(Filter, model, discount, noise, dates, metric, stopMargin,
+                  arrays):
+    """ Filter the data with one candidate and compute its loss.
+
+    Returns:
+        A tuple of (loss, stoppedAt, the running losses on the checkpoint
+        dates).
+    """
+    evaluations = arrays['evaluations']
+    data = arrays['data']
+    best = arrays['best']
+
+    Filter.updateDiscount(discount)
+    if noise is not None:
+        model.noiseVar = matrix([[noise]])
+        model.initializeObservation()
+
+    loss = 0.0
+    curve = np.zeros(len(dates))
+    k = 0
+    for step in range(len(data)):
+        model.evaluation = evaluations[step:(step + 1)].view(matrix)
+        y = data[step]
+        try:
+            Filter.forwardFilter(model, None if y != y else y)
+        except np.linalg.LinAlgError:
+            return (np.inf, step, curve)
+        if y == y:
+            if metric == 'mse':
+                loss += (y - model.prediction.obs.item()) ** 2
+            else:
+                # the dates without a valid density are left out, as in
+                # @dlm.logLikelihood
+                density = logPredictiveDensity(y, model.prediction.obs.item(),
+                                               model.prediction.obsVar.item(),
+                                               model.df - 1)
+                if density == density:
+                    loss -= density
+            if loss != loss:
+                loss = np.inf
+
+        if step == dates[k]:
+            curve[k] = loss
+            if _hopeless(loss, k, best, metric, stopMargin) and \
+               step < len(data) - 1:
+                return (loss, step, curve)
+            k += 1
+
+    return (loss, None, curve)
+
+
+def _hopeless(loss, k, best, metric, stopMargin):
+    """ Whether the running loss on the k-th checkpoint can no longer win
+
+    """
+    if loss == np.inf:
+        return True
+    if metric == 'mse':
+        return loss > best[-1]
+    if stopMargin is None:
+        return False
+    return loss > best[k] + stopMargin
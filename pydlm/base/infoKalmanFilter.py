@@ -0,0 +1,223 @@
+"""
+===============================================
+
+Information form of the Kalman filter
+
+===============================================
+
+This module implements the Kalman filter of @kalmanFilter in the information
+form for static models (all discounts equal 1), e.g., regressions with many
+dynamic features. The filter propagates the precision matrix (the inverse of
+the covariance of the latent states) and the information vector (the
+precision times the state) instead of the covariance. Each observation adds
+a rank-1 term to the precision, and the covariance is only computed when it
+is needed.
+
+"""
+import numpy as np
+from pydlm.base.kalmanFilter import kalmanFilter
+
+
+class infoKalmanFilter(kalmanFilter):
+    """ The information filter. It has the same interface and gives the same
+    results as @kalmanFilter for static models, while the covariances are
+    not computed during the filtering. The precision and the information
+    vector are stored in model.precision and model.information (and
+    model.prediction.precision for the one-step prior). model.sysVar and
+    model.prediction.sysVar are None after the filtering. When the
+    covariance is changed directly, the precision should be set to None, and
+    it is then recomputed from the covariance.
+
+    Methods:
+        predict: predict one step ahead of the current state
+        forwardFilter: one step filter on the model given a new observation
+    """
+
+    def __init__(self, discount=[1.0], updateInnovation='whole', index=None):
+        """ Initializing the infoKalmanFilter class
+
+        Args:
+            discount: the discounting factor, has to be all 1
+            updateInnovation: the indicator for whether updating innovation
+                              matrix
+            index: the indices of the components
+        """
+        kalmanFilter.__init__(self, discount=discount,
+                              updateInnovation=updateInnovation,
+                              index=index)
+        if np.min(discount) < 1.0:
+            raise NameError('The information filter only works with ' +
+                            'discount = 1.')
+        # the transition and its rows and columns that differ from the
+        # identity, see @_movingIndex
+        self._transition = None
+        self._moving = None
+
+    def predict(self, model, dealWithMissingEvaluation=False):
+        """ Predict the next states of the model by one step. The covariances
+        are computed from the precisions when they are not available, and
+        then the prediction is the same as @kalmanFilter.
+
+        Args:
+            model: the @baseModel class provided all necessary information
+            dealWithMissingValue: indicate whether we need to treat the missing
+                                  value.
+
+        Returns:
+            The predicted result is stored in 'model.prediction'
+
+        """
+        if model.sysVar is None:
+            model.sysVar = self._covariance(model.precision)
+        if model.prediction.step > 0 and model.prediction.sysVar is None:
+            model.prediction.sysVar = \
+                self._covariance(model.prediction.precision)
+        kalmanFilter.predict(self, model,
+                             dealWithMissingEvaluation=dealWithMissingEvaluation)
+
+    def forwardFilter(self, model, y, dealWithMissingEvaluation=False):
+        """ The forwardFilter used to run one step filtering given new data
+
+        In the unit of the noise variance V, the precision of the prior is
+        L = V * G^{-T} P^{-1} G^{-1} and the information vector is
+        h = L * G * m. The new observation adds F'F to L and F'y to h, and
+        the new state is the solution of L m = h. The gain and the
+        predicted variance come from the same linear system, so no
+        covariance is needed.
+
+        Args:
+            model: the @baseModel provided the basic information
+            y: the newly observed data
+
+        Returns:
+            The filtered result is stored in the 'model' replacing the old
+            states
+
+        """
+        if dealWithMissingEvaluation:
+            masked = self._maskMissingEvaluation(model)
+
+        precision, information = self._predictInformation(model)
+        noiseVar = model.noiseVar[0, 0]
+        evaluation = model.evaluation
+        support = self._evaluationSupport(model)
+        index = support
+        if index is None:
+            index = np.arange(evaluation.shape[1])
+        subEvaluation = evaluation[:, index]
+
+        # the prior in the unit of the noise variance
+        scaled = noiseVar * precision
+        scaledInformation = noiseVar * information
+
+        model.prediction.state = np.dot(model.transition, model.state)
+        model.prediction.obs = self._evaluate(evaluation, support,
+                                              model.prediction.state)
+        model.prediction.precision = precision
+        model.prediction.sysVar = None
+        model.prediction.sysVarFactor = None
+
+        if y is not None:
+            model.prediction.step = 0
+
+            # add the observation to the precision and the information
+            scaled = scaled.copy()
+            scaled[np.ix_(index, index)] += \
+                np.dot(subEvaluation.T, subEvaluation)
+            scaledInformation = scaledInformation.copy()
+            scaledInformation[index, :] += subEvaluation.T * y
+
+            # solve for the new state and C * F' (C = the new covariance
+            # in the unit of the noise variance)
+            solution = np.linalg.solve(
+                scaled, np.hstack([scaledInformation, evaluation.T]))
+            state = solution[:, :1]
+            gain = solution[:, 1:]
+            filteredVar = self._evaluate(evaluation, support, gain)[0, 0]
+
+            # the one-step prior variance is (1 + F R F') V with
+            # F R F' = F C F' / (1 - F C F')
+            model.prediction.obsVar = np.matrix(noiseVar /
+                                                (1.0 - filteredVar))
+
+            # update the noise variance as @kalmanFilter
+            err = y - model.prediction.obs
+            model.df += 1
+            model.noiseVar = model.noiseVar * \
+                (1.0 - 1.0 / model.df +
+                 err * err / model.df / model.prediction.obsVar)
+
+            model.state = state
+            model.precision = scaled / model.noiseVar[0, 0]
+            model.information = scaledInformation / model.noiseVar[0, 0]
+            model.obs = self._evaluate(evaluation, support, model.state)
+            model.obsVar = model.noiseVar * (1.0 + filteredVar)
+
+        # when y is missing, the status is the prior, see @kalmanFilter
+        else:
+            model.prediction.step += 1
+            gain = np.linalg.solve(scaled, evaluation.T)
+            model.prediction.obsVar = noiseVar * \
+                (1.0 + self._evaluate(evaluation, support, gain))
+            model.state = model.prediction.state
+            model.precision = precision
+            model.information = information
+            model.obs = model.prediction.obs
+            model.obsVar = model.prediction.obsVar
+
+        model.sysVar = None
+        model.sysVarFactor = None
+
+        if dealWithMissingEvaluation:
+            self._recoverEvaluation(model, masked)
+
+    def _predictInformation(self, model):
+        """ The precision and the information vector of the one-step prior.
+        Without innovation, the precision moves to the next date with
+        G^{-T} P^{-1} G^{-1}. Only the rows and columns where G differs from
+        the identity (e.g., trends) are changed, so regression components
+        cost nothing.
+
+        Returns:
+            A tuple of (precision, information vector)
+        """
+        precision = model.precision
+        information = model.information
+        if precision is None:
+            precision = np.linalg.inv(model.sysVar)
+            information = None
+        if information is None:
+            information = np.dot(precision, model.state)
+
+        moving = self._movingIndex(model.transition)
+        if len(moving) == 0:
+            return precision, information
+
+        inverse = np.linalg.inv(model.transition[np.ix_(moving, moving)])
+        precision = precision.copy()
+        precision[moving, :] = np.dot(inverse.T, precision[moving, :])
+        precision[:, moving] = np.dot(precision[:, moving], inverse)
+        information = information.copy()
+        information[moving, :] = np.dot(inverse.T, information[moving, :])
+        return precision, information
+
+    def _movingIndex(self, transition):
+        """ The indices of the rows and columns where the transition differs
+        from the identity. The transition is the identity outside of these
+        rows and columns.
+
+        """
+        if self._transition is None or \
+           not np.array_equal(self._transition, transition):
+            identity = np.eye(transition.shape[0])
+            differ = np.asarray(transition != identity)
+            self._moving = np.flatnonzero(np.any(differ, axis=0) |
+                                          np.any(differ, axis=1))
+            self._transition = transition.copy()
+        return self._moving
+
+    def _covariance(self, precision):
+        """ The covariance from the precision
+
+        """
+        return np.matrix(np.linalg.inv(precision))
@@ -26,6 +26,9 @@ class kalmanFilter:
         discount: the discounting factor determining how much information to carry on
         updateInnovation: indicate whether the innovation matrix should be updated.
                           default to True.
+        steadyTolerance: the tolerance for detecting the steady state of the
+                         filter, see @forwardFilter. None to always run the
+                         full covariance recursion.
 
     Methods:
         predict: predict one step ahead of the current state
@@ -35,16 +38,21 @@ class kalmanFilter:
         backwardSampler: similar to backwardSmoother, using sampling instead of
                          deterministic equations.
         updateDiscount: for updating the discount factors
+        innovationScale: the elementwise factor that turns the evolved
+                         covariance into the one-step prior covariance
     """
 
     def __init__(self, discount=[0.99], \
                  updateInnovation='whole',
-                 index=None):
+                 index=None,
+                 steadyTolerance=None):
         """ Initializing the kalmanFilter class
 
         Args:
             discount: the discounting factor, could be a vector
             updateInnovation: the indicator for whether updating innovation matrix
+            steadyTolerance: the tolerance on the change of the scaled
+                             covariance to switch to the steady state
 
         """
 
@@ -52,6 +60,11 @@ class kalmanFilter:
         self.discount = np.matrix(np.diag(1 / np.sqrt(np.array(discount))))
         self.updateInnovation = updateInnovation
         self.index = index
+        self.steadyTolerance = steadyTolerance
+        # the steady state of the filter and the last filtered status used
+        # to detect it, see @_checkSteadyState
+        self._steady = None
+        self._steadyCandidate = None
         #self.shrink = shrink
         #self.shrinkageMatrix = shrinkageMatrix
 
@@ -75,12 +88,16 @@ class kalmanFilter:
         """
         # check whether evaluation has missing data, if so, we need to take care of it
         if dealWithMissingEvaluation:
-            loc = self._modifyTransitionAccordingToMissingValue(model)
+            masked = self._maskMissingEvaluation(model)
+
+        # the non-zero columns of the evaluation
+        support = self._evaluationSupport(model)
 
         # if the step number == 0, we use result from the model state
         if model.prediction.step == 0:
             model.prediction.state = np.dot(model.transition, model.state)
-            model.prediction.obs = np.dot(model.evaluation, model.prediction.state)
+            model.prediction.obs = self._evaluate(model.evaluation, support,
+                                                  model.prediction.state)
             model.prediction.sysVar = np.dot(np.dot(model.transition, model.sysVar),
                                              model.transition.T)
 
@@ -93,30 +110,43 @@ class kalmanFilter:
             # add the innovation to the system variance
             model.prediction.sysVar += model.innovation
 
-            model.prediction.obsVar = np.dot(np.dot(model.evaluation, \
-                                                    model.prediction.sysVar), \
-                                             model.evaluation.T) + model.noiseVar
+            model.prediction.obsVar = self._evaluateVar(model.evaluation,
+                                                        support,
+                                                        model.prediction.sysVar,
+                                                        model.noiseVar)
             model.prediction.step = 1
 
         # otherwise, we use previous result to predict next time stamp
         else:
             model.prediction.state = np.dot(model.transition, model.prediction.state)
-            model.prediction.obs = np.dot(model.evaluation, model.prediction.state)
+            model.prediction.obs = self._evaluate(model.evaluation, support,
+                                                  model.prediction.state)
             model.prediction.sysVar = np.dot(np.dot(model.transition, \
                                                     model.prediction.sysVar),\
                                              model.transition.T)
-            model.prediction.obsVar = np.dot(np.dot(model.evaluation, \
-                                                    model.prediction.sysVar), \
-                                             model.evaluation.T) + model.noiseVar
+            model.prediction.obsVar = self._evaluateVar(model.evaluation,
+                                                        support,
+                                                        model.prediction.sysVar,
+                                                        model.noiseVar)
             model.prediction.step += 1
 
-        # recover the evaluation and the transition matrix
+        # recover the evaluation
         if dealWithMissingEvaluation:
-            self._recoverTransitionAndEvaluation(model, loc)
+            self._recoverEvaluation(model, masked)
 
     def forwardFilter(self, model, y, dealWithMissingEvaluation = False):
         """ The forwardFilter used to run one step filtering given new data
 
+        When steadyTolerance is set, the filter watches the covariance in the
+        unit of the noise variance (sysVar / noiseVar). With a fixed
+        evaluation and transition, this scaled covariance does not depend on
+        the data and converges for discount < 1. Once it changes less than
+        the tolerance between two dates, the gain is fixed and only the
+        state, noiseVar and df are updated (see @_steadyStateFilter). The
+        full recursion is used again whenever the model status is not the
+        one left by the last step (a missing value, a reset, a refit) or the
+        evaluation or the transition changes.
+
         Args:
             model: the @baseModel provided the basic information
             y: the newly observed data
@@ -125,9 +155,17 @@ class kalmanFilter:
             The filtered result is stored in the 'model' replacing the old states
 
         """
+        if self.steadyTolerance is not None:
+            if self._inSteadyState(model, y, dealWithMissingEvaluation):
+                self._steadyStateFilter(model, y)
+                return
+            self._steady = None
+            previousSysVar = model.sysVar
+            previousStep = model.prediction.step
+
         # check whether evaluation has missing data, if so, we need to take care of it
         if dealWithMissingEvaluation:
-            loc = self._modifyTransitionAccordingToMissingValue(model)
+            masked = self._maskMissingEvaluation(model)
 
         # since we have delt with the missing value, we don't need to double treat it.
         self.predict(model, dealWithMissingEvaluation=False)
@@ -142,9 +180,15 @@ class kalmanFilter:
             model.prediction.step = 0
 
             # the prediction error and the correction matrix
+            support = self._evaluationSupport(model)
             err = y - model.prediction.obs
-            correction = np.dot(model.prediction.sysVar, model.evaluation.T) \
-                         / model.prediction.obsVar
+            if support is None:
+                correction = np.dot(model.prediction.sysVar, model.evaluation.T) \
+                             / model.prediction.obsVar
+            else:
+                correction = np.dot(model.prediction.sysVar[:, support],
+                                    model.evaluation[:, support].T) \
+                             / model.prediction.obsVar
 
             # update new states
             model.df += 1
@@ -159,12 +203,17 @@ class kalmanFilter:
                            (model.prediction.sysVar - np.dot(correction, correction.T) * \
                             model.prediction.obsVar[0, 0])
 
-            model.obs = np.dot(model.evaluation, model.state)
-            model.obsVar = np.dot(np.dot(model.evaluation, model.sysVar), \
-                                  model.evaluation.T) + model.noiseVar
+            model.obs = self._evaluate(model.evaluation, support, model.state)
+            model.obsVar = self._evaluateVar(model.evaluation, support,
+                                             model.sysVar, model.noiseVar)
             # update the innovation using discount
             # model.innovation = model.sysVar * (1 / self.discount - 1)
 
+            if self.steadyTolerance is not None and \
+               not dealWithMissingEvaluation:
+                self._checkSteadyState(model, lastNoiseVar, correction,
+                                       previousSysVar, previousStep)
+
         # when y is missing, then we update the status by the predicted results
         else:
             # we do not update the model.predict.step because we need to take of the case
@@ -180,10 +229,105 @@ class kalmanFilter:
             model.sysVar = model.prediction.sysVar
             model.obs = model.prediction.obs
             model.obsVar = model.prediction.obsVar
+            self._steadyCandidate = None
 
-        # recover the evaluation and the transition matrix
+        # recover the evaluation
         if dealWithMissingEvaluation:
-            self._recoverTransitionAndEvaluation(model, loc)
+            self._recoverEvaluation(model, masked)
+
+    def _checkSteadyState(self, model, lastNoiseVar, correction,
+                          previousSysVar, previousStep):
+        """ Check whether the scaled covariance has converged after a full
+        filter step, and if so, keep the quantities of the steady state.
+
+        Args:
+            model: the model that has just been filtered
+            lastNoiseVar: the noise variance before the step
+            correction: the gain of the step
+            previousSysVar: the model.sysVar before the step
+            previousStep: the model.prediction.step before the step
+        """
+        scaled = model.sysVar / model.noiseVar[0, 0]
+        candidate = self._steadyCandidate
+        self._steadyCandidate = {'sysVar': model.sysVar,
+                                 'scaled': scaled,
+                                 'evaluation': model.evaluation.copy(),
+                                 'transition': model.transition.copy()}
+
+        # the last step has to be a full step on the same model
+        if candidate is None or previousStep != 0 or \
+           candidate['sysVar'] is not previousSysVar or \
+           not self._sameModel(model, candidate):
+            return
+
+        change = np.max(np.abs(scaled - candidate['scaled']))
+        if change > self.steadyTolerance * np.max(np.abs(scaled)):
+            return
+
+        self._steady = {
+            'sysVar': model.sysVar,
+            'evaluation': self._steadyCandidate['evaluation'],
+            'transition': self._steadyCandidate['transition'],
+            'gain': correction,
+            'filteredCov': scaled,
+            'predictedCov': model.prediction.sysVar / lastNoiseVar[0, 0],
+            'innovation': None if model.innovation is None
+                          else model.innovation / lastNoiseVar[0, 0],
+            'filteredObsVar': (model.obsVar / model.noiseVar)[0, 0],
+            'predictedObsVar': (model.prediction.obsVar /
+                                lastNoiseVar)[0, 0]}
+        self._steadyCandidate = None
+
+    def _inSteadyState(self, model, y, dealWithMissingEvaluation):
+        """ Whether the steady state can be used for filtering y
+
+        """
+        steady = self._steady
+        return steady is not None and y is not None and \
+            not dealWithMissingEvaluation and \
+            model.prediction.step == 0 and \
+            model.sysVar is steady['sysVar'] and \
+            self._sameModel(model, steady)
+
+    def _sameModel(self, model, status):
+        """ Whether the evaluation and the transition of the model are the
+        ones in the recorded status
+
+        """
+        return np.array_equal(model.evaluation, status['evaluation']) and \
+            np.array_equal(model.transition, status['transition'])
+
+    def _steadyStateFilter(self, model, y):
+        """ One step filtering in the steady state. The scaled covariances
+        and the gain are fixed, so only the state, the noise variance and the
+        degree of freedom are updated, and the covariances are the fixed ones
+        times the noise variance.
+
+        """
+        steady = self._steady
+        support = self._evaluationSupport(model)
+        lastNoiseVar = model.noiseVar
+
+        model.prediction.state = np.dot(model.transition, model.state)
+        model.prediction.obs = self._evaluate(model.evaluation, support,
+                                              model.prediction.state)
+        model.prediction.sysVar = lastNoiseVar[0, 0] * steady['predictedCov']
+        model.prediction.obsVar = lastNoiseVar * steady['predictedObsVar']
+        if steady['innovation'] is not None:
+            model.innovation = lastNoiseVar[0, 0] * steady['innovation']
+
+        err = y - model.prediction.obs
+        model.df += 1
+        model.noiseVar = model.noiseVar * \
+                         (1.0 - 1.0 / model.df + \
+                          err * err / model.df / model.prediction.obsVar)
+
+        model.state = model.prediction.state + steady['gain'] * err
+        model.sysVar = model.noiseVar[0, 0] * steady['filteredCov']
+        model.obs = self._evaluate(model.evaluation, support, model.state)
+        model.obsVar = model.noiseVar * steady['filteredObsVar']
+        model.prediction.step = 0
+        steady['sysVar'] = model.sysVar
 
     # The backward smoother for a given unsmoothed states at time t
     # what model should store:
@@ -195,7 +339,8 @@ class kalmanFilter:
     #      model.prediction.state: the predicted state for time t + 1
     #      rawState: the unsmoothed state at time t
     #      rawSysVar: the unsmoothed system variance at time t
-    def backwardSmoother(self, model, rawState, rawSysVar):
+    def backwardSmoother(self, model, rawState, rawSysVar,
+                         dealWithMissingEvaluation=False):
 
         """ The backwardSmoother for one step backward smoothing
 
@@ -212,22 +357,24 @@ class kalmanFilter:
                  rawSysVar: the unsmoothed system variance at time t
             rawState: the filtered state at the current time stamp
             rawSysVar: the filtered systematic covariance at the current time stamp
+            dealWithMissingEvaluation: indicate whether the evaluation has
+                                       missing entries to be skipped
 
         Returns:
             The smoothed results are stored in the 'model' replacing the filtered result.
         """
 
         # check whether evaluation has missing data, if so, we need to take care of it
-        # if dealWithMissingEvaluation:
-        #    loc = self._modifyTransitionAccordingToMissingValue(model)
+        if dealWithMissingEvaluation:
+            masked = self._maskMissingEvaluation(model)
 
         #### use generalized inverse to ensure the computation stability #######
 
-        predSysVarInv = self._gInverse(model.prediction.sysVar)
+        backward = self.smootherGain(model.transition, rawSysVar,
+                                     model.prediction.sysVar)
 
         ################################################
 
-        backward = np.dot(np.dot(rawSysVar, model.transition.T), predSysVarInv)
         model.state = rawState + np.dot(backward, (model.state - model.prediction.state))
         model.sysVar = rawSysVar + \
                        np.dot(np.dot(backward, \
@@ -236,9 +383,27 @@ class kalmanFilter:
         model.obsVar = np.dot(np.dot(model.evaluation, model.sysVar), \
                               model.evaluation.T) + model.noiseVar
 
-        # recover the evaluation and the transition matrix
-        #if dealWithMissingEvaluation:
-        #    self._recoverTransitionAndEvaluation(model, loc)
+        # recover the evaluation
+        if dealWithMissingEvaluation:
+            self._recoverEvaluation(model, masked)
+
+    def smootherGain(self, transition, rawSysVar, predSysVar):
+        """ The gain of the backward smoother from time t + 1 to time t. It
+        only depends on the filtered results, so it can be cached and reused
+        when the smoothed results are updated with new data.
+
+        Args:
+            transition: the transition matrix at time t + 1
+            rawSysVar: the filtered system variance at time t
+            predSysVar: the predicted system variance for time t + 1
+
+        Returns:
+            The gain matrix
+        """
+        #### use generalized inverse to ensure the computation stability #######
+
+        predSysVarInv = self._gInverse(predSysVar)
+        return np.dot(np.dot(rawSysVar, transition.T), predSysVarInv)
 
     def backwardSampler(self, model, rawState, rawSysVar):
         """ The backwardSampler for one step backward sampling
@@ -289,6 +454,29 @@ class kalmanFilter:
 
         self.__checkDiscount__(newDiscount)
         self.discount = np.matrix(np.diag(1 / np.sqrt(newDiscount)))
+        self._steady = None
+        self._steadyCandidate = None
+
+    def innovationScale(self):
+        """ The one-step prior covariance is R = P + W with P = G C G' and W
+        the innovation. As W is computed from P and the discount, R is an
+        elementwise product R = P * K for a fixed K. This gives K, so that
+        many covariances can be inflated at once without running predict.
+
+        Returns:
+            A numpy array K of the same size as the transition matrix
+        """
+        scale = np.diag(self.discount)
+        K = np.outer(scale, scale) - 1.0
+        if self.updateInnovation == 'component':
+            mask = np.zeros(K.shape)
+            for name in self.index:
+                indx = self.index[name]
+                mask[indx[0]:(indx[1] + 1), indx[0]:(indx[1] + 1)] = 1.0
+            K = K * mask
+        elif self.updateInnovation != 'whole':
+            K = np.zeros(K.shape)
+        return K + 1.0
 
     def __checkDiscount__(self, discount):
         """ Check whether the discount fact is within (0, 1)
@@ -325,6 +513,40 @@ class kalmanFilter:
             model.innovation[indx[0]: (indx[1] + 1), indx[0]: (indx[1] + 1)] = \
                     innovation[indx[0]: (indx[1] + 1), indx[0]: (indx[1] + 1)]
 
+    # find the non-zero columns of the evaluation
+    def _evaluationSupport(self, model):
+        """ Find the columns of the evaluation that are non-zero. Components
+        like longSeason and seasonality only select a few latent states, so
+        the products with the evaluation can be restricted to those states.
+
+        Returns:
+            The indices of the non-zero columns, or None if the evaluation
+            is dense and the full products should be used.
+        """
+        support = np.flatnonzero(model.evaluation.A1)
+        if len(support) == model.evaluation.shape[1]:
+            return None
+        return support
+
+    def _evaluate(self, evaluation, support, state):
+        """ Compute evaluation * state on the support of the evaluation
+
+        """
+        if support is None:
+            return np.dot(evaluation, state)
+        return np.dot(evaluation[:, support], state[support, :])
+
+    def _evaluateVar(self, evaluation, support, sysVar, noiseVar):
+        """ Compute evaluation * sysVar * evaluation' + noiseVar on the support
+        of the evaluation
+
+        """
+        if support is None:
+            return np.dot(np.dot(evaluation, sysVar), evaluation.T) + noiseVar
+        subEvaluation = evaluation[:, support]
+        return np.dot(np.dot(subEvaluation, sysVar[np.ix_(support, support)]),
+                      subEvaluation.T) + noiseVar
+
     # a generalized inverse of matrix A
     def _gInverse(self, A):
         """ A generalized inverse of matrix A
@@ -332,25 +554,33 @@ class kalmanFilter:
         """
         return np.linalg.pinv(A)
 
-    def _modifyTransitionAccordingToMissingValue(self, model):
-        """ When evaluation contains None value, we modify the corresponding entries
-        in the transition to deal with the missing value
+    def _maskMissingEvaluation(self, model):
+        """ When the evaluation contains missing entries (NaN or None, e.g.,
+        missing features of a dynamic component), set them to 0 so the
+        corresponding latent states do not take part in this date. The
+        latent states keep their status.
 
+        Returns:
+            A tuple of (mask of the missing entries, their original values)
+            to recover the evaluation, None if nothing is missing
         """
-        loc = []
-        for i in range(model.evaluation.shape[1]):
-            if model.evaluation[0, i] is None:
-                loc.append(i)
-                model.transition[i, i] = 0.0
-                model.evaluation[0, i] = 0.0
-        return loc
-
-    def _recoverTransitionAndEvaluation(self, model, loc):
-        """ We recover the transition and evaluation use the results from
-        _modifyTransitionAccordingToMissingValue
+        row = model.evaluation.A[0]
+        if row.dtype == object:
+            mask = np.array([tl.isMissing(value) for value in row])
+        else:
+            mask = np.isnan(row)
+        if not mask.any():
+            return None
+        masked = (mask, row[mask].copy())
+        row[mask] = 0.0
+        return masked
+
+    def _recoverEvaluation(self, model, masked):
+        """ Recover the evaluation from the result of
+        @_maskMissingEvaluation
 
         """
-        for i in loc:
-            model.evaluation[0, i] = None
-            model.transition[i, i] = 1.0
+        if masked is not None:
+            mask, values = masked
+            model.evaluation.A[0][mask] = values
 
@@ -0,0 +1,389 @@
+"""
+===============================================
+
+Parallel-in-time Kalman filter and smoother
+
+===============================================
+
+This module runs the forward filter and the backward smoother of
+@kalmanFilter over a whole time series at once, following the idea of
+Sarkka and Garcia-Fernandez (2021): each date is an affine map on the
+filter (or smoother) status, and the maps are combined with an associative
+operator, so the statuses of all dates come from a prefix scan instead of a
+sequential loop.
+
+The scan is blocked: the dates are split into chunks, each chunk is reduced
+to a single map (in parallel), the chunk maps are scanned sequentially, and
+then each chunk is scanned from its start status (in parallel). Within a
+chunk, the scan is vectorized over the dates with numpy, and the chunks run
+on a thread pool (numpy releases the GIL in the batched linear algebra).
+
+The forward filter works when the discount is the same multiple of the
+covariance for all latent states, i.e., all discounts equal 1, or a uniform
+discount in the 'whole' innovation mode. In the unit of the noise variance
+V, the precision L and the information vector h then move as
+
+    L_t = a_t * G^{-T} L_{t-1} G^{-1} + F_t'F_t,
+    h_t = a_t * G^{-T} h_{t-1} + F_t'y_t,
+
+with a_t = discount (1 after a missing date), and V is learned from the
+standardized prediction errors with a cumulative sum.
+
+"""
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
+
+
+class parallelKalmanFilter:
+    """ The parallel-in-time filter and smoother.
+
+    Attributes:
+        discount: the (uniform) discount factor
+        workers: the number of threads
+        chunkSize: the number of dates in a chunk
+
+    Methods:
+        forwardFilter: filter all dates, yielding the results chunk by chunk
+        backwardSmoother: smooth all dates, yielding the results chunk by
+                          chunk
+        reducedBasis: the basis the forward filter works in
+    """
+
+    def __init__(self, discount=1.0, workers=None, chunkSize=None):
+        """ Initializing the parallelKalmanFilter class
+
+        Args:
+            discount: the discount factor, the same for all latent states
+            workers: the number of threads. Default to the number of cpus.
+            chunkSize: the number of dates in a chunk. Default to split the
+                       dates into 4 chunks per thread.
+        """
+        self.discount = discount
+        self.workers = workers if workers is not None else cpu_count() or 1
+        self.chunkSize = chunkSize
+
+    def reducedBasis(self, transition, sysVar, tol=1e-9):
+        """ The filter works with the precision, which requires the
+        covariance to be invertible. Components like seasonality have a
+        covariance of lower rank, so the filter works in the range of the
+        covariance instead, which is kept by the transition.
+
+        Args:
+            transition: the transition matrix
+            sysVar: the covariance the filter starts from
+            tol: the relative tolerance for the rank and the invariance
+
+        Returns:
+            An orthonormal basis U (d x r) of the range of sysVar, or None if
+            the transition does not keep the range or is not invertible on it
+        """
+        values, vectors = np.linalg.eigh(np.asarray(sysVar))
+        U = vectors[:, values > tol * np.max(values)]
+        G = np.asarray(transition)
+        GU = np.dot(G, U)
+        reduced = np.dot(U.T, GU)
+        if np.max(np.abs(GU - np.dot(U, reduced))) > tol * np.max(np.abs(G)):
+            return None
+        if np.linalg.matrix_rank(reduced) < U.shape[1]:
+            return None
+        return U
+
+    def forwardFilter(self, transition, evaluations, data, state, sysVar,
+                      noiseVar, df, discountFirst, basis):
+        """ Run the forward filter on all dates.
+
+        Args:
+            transition: the transition matrix G (d x d)
+            evaluations: the evaluations of all dates (n x d)
+            data: the observations of all dates, None or NaN for missing
+            state: the filtered state before the first date
+            sysVar: the filtered covariance before the first date
+            noiseVar: the noise variance before the first date
+            df: the degree of freedom before the first date
+            discountFirst: whether the discount applies on the first date,
+                           i.e., the date before is observed (or the prior)
+            basis: the reduced basis, see @reducedBasis
+
+        Yields:
+            A dictionary of numpy arrays for each chunk in order, with the
+            same quantities as @kalmanFilter keeps in the model
+            ('predictedState', 'predictedCov', 'predictedObs',
+            'predictedObsVar', 'filteredState', 'filteredCov', 'filteredObs',
+            'filteredObsVar', 'noiseVar', 'df')
+        """
+        U = basis
+        n = len(data)
+        y = np.array([np.nan if value is None else value for value in data],
+                     dtype=float)
+        observed = ~np.isnan(y)
+        y[~observed] = 0.0
+        G = np.dot(U.T, np.dot(np.asarray(transition), U))
+        inverse = np.linalg.inv(G)
+        F = np.dot(np.asarray(evaluations, dtype=float), U)
+        r = U.shape[1]
+
+        # the discount applies after an observed date
+        discount = np.ones(n)
+        discount[1:][observed[:-1]] = self.discount
+        if discountFirst:
+            discount[0] = self.discount
+
+        # the status before the first date, in the unit of the noise
+        # variance
+        noise = np.asarray(noiseVar).item()
+        precision = noise * np.linalg.inv(
+            np.dot(U.T, np.dot(np.asarray(sysVar), U)))
+        information = np.dot(precision, np.dot(U.T, np.asarray(state)))[:, 0]
+
+        # the affine map of each date
+        def element(chunk):
+            m = chunk.stop - chunk.start
+            Fc = F[chunk] * observed[chunk][:, None]
+            return (discount[chunk],
+                    np.broadcast_to(inverse, (m, r, r)),
+                    Fc[:, :, None] * Fc[:, None, :],
+                    Fc * y[chunk][:, None])
+
+        chunks = self._chunks(n)
+        totals = self._map(lambda chunk: self._reduce(element(chunk),
+                                                      self._filterCombine),
+                           chunks)
+        starts = []
+        status = (precision, information)
+        for total in totals:
+            starts.append(status)
+            status = self._filterApply(total, status)
+            status = (status[0][0], status[1][0])
+
+        def run(args):
+            chunk, start = args
+            scanned = self._scan(element(chunk), self._filterCombine)
+            return self._filterOutput(chunk, scanned, start, G, F, y,
+                                      observed, discount)
+
+        cumulative = np.asarray(df) * noise
+        count = np.asarray(df)
+        for chunk, output in zip(chunks, self._map(run, zip(chunks, starts))):
+            # the noise variance from the cumulative sum of the
+            # standardized squared errors
+            increment = output.pop('increment')
+            total = cumulative + np.cumsum(increment)
+            dfs = count + np.cumsum(observed[chunk])
+            noiseVars = total / dfs
+            lastNoiseVars = np.concatenate([[cumulative / count],
+                                            noiseVars[:-1]])
+            cumulative, count = total[-1], dfs[-1]
+
+            yield self._filterResult(output, U, noiseVars, lastNoiseVars,
+                                     dfs)
+
+    def backwardSmoother(self, transition, filteredStates, filteredCovs,
+                         predictedStates, predictedCovs, state, sysVar):
+        """ Run the backward smoother on all dates, from the last to the
+        first.
+
+        Each date is the affine map (m, P) -> (J m + u, J P J' + W) with the
+        smoother gain J (see @kalmanFilter.smootherGain), u = m_t - J a_{t+1}
+        and W = C_t - J R_{t+1} J', where m_t, C_t are the filtered state and
+        covariance and a_{t+1}, R_{t+1} are the predicted ones of the next
+        date.
+
+        Args:
+            transition: the transition matrix
+            filteredStates: the filtered states of the dates (n x d)
+            filteredCovs: the filtered covariances of the dates (n x d x d)
+            predictedStates: the predicted states of the next dates
+            predictedCovs: the predicted covariances of the next dates
+            state: the smoothed state of the date after the last date
+            sysVar: the smoothed covariance of the date after the last date
+
+        Yields:
+            A tuple of (smoothed states, smoothed covariances) for each chunk
+            from the last date backward
+        """
+        n = filteredStates.shape[0]
+        G = np.asarray(transition)
+
+        # the map of each date, in the reverse order of dates
+        def element(chunk):
+            index = np.arange(n - 1 - chunk.start, n - 1 - chunk.stop, -1)
+            C = filteredCovs[index]
+            R = predictedCovs[index]
+            J = np.matmul(np.matmul(C, G.T), np.linalg.pinv(R))
+            u = filteredStates[index] - \
+                np.matmul(J, predictedStates[index][:, :, None])[:, :, 0]
+            W = C - np.matmul(np.matmul(J, R), J.transpose(0, 2, 1))
+            return (J, u, W)
+
+        chunks = self._chunks(n)
+        totals = self._map(lambda chunk: self._reduce(element(chunk),
+                                                      self._smootherCombine),
+                           chunks)
+        starts = []
+        status = (np.asarray(state)[:, 0], np.asarray(sysVar))
+        for total in totals:
+            starts.append(status)
+            status = self._smootherApply(total, status)
+            status = (status[0][0], status[1][0])
+
+        def run(args):
+            chunk, start = args
+            scanned = self._scan(element(chunk), self._smootherCombine)
+            return self._smootherApply(scanned, start)
+
+        for output in self._map(run, zip(chunks, starts)):
+            yield output
+
+    def _filterOutput(self, chunk, scanned, start, G, F, y, observed,
+                      discount):
+        """ The results of the dates of a chunk in the unit of the noise
+        variance, from the scanned maps and the status before the chunk.
+
+        """
+        precision, information = self._filterApply(scanned, start)
+        lastPrecision = np.concatenate([start[0][None], precision[:-1]])
+        lastInformation = np.concatenate([start[1][None], information[:-1]])
+
+        lastCov = np.linalg.inv(lastPrecision)
+        lastState = np.matmul(lastCov, lastInformation[:, :, None])[:, :, 0]
+        predictedState = np.dot(lastState, G.T)
+        predictedCov = np.matmul(np.matmul(G, lastCov), G.T) / \
+            discount[chunk][:, None, None]
+        cov = np.linalg.inv(precision)
+        state = np.matmul(cov, information[:, :, None])[:, :, 0]
+
+        Fc = F[chunk]
+        predictedObs = np.sum(Fc * predictedState, axis=1)
+        predictedObsVar = np.einsum('ti,tij,tj->t', Fc, predictedCov, Fc) + 1
+        err = (y[chunk] - predictedObs) * observed[chunk]
+        return {'predictedState': predictedState,
+                'predictedCov': predictedCov,
+                'predictedObs': predictedObs,
+                'predictedObsVar': predictedObsVar,
+                'filteredState': state,
+                'filteredCov': cov,
+                'filteredObs': np.sum(Fc * state, axis=1),
+                'filteredObsVar': np.einsum('ti,tij,tj->t', Fc, cov, Fc) + 1,
+                'increment': err * err / predictedObsVar}
+
+    def _filterResult(self, output, U, noiseVars, lastNoiseVars, dfs):
+        """ Move the results of a chunk back to the latent states and scale
+        them with the noise variance, as @kalmanFilter does.
+
+        """
+        def scale(values, noise):
+            return values * noise.reshape((-1,) + (1,) * (values.ndim - 1))
+
+        def expand(cov):
+            return np.matmul(np.matmul(U, cov), U.T)
+
+        return {'predictedState': np.dot(output['predictedState'], U.T),
+                'predictedCov': scale(expand(output['predictedCov']),
+                                      lastNoiseVars),
+                'predictedObs': output['predictedObs'],
+                'predictedObsVar': scale(output['predictedObsVar'],
+                                         lastNoiseVars),
+                'filteredState': np.dot(output['filteredState'], U.T),
+                'filteredCov': scale(expand(output['filteredCov']),
+                                     noiseVars),
+                'filteredObs': output['filteredObs'],
+                'filteredObsVar': scale(output['filteredObsVar'], noiseVars),
+                'noiseVar': noiseVars,
+                'df': dfs}
+
+    def _filterCombine(self, first, second):
+        """ Combine the maps of the forward filter, first applied before
+        second. A map (c, K, B, b) sends (L, h) to
+        (c K'L K + B, c K'h + b).
+
+        """
+        c1, K1, B1, b1 = first
+        c2, K2, B2, b2 = second
+        K2T = K2.transpose(0, 2, 1)
+        return (c1 * c2,
+                np.matmul(K1, K2),
+                c2[:, None, None] * np.matmul(np.matmul(K2T, B1), K2) + B2,
+                c2[:, None] * np.matmul(K2T, b1[:, :, None])[:, :, 0] + b2)
+
+    def _filterApply(self, maps, status):
+        """ Apply the maps of the forward filter to the same status
+
+        """
+        c, K, B, b = maps
+        L, h = status
+        KT = K.transpose(0, 2, 1)
+        return (c[:, None, None] * np.matmul(np.matmul(KT, L), K) + B,
+                c[:, None] * np.matmul(KT, h[:, None])[:, :, 0] + b)
+
+    def _smootherCombine(self, first, second):
+        """ Combine the maps of the backward smoother, first applied before
+        second. A map (J, u, W) sends (m, P) to (J m + u, J P J' + W).
+
+        """
+        J1, u1, W1 = first
+        J2, u2, W2 = second
+        return (np.matmul(J2, J1),
+                np.matmul(J2, u1[:, :, None])[:, :, 0] + u2,
+                np.matmul(np.matmul(J2, W1), J2.transpose(0, 2, 1)) + W2)
+
+    def _smootherApply(self, maps, status):
+        """ Apply the maps of the backward smoother to the same status
+
+        """
+        J, u, W = maps
+        m, P = status
+        return (np.matmul(J, m[:, None])[:, :, 0] + u,
+                np.matmul(np.matmul(J, P), J.transpose(0, 2, 1)) + W)
+
+    def _scan(self, elements, combine):
+        """ The inclusive scan of the maps of a chunk, vectorized over the
+        dates (Hillis and Steele).
+
+        """
+        elements = tuple(np.array(item) for item in elements)
+        m = elements[0].shape[0]
+        shift = 1
+        while shift < m:
+            combined = combine(tuple(item[:-shift] for item in elements),
+                               tuple(item[shift:] for item in elements))
+            for item, value in zip(elements, combined):
+                item[shift:] = value
+            shift *= 2
+        return elements
+
+    def _reduce(self, elements, combine):
+        """ Combine all maps of a chunk into one, pairwise and vectorized
+        over the dates.
+
+        """
+        while elements[0].shape[0] > 1:
+            m = elements[0].shape[0]
+            half = m // 2
+            combined = combine(tuple(item[:2 * half:2] for item in elements),
+                               tuple(item[1:2 * half:2] for item in elements))
+            if m % 2 == 1:
+                combined = tuple(np.concatenate([value, item[-1:]])
+                                 for value, item in zip(combined, elements))
+            elements = combined
+        return elements
+
+    def _chunks(self, n):
+        """ Split the dates into chunks
+
+        """
+        size = self.chunkSize
+        if size is None:
+            size = max(16, -(-n // (4 * self.workers)))
+        return [slice(start, min(start + size, n))
+                for start in range(0, n, size)]
+
+    def _map(self, function, items):
+        """ Run function on the items on the thread pool, keeping the order
+
+        """
+        items = list(items)
+        if self.workers == 1 or len(items) == 1:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(function, items))
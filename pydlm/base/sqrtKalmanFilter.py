@@ -0,0 +1,212 @@
+"""
+===============================================
+
+Square root version of the Kalman filter
+
+===============================================
+
+This module implements the Kalman filter of @kalmanFilter in the square root
+form. Instead of the covariance P of the latent states, the filter propagates
+a factor S with P = S S' through the prediction, the discount innovation and
+the filtering. The covariances obtained from the factors are always positive
+semi-definite, and the factors are directly available for sampling.
+
+"""
+import numpy as np
+import pydlm.base.tools as tl
+from pydlm.base.kalmanFilter import kalmanFilter
+
+
+class sqrtKalmanFilter(kalmanFilter):
+    """ The square root Kalman filter. It has the same interface and gives the
+    same results as @kalmanFilter, while only the factors of the covariances
+    are propagated. The factors are stored in model.sysVarFactor and
+    model.prediction.sysVarFactor, and model.sysVar and
+    model.prediction.sysVar are None after the filtering (predict still
+    computes model.prediction.sysVar for the forecasts). When the covariance
+    is changed directly, the factor should be set to None, and it is then
+    recomputed from the covariance.
+
+    Methods:
+        predict: predict one step ahead of the current state
+        forwardFilter: one step filter on the model given a new observation
+    """
+
+    def predict(self, model, dealWithMissingEvaluation=False):
+        """ Predict the next states of the model by one step
+
+        Args:
+            model: the @baseModel class provided all necessary information
+            dealWithMissingValue: indicate whether we need to treat the missing
+                                  value.
+
+        Returns:
+            The predicted result is stored in 'model.prediction'
+
+        """
+        if dealWithMissingEvaluation:
+            masked = self._maskMissingEvaluation(model)
+
+        self._predictFactor(model)
+        factor = model.prediction.sysVarFactor
+        model.prediction.sysVar = np.dot(factor, factor.T)
+
+        if dealWithMissingEvaluation:
+            self._recoverEvaluation(model, masked)
+
+    def _predictFactor(self, model):
+        """ The one step prediction of @predict, without computing the
+        covariance from its factor.
+
+        """
+        # if the step number == 0, we use result from the model state
+        if model.prediction.step == 0:
+            model.prediction.state = np.dot(model.transition, model.state)
+            evolved = np.dot(model.transition,
+                             self._factor(model.sysVar, model.sysVarFactor))
+            model.prediction.sysVarFactor = self._addInnovation(evolved)
+            model.prediction.step = 1
+
+        # otherwise, we use previous result to predict next time stamp
+        else:
+            model.prediction.state = np.dot(model.transition,
+                                            model.prediction.state)
+            model.prediction.sysVarFactor = np.dot(
+                model.transition,
+                self._factor(model.prediction.sysVar,
+                             model.prediction.sysVarFactor))
+            model.prediction.step += 1
+
+        factor = model.prediction.sysVarFactor
+        support = self._evaluationSupport(model)
+        model.prediction.obs = self._evaluate(model.evaluation, support,
+                                              model.prediction.state)
+        model.prediction.obsVar = self._factorVar(model.evaluation, factor,
+                                                  model.noiseVar)
+        model.prediction.sysVar = None
+
+    def forwardFilter(self, model, y, dealWithMissingEvaluation=False):
+        """ The forwardFilter used to run one step filtering given new data
+
+        Args:
+            model: the @baseModel provided the basic information
+            y: the newly observed data
+
+        Returns:
+            The filtered result is stored in the 'model' replacing the old
+            states
+
+        """
+        if dealWithMissingEvaluation:
+            masked = self._maskMissingEvaluation(model)
+
+        self._predictFactor(model)
+        factor = model.prediction.sysVarFactor
+
+        if y is not None:
+            model.prediction.step = 0
+
+            # the prediction error and the correction vector
+            support = self._evaluationSupport(model)
+            err = y - model.prediction.obs
+            correction = np.dot(factor, np.dot(factor.T, model.evaluation.T)) \
+                / model.prediction.obsVar
+
+            # update new states
+            model.df += 1
+            lastNoiseVar = model.noiseVar
+            model.noiseVar = model.noiseVar * \
+                (1.0 - 1.0 / model.df +
+                 err * err / model.df / model.prediction.obsVar)
+
+            model.state = model.prediction.state + correction * err
+            model.sysVarFactor = \
+                np.sqrt(model.noiseVar[0, 0] / lastNoiseVar[0, 0]) * \
+                self._potterUpdate(factor, model.evaluation,
+                                   lastNoiseVar[0, 0])
+            model.sysVar = None
+
+            model.obs = self._evaluate(model.evaluation, support, model.state)
+            model.obsVar = self._factorVar(model.evaluation,
+                                           model.sysVarFactor,
+                                           model.noiseVar)
+
+        # when y is missing, then we update the status by the predicted
+        # results, see @kalmanFilter
+        else:
+            model.state = model.prediction.state
+            model.sysVarFactor = factor
+            model.sysVar = None
+            model.obs = model.prediction.obs
+            model.obsVar = model.prediction.obsVar
+
+        if dealWithMissingEvaluation:
+            self._recoverEvaluation(model, masked)
+
+    def _addInnovation(self, evolved):
+        """ The factor of the prior covariance from the factor A of the
+        evolved covariance P = A A'.
+
+        In the 'whole' mode, the prior covariance D P D is factored by D A,
+        with D = diag(1 / sqrt(discount)). In the 'component' mode, the
+        innovation is only added on the diagonal blocks. The innovation of
+        a component with discount d is (1 / d - 1) P_ii, which is factored
+        from the rows of A for the component. The factor of A A' plus the
+        innovation then comes from a QR decomposition.
+
+        """
+        if self.updateInnovation == 'whole':
+            return np.dot(self.discount, evolved)
+
+        d = evolved.shape[0]
+        innovation = np.matrix(np.zeros((d, d)))
+        scale = np.diag(self.discount)
+        for name in self.index:
+            indx = self.index[name]
+            block = slice(indx[0], indx[1] + 1)
+            if np.ptp(scale[block]) == 0:
+                rows = np.sqrt(scale[indx[0]] ** 2 - 1.0) * evolved[block, :]
+                innovation[block, block] = np.linalg.qr(rows.T, mode='r').T
+            else:
+                rows = np.dot(np.diag(scale[block]), evolved[block, :])
+                innovation[block, block] = tl.sqrtFactor(
+                    np.dot(rows, rows.T) -
+                    np.dot(evolved[block, :], evolved[block, :].T))
+
+        return np.matrix(np.linalg.qr(np.vstack([evolved.T, innovation.T]),
+                                      mode='r').T)
+
+    def _potterUpdate(self, factor, evaluation, noiseVar):
+        """ Potter's update of the covariance factor. With the predicted
+        covariance R = S S' and phi = S' F', the filtered covariance (before
+        scaling with the noise variance) is S+ S+' with
+
+            S+ = S - a * b * S phi phi',
+            a = 1 / (phi' phi + noiseVar),
+            b = 1 / (1 + sqrt(a * noiseVar)),
+
+        which is positive semi-definite by construction, so no rounding
+        error can accumulate into a negative variance.
+
+        """
+        phi = np.dot(factor.T, evaluation.T)
+        alpha = 1.0 / (np.dot(phi.T, phi)[0, 0] + noiseVar)
+        gamma = 1.0 / (1.0 + np.sqrt(alpha * noiseVar))
+        return factor - alpha * gamma * np.dot(np.dot(factor, phi), phi.T)
+
+    def _factor(self, cov, factor):
+        """ The factor of a covariance. When the factor is not available
+        (e.g., the model has just been reset to the prior), it is computed
+        from the covariance.
+
+        """
+        if factor is not None:
+            return factor
+        return tl.sqrtFactor(cov)
+
+    def _factorVar(self, evaluation, factor, noiseVar):
+        """ Compute evaluation * S S' * evaluation' + noiseVar
+
+        """
+        phi = np.dot(factor.T, evaluation.T)
+        return np.dot(phi.T, phi) + noiseVar
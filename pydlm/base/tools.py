@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 # define the error class for exceptions
 class matrixErrors(Exception):
@@ -43,6 +44,138 @@ def duplicateList(aList):
     return aList
 
 
+# whether a value is missing, i.e., None or NaN
+def isMissing(value):
+    return value is None or value != value
+
+
+# replace the missing values (NaN) of a list by None
+def cleanMissing(aList):
+    return [None if isMissing(value) else value for value in aList]
+
+
+# a factor L with L * L' = cov, e.g., for the square root filter or for
+# drawing normal samples. Covariances that are only positive semi-definite
+# (e.g., zero innovation when the discount is 1) fall back to the eigen
+# decomposition
+def sqrtFactor(cov):
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh((cov + cov.T) / 2.0)
+        return np.multiply(vectors, np.sqrt(np.maximum(values, 0.0)))
+
+
+# a list with bounded memory, used for long running online models
+class ringBuffer:
+    """ A list-like container that only keeps the last `capacity` dates,
+    while the indices stay global, i.e., buffer[t] is always the entry of
+    date t. The window follows the latest date that has been written. When a
+    date leaves the window, its entry is passed to the sink (if provided)
+    and dropped. Reading a dropped date raises an error, while the dates
+    beyond the latest written one (e.g., extended by grow) read as None.
+
+    Args:
+        capacity: the number of dates to keep
+        values: the initial entries, starting from date 0
+        sink: a function sink(date, value) called with every non-None entry
+              that leaves the window, e.g., to spill it on disk
+
+    Attributes:
+        start: the earliest date that is still kept
+    """
+    def __init__(self, capacity, values=None, sink=None):
+        if capacity < 1:
+            raise NameError('The capacity has to be a positive integer.')
+        self.capacity = capacity
+        self.sink = sink
+        self.start = 0
+        self._buffer = [None] * capacity
+        self._length = 0
+        self._last = -1  # the latest date that has been written
+        if values is not None:
+            self.extend(values)
+
+    def __len__(self):
+        return self._length
+
+    def _index(self, index):
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError('ringBuffer index out of range')
+        return index
+
+    # move the window so that it ends on date
+    def _advance(self, date):
+        start = max(self.start, date - self.capacity + 1)
+        for old in range(self.start, min(start, self._last + 1)):
+            slot = old % self.capacity
+            if self.sink is not None and self._buffer[slot] is not None:
+                self.sink(old, self._buffer[slot])
+            self._buffer[slot] = None
+        self.start = start
+        self._last = date
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        index = self._index(index)
+        if index > self._last:
+            return None
+        if index < self.start:
+            raise NameError('The date ' + str(index) + ' has been dropped ' +
+                            'from the history.')
+        return self._buffer[index % self.capacity]
+
+    def __setitem__(self, index, value):
+        index = self._index(index)
+        if index > self._last:
+            self._advance(index)
+        if index < self.start:
+            # the date has already left the window
+            if self.sink is not None and value is not None:
+                self.sink(index, value)
+            return None
+        self._buffer[index % self.capacity] = value
+
+    def __iter__(self):
+        for index in range(self.start, self._length):
+            yield self[index]
+
+    def append(self, value):
+        self._length += 1
+        self[self._length - 1] = value
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def grow(self, n):
+        """ Extend the length by n dates without writing them, i.e., they
+        read as None and do not move the window.
+
+        """
+        self._length += n
+
+    def pop(self, index=-1):
+        """ Remove the entry of a date in the window. The later dates are
+        shifted by one, the same as list.pop.
+
+        """
+        index = self._index(index)
+        value = self[index]
+        if index <= self._last:
+            later = [self[i] for i in range(index + 1, self._last + 1)]
+            self._buffer[self._last % self.capacity] = None
+            self._last = index - 1
+            for item in later:
+                self._last += 1
+                self._buffer[self._last % self.capacity] = item
+        self._length -= 1
+        return value
+
+
 # inverse normal cdf function
 def rational_approximation(t):
  
@@ -76,3 +209,16 @@ def getInterval(means, var, p):
         lower[i] = means[i] - alpha * math.sqrt(var[i])
 
     return (upper, lower)
+
+
+# the log density of the one-step prediction, a Student-t distribution with
+# df degrees of freedom, location mean and scale var (the predicted obsVar).
+# It is NaN when the variance is not positive and finite, which can happen
+# when the rounding errors have accumulated in the covariance
+def logPredictiveDensity(y, mean, var, df):
+    if not 0.0 < var < math.inf:
+        return float('nan')
+    z = (y - mean) * (y - mean) / var
+    return math.lgamma((df + 1.0) / 2.0) - math.lgamma(df / 2.0) - \
+        0.5 * math.log(df * math.pi * var) - \
+        (df + 1.0) / 2.0 * math.log1p(z / df)
@@ -31,9 +31,12 @@ Example:
 # dynamic linear model. dlm is a subclass of builder, with adding the
 # Kalman filter functionality for filtering the data
 
+import numpy as np
 from copy import deepcopy
 from pydlm.func._dlm import _dlm
 from pydlm.base.tools import getInterval
+from pydlm.base.tools import cleanMissing
+from pydlm.base.tools import isMissing
 
 
 class dlm(_dlm):
@@ -153,10 +156,13 @@ class dlm(_dlm):
 
         if self._printInfo:
             print('Starting forward filtering...')
+        first = 0
         if not useRollingWindow:
             # we start from the last step of previous fitering
             if self.result.filteredType == 'non-rolling':
                 start = self.result.filteredSteps[1] + 1
+                # a loaded state may not have the dates before it
+                first = self.result.filteredSteps[0]
             else:
                 start = 0
                 # because we refit the forward filter, we need to reset the
@@ -166,8 +172,12 @@ class dlm(_dlm):
             # determine whether renew should be used
             self._forwardFilter(start=start,
                                 end=self.n - 1,
-                                renew=self.options.stable)
+                                renew=self._useRenew())
             self.result.filteredType = 'non-rolling'
+
+            # smooth the last dates with the fixed-lag smoother
+            if self.result.fixedLagCache is not None and start < self.n:
+                self._fixedLagSmoother(start=start, end=self.n - 1)
         else:
             if self.result.filteredType == 'rolling':
                 windowFront = self.result.filteredSteps[1] + 1
@@ -185,16 +195,17 @@ class dlm(_dlm):
                                     end=min(windowLength - 1, self.n - 1))
 
             # for the remaining date, we use a rolling window
-            for today in range(max(windowFront, windowLength), self.n):
-                self._forwardFilter(start=today - windowLength + 1,
-                                    end=today,
-                                    save=today,
-                                    ForgetPrevious=True)
+            self._rollingFilter(start=max(windowFront, windowLength),
+                                end=self.n - 1,
+                                windowLength=windowLength)
 
-        self.result.filteredSteps = [0, self.n - 1]
+        self.result.filteredSteps = [first, self.n - 1]
         self.turnOn('filtered plot')
         self.turnOn('predict plot')
 
+        # drop the dates beyond the history if required
+        self._trimHistory()
+
         # reset everything that needs reset
         self._clean()
 
@@ -222,6 +233,13 @@ class dlm(_dlm):
         # default value for backLength
         if backLength is None:
             backLength = self.n
+            if self.options.maxHistory is not None:
+                backLength = min(self.n, self.options.maxHistory)
+
+        if self.options.maxHistory is not None and \
+           backLength > self.options.maxHistory:
+            raise NameError('The backward smoother can only go back ' +
+                            'within the history.')
 
         if self._printInfo:
             print('Starting backward smoothing...')
@@ -256,6 +274,71 @@ class dlm(_dlm):
         self.fitForwardFilter()
         self.fitBackwardSmoother()
 
+    def update(self, y, features=None):
+        """ Add one new observation and filter it right away.
+
+        This is the same as append followed by fitForwardFilter, but only
+        runs one step of the forward filter from the last filtered date, with
+        no checks or messages in between. It is meant for online models that
+        receive one observation at a time.
+
+        >>> myDLM.fitForwardFilter()
+        >>> error, var = myDLM.update(y=1.2, features={'price': [3.5]})
+
+        Args:
+            y: the new observation. Could be None for a missing observation.
+            features: the features of the new date for every dynamic
+                      component, in a form of {"component_name": feature}.
+
+        Returns:
+            A tuple. (one day ahead prediction error, variance of the
+            prediction), the error is None when y is None.
+
+        """
+        if not self.initialized or \
+           self.result.filteredType != 'non-rolling' or \
+           self.result.filteredSteps[1] != self.n - 1:
+            raise NameError('update can only be used after the forward ' +
+                            'filter has run on all data without rolling ' +
+                            'window.')
+
+        return self._update(y=y, featureDict=features)
+
+    def filterStream(self, stream, saveHistory=False):
+        """ Run the forward filter lazily over a stream of new observations.
+
+        This is a generator. It continues from the last filtered date and
+        yields one record per observation, so it can be chained into a
+        pipeline over an unbounded source:
+
+        >>> for record in myDLM.filterStream(source):
+        >>>     print(record['standardizedError'])
+
+        By default nothing is stored and the dlm is left unchanged, so the
+        memory stays constant. With saveHistory = True, every observation is
+        added to the dlm as in update.
+
+        Args:
+            stream: an iterable of new observations. When the model has
+                    dynamic components, each item is a tuple of (observation,
+                    {"component_name": feature}).
+            saveHistory: whether to add the observations and the results to
+                         the dlm. Default to False.
+
+        Yields:
+            A dictionary with the keys 'predictedObs', 'predictedObsVar',
+            'filteredObs', 'filteredObsVar' and 'standardizedError'.
+
+        """
+        if not self.initialized or \
+           self.result.filteredType != 'non-rolling' or \
+           self.result.filteredSteps[1] != self.n - 1:
+            raise NameError('filterStream can only be used after the ' +
+                            'forward filter has run on all data without ' +
+                            'rolling window.')
+
+        return self._filterStream(stream=stream, saveHistory=saveHistory)
+
 # =========================== model prediction ==============================
 
     # One day ahead prediction function
@@ -318,6 +401,349 @@ class dlm(_dlm):
 
         return self._continuePredict(featureDict=featureDict)
 
+    def predictN(self, N=1, date=None, featureDict=None,
+                 fullCovariance=False):
+        """ Predict the next N days in one call.
+
+        The result is the same as calling predict followed by N - 1
+        continuePredict, but the predictions for all N days are computed in
+        one pass using the powers of the transition matrix.
+
+        >>> # predict 90 days after the last day
+        >>> mean, var = myDLM.predictN(N=90, featureDict=featureDict)
+
+        Args:
+            N: the number of days to predict
+            date: the index when the prediction based on. Default to the
+                  last day.
+            featureDict: the features for the dynamic components, in a form
+                  of {"component_name": [feature_day1, ..., feature_dayN]}.
+                  If the features of a component are not supplied, the
+                  algorithm reuses those stored in the component. For dates
+                  beyond the last day, they must be supplied.
+            fullCovariance: if True, also return the N x N covariance of the
+                  predicted observations. Default to False.
+
+        Returns:
+            A tuple. (predicted observations, variances of the predicted
+            observations), both numpy arrays of length N. When fullCovariance
+            is True, the covariance matrix is appended to the tuple.
+
+        """
+        # the default prediction date
+        if date is None:
+            date = self.n - 1
+
+        # check if the data on the date has been filtered
+        if date > self.result.filteredSteps[1]:
+            raise NameError('Prediction can only be made right' +
+                            ' after the filtered date')
+
+        return self._predictN(N=N, date=date, featureDict=featureDict,
+                              fullCovariance=fullCovariance)
+
+    def predictAhead(self, days, date=None, featureDict=None):
+        """ Predict the observation a given number of days ahead, without
+        predicting the days in between.
+
+        >>> # predict the value 365 days after the last day
+        >>> mean, var = myDLM.predictAhead(days=365)
+
+        The powers of the transition matrix are computed from the closed
+        forms of the components and cached, so a far horizon costs the same
+        as the next day. Models with auto regressive components need the
+        predictions in between and should use predictN instead.
+
+        Args:
+            days: the number of days after date to predict
+            date: the index when the prediction based on. Default to the
+                  last day.
+            featureDict: the feature set for the dynamic Components on the
+                  target day, in a form of {"component_name": feature}. For
+                  dates beyond the last day, featureDict must be supplied.
+
+        Returns:
+            A tuple. (Predicted observation, variance of the predicted
+            observation)
+
+        """
+        # the default prediction date
+        if date is None:
+            date = self.n - 1
+
+        # check if the data on the date has been filtered
+        if date > self.result.filteredSteps[1]:
+            raise NameError('Prediction can only be made right' +
+                            ' after the filtered date')
+
+        return self._predictAhead(days=days, date=date,
+                                  featureDict=featureDict)
+
+    def simulateForecast(self, N=1, nPaths=1000, seed=None, date=None,
+                         featureDict=None):
+        """ Simulate joint paths of the next N days.
+
+        >>> # 1000 paths of the next 30 days
+        >>> paths = myDLM.simulateForecast(N=30, nPaths=1000, seed=1)
+
+        Different from predictN which gives the marginal mean and variance
+        of each day, the paths keep the dependence between days. As in
+        predictN, the innovation implied by the discount factors is only
+        added on the first day, so without auto regressive components the
+        variance of each day matches predictN. The auto regressive
+        components use the simulated observations of each path as their
+        features.
+
+        Args:
+            N: the number of days to simulate
+            nPaths: the number of paths. Default to 1000.
+            seed: the seed for the random number generator
+            date: the index when the simulation based on. Default to the
+                  last day.
+            featureDict: the features for the dynamic components, in a form
+                  of {"component_name": [feature_day1, ..., feature_dayN]}.
+                  See predictN.
+
+        Returns:
+            A numpy array of size nPaths x N, one simulated path per row.
+
+        """
+        # the default prediction date
+        if date is None:
+            date = self.n - 1
+
+        # check if the data on the date has been filtered
+        if date > self.result.filteredSteps[1]:
+            raise NameError('Prediction can only be made right' +
+                            ' after the filtered date')
+
+        return self._simulateForecast(N=N, nPaths=nPaths, date=date,
+                                      featureDict=featureDict, seed=seed)
+
+    def predictScenarios(self, date=None, features=None):
+        """ One day ahead prediction for many scenarios of the features of the
+        dynamic components, e.g., a set of candidate prices.
+
+        >>> # 500 candidate values of the feature of a single dynamic component
+        >>> mean, var = myDLM.predictScenarios(features=np.random.rand(500, 1))
+
+        All scenarios share the state and covariance of the date, so they are
+        evaluated together without running predict for each of them.
+
+        Args:
+            date: the index when the prediction based on. Default to the
+                  last day.
+            features: either an array with one row per scenario and one
+                  column per dynamic feature (all dynamic components in
+                  the order they are stored in the latent states), or a
+                  dictionary {"component_name": array with one row per
+                  scenario}.
+
+        Returns:
+            A tuple. (Predicted observations, variances of the predicted
+            observations), both numpy arrays with one entry per scenario.
+
+        """
+        # the default prediction date
+        if date is None:
+            date = self.n - 1
+
+        # check if the data on the date has been filtered
+        if date > self.result.filteredSteps[1]:
+            raise NameError('Prediction can only be made right' +
+                            ' after the filtered date')
+
+        if features is None:
+            raise NameError('The feature scenarios have to be provided.')
+
+        return self._predictScenarios(date=date, features=features)
+
+    def backtest(self, horizons=None):
+        """ Predict from every filtered date for the given horizons, i.e., the
+        in-sample forecasts of a backtest.
+
+        >>> mean, var, metrics = myDLM.backtest(horizons=[1, 7, 28])
+        >>> # the mean squared error of the 7-day ahead forecasts
+        >>> metrics['mse'][1]
+
+        All origins are computed at once from the stored filtered states.
+        The features on the target dates are the stored ones, including the
+        observed data for the auto regressive components.
+
+        Args:
+            horizons: a list of the numbers of days ahead. Default to [1].
+
+        Returns:
+            A tuple. (predicted means, variances of the predicted
+            observations, metrics). The means and variances are numpy arrays
+            of size n x len(horizons), where row t contains the predictions
+            made on date t. Entries whose target date is beyond the data are
+            nan. metrics is a dictionary with the mean squared error 'mse'
+            and the mean absolute error 'mae' of each horizon.
+
+        """
+        if not self.initialized or self.result.filteredSteps != \
+           [0, self.n - 1] or self.result.filteredType != 'non-rolling':
+            raise NameError('The backtest needs the forward filter to run ' +
+                            'on the full data without rolling window.')
+        if horizons is None:
+            horizons = [1]
+
+        return self._backtest(horizons=horizons)
+
+    def tune(self, space, metric='loglik', nSamples=20, workers=None,
+             stopMargin=10.0, seed=None):
+        """ Search the discount factors of the components and the noise prior
+        that fit the data best.
+
+        >>> best, table = myDLM.tune({'trend': [0.9, 0.95, 0.99],
+        ...                           'seasonal': [0.95, 0.99],
+        ...                           'noisePrior': [0.1, 1.0]})
+        >>> # or draw 50 candidates within the bounds
+        >>> best, table = myDLM.tune({'trend': (0.8, 1.0),
+        ...                           'seasonal': (0.9, 1.0)}, nSamples=50)
+
+        Each candidate is filtered on the whole data, in parallel on a
+        process pool with the data and the evaluations in shared memory
+        (see @discountTuner). A candidate is stopped early once its
+        running loss can no longer compete with the best finished one. The
+        candidates are filtered without the renew of the stable mode and
+        the dlm itself is not changed. To use the best configuration, set
+        the discount of the components and the noisePrior and refit.
+
+        Args:
+            space: a dictionary from the component names (and 'noisePrior')
+                   to either a list of values or a (low, high) tuple. If all
+                   values are lists, the full grid is evaluated. Otherwise
+                   nSamples candidates are drawn uniformly within the bounds
+                   and from the lists.
+            metric: 'loglik' for the one-step predictive log-likelihood or
+                    'mse' for the mean squared one-step prediction error.
+                    Default to 'loglik'.
+            nSamples: the number of candidates drawn when space has bounds.
+            workers: the number of processes. Default to the number of cpus.
+            stopMargin: for 'loglik', a candidate is stopped when its
+                        running log-likelihood is below the best one by this
+                        margin on a checkpoint. None to keep all candidates
+                        running ('mse' candidates are only stopped when they
+                        are surely worse).
+            seed: the seed for drawing the candidates.
+
+        Returns:
+            A tuple of (best, table). best is a dictionary of the best
+            configuration in the form of space. table is a list with one
+            dictionary per candidate, containing the configuration, the
+            metric (None if stopped early) and 'stoppedAt', the date the
+            candidate was stopped (None if finished).
+
+        """
+        if metric not in ['loglik', 'mse']:
+            raise NameError('The metric has to be loglik or mse.')
+
+        # check if the feature size matches the data size
+        self._checkFeatureSize()
+        if not self.initialized:
+            self._initialize()
+
+        return self._tune(space=space, metric=metric, nSamples=nSamples,
+                          workers=workers, stopMargin=stopMargin, seed=seed)
+
+    def optimizeDiscount(self, names=None, bounds=(0.8, 1.0), maxIter=50,
+                         tol=1e-6):
+        """ Find the discount factors of the components that maximize the
+        one-step predictive log-likelihood.
+
+        >>> best, path = myDLM.optimizeDiscount(bounds=(0.9, 1.0))
+
+        Unlike the grid of @tune, the number of filter passes does not grow
+        exponentially with the number of components. The gradient of the
+        log-likelihood with respect to all discounts is computed in the same
+        pass as the forward filter (see @discountOptimizer), and a
+        quasi-Newton search within the bounds usually needs tens of passes.
+        The search starts from the current discounts and finds a local
+        maximum. The filter runs without the renew of the stable mode and
+        the dlm itself is not changed. To use the result, set the discount of
+        the components and refit.
+
+        Args:
+            names: the components whose discount is optimized. Default to
+                   all components.
+            bounds: a (low, high) tuple for all components, or a dictionary
+                    from the component names to their bounds. The bounds
+                    have to be within (0, 1]. Default to (0.8, 1.0).
+            maxIter: the maximum number of iterations.
+            tol: the search stops when no discount moves by more than tol.
+
+        Returns:
+            A tuple of (best, path). best is a dictionary from the component
+            names to their optimal discount. path is a list with one
+            dictionary per iteration, containing the discounts and 'loglik'.
+
+        """
+        # check if the feature size matches the data size
+        self._checkFeatureSize()
+        if not self.initialized:
+            self._initialize()
+
+        if names is None:
+            names = [name for name, comp in self.builder.getComponents()]
+        return self._optimizeDiscount(names=names, bounds=bounds,
+                                      maxIter=maxIter, tol=tol)
+
+    def fitPrior(self, maxIter=20, tol=1e-4):
+        """ Estimate the prior of the latent states of the components and
+        the noise prior with the EM algorithm, and fit the dlm with them.
+
+        >>> path = myDLM.fitPrior(maxIter=10)
+
+        Each iteration fits the forward filter and the backward smoother,
+        and then sets the prior mean and covariance of each component
+        (see createMeanPrior and createCovPrior) and the noisePrior to their
+        closed-form estimates from the smoothed results. It stops when the
+        one-step predictive log-likelihood changes by less than tol
+        (relative), or after maxIter fits. As the discounting makes the EM
+        approximate, it also stops when the log-likelihood decreases and
+        goes back to the priors before that step. The dlm is left fitted
+        with the final priors.
+
+        Args:
+            maxIter: the maximum number of fits. Default to 20.
+            tol: the relative change of the log-likelihood to stop.
+                 Default to 1e-4.
+
+        Returns:
+            A list with one dictionary per fit, containing the 'loglik' of
+            the fit and the 'noisePrior' it used.
+
+        """
+        if self.options.maxHistory is not None or \
+           self.options.checkpoint is not None:
+            raise NameError('The EM needs the smoothed covariances of all ' +
+                            'dates, which are not kept in the history or ' +
+                            'the checkpoint mode.')
+
+        path = []
+        for iteration in range(maxIter):
+            self.fit()
+            logLikelihood = self.logLikelihood()
+            path.append({'loglik': logLikelihood,
+                         'noisePrior': self.options.noise})
+            if iteration > 0:
+                # the discounting makes the EM only approximate, so it
+                # stops once the log-likelihood drops and goes back to
+                # the last priors
+                if logLikelihood < path[-2]['loglik']:
+                    self._restorePrior(priors)
+                    self.fit()
+                    break
+                if logLikelihood - path[-2]['loglik'] <= \
+                   tol * (1.0 + abs(path[-2]['loglik'])):
+                    break
+            if iteration < maxIter - 1:
+                priors = self._savePrior()
+                self._emStep()
+        return path
+
 # =========================== result components =============================
 
     def getAll(self):
@@ -548,7 +974,7 @@ class dlm(_dlm):
         # to return the full latent covariance
         if name == 'all':
             if filterType == 'forwardFilter':
-                return self.result.filteredCov[start:end]
+                return self._covarianceRange('filteredCov', start, end)
             elif filterType == 'backwardSmoother':
                 return self.result.smoothedCov[start:end]
             elif filterType == 'predict':
@@ -561,6 +987,97 @@ class dlm(_dlm):
         return self._getLatentCov(name=name, filterType=filterType,
                                   start=start, end=end)
 
+    def logLikelihood(self, perStep=False):
+        """ get the one-step predictive log-likelihood of the filtered data,
+        which can be used to compare discount factors and component sets.
+
+        The log density of each observation under the one-step prediction
+        is recorded by the forward filter. Since the noise variance is
+        learned, the prediction is a Student-t distribution, with location
+        and scale given by getMean('predict') and getVar('predict').
+
+        If the filtered dates are not (0, self.n - 1),
+        then a warning will prompt stating the actual filtered dates.
+
+        Args:
+            perStep: whether to return the log density of each date instead
+                     of the sum. Default to False.
+
+        Returns:
+            The sum of the log densities over the filtered dates, or a numpy
+            array of the log density of each date if perStep is True.
+            Missing observations contribute 0. The dates whose predicted
+            variance is not positive (e.g., rounding errors without the
+            stable mode) are NaN and left out of the sum.
+
+        """
+        start, end = self._checkAndGetWorkingDates(filterType='forwardFilter')
+        logLikelihood = np.array(
+            [0.0 if value is None else value
+             for value in self.result.logLikelihood[start:(end + 1)]])
+        if perStep:
+            return logLikelihood
+        return np.nansum(logLikelihood)
+
+# ============================ model persistence ============================
+
+    def saveState(self, path, includeResult=False):
+        """ Save a compact snapshot of the fitted model to a .npz file.
+
+        The snapshot contains the layout of the components, the discount,
+        the options (including the stable, information, steady state,
+        checkpoint and history modes) and the filtered status of the last
+        filtered date (state, covariance, noiseVar and df), which is all that
+        is needed to continue filtering or predicting. It also keeps the few
+        recent data points replayed by the renew strategy and the features
+        of the last date (e.g., the lags of autoReg). The snapshot does not
+        contain the full data or the components, so it should be loaded to a
+        dlm that is constructed in the same way.
+
+        Args:
+            path: the file name (or file object) of the snapshot.
+            includeResult: whether the per-date results (observations,
+                           variances and latent states, but not the
+                           covariances) are saved as well. Default to False.
+
+        """
+        if not self.initialized or self.result.filteredSteps[1] == -1:
+            raise NameError('The model has to be filtered before saving.')
+
+        self._saveState(path, includeResult=includeResult)
+
+    def loadState(self, path):
+        """ Load a snapshot saved by saveState.
+
+        The dlm must have the same components as the saved one, and it is
+        switched to the modes the snapshot was saved in. After loading,
+        predict can be used right away and fitForwardFilter continues from
+        the saved date on any newly appended data, without refitting.
+
+        >>> myDLM = dlm(data) + trend(2, 0.98) + seasonality(7, 0.98)
+        >>> myDLM.loadState('myDLM.npz')
+        >>> myDLM.predict()
+
+        If the dlm holds fewer data points than the saved date, the history
+        does not have to be reloaded: the data of the dlm (and the features
+        of its dynamic components) are taken as the dates right after the
+        saved one, and the older dates read as missing. The autoReg
+        components still need data to be constructed, but their features
+        are rebuilt from the snapshot.
+
+        >>> myDLM = dlm(newData) + trend(2, 0.98) + seasonality(7, 0.98)
+        >>> myDLM.loadState('myDLM.npz')
+        >>> myDLM.fitForwardFilter()
+
+        Args:
+            path: the file name (or file object) of the snapshot.
+
+        """
+        self._loadState(path)
+
+        # reset everything that needs reset
+        self._clean()
+
 # ======================= data appending, popping and altering ===============
 
     # Append new data or features to the dlm
@@ -578,7 +1095,7 @@ class dlm(_dlm):
         # if we are adding new data to the time series
         if component == 'main':
             # add the data to the self.data
-            self.data.extend(list(data))
+            self.data.extend(cleanMissing(data))
 
             # update the length
             self.n += len(data)
@@ -662,7 +1179,7 @@ class dlm(_dlm):
 
         # to alter the data for the observed chain
         if component == 'main':
-            self.data[date] = data
+            self.data[date] = None if isMissing(data) else data
 
             # we also automatically alter all the automatic components
             for component in self.builder.automaticComponents:
@@ -987,7 +1504,7 @@ class dlm(_dlm):
         for item in allItems:
             print(item + ': ' + str(allItems[item]))
 
-    def stableMode(self, use=True):
+    def stableMode(self, use=True, method='renew', storeFactor=False):
         """ Turn on the stable mode, i.e., using the renewal strategy.
 
             Indicate whether the renew strategy should be used to add numerical
@@ -999,9 +1516,37 @@ class dlm(_dlm):
             the effective sample size of the dlm is twice
             renewTerm. When discount = 1, there will be no renewTerm,
             since all the information will be passed along.
+
+            With method = 'sqrt', the stability comes from the filter
+            instead: the filtered covariance is updated in the square root
+            (Cholesky factor) form, which keeps it positive semi-definite.
+            No date is refitted, so the forward filter runs in a single
+            pass and uses all the previous data, as with the stable mode
+            turned off. The filter propagates the factor S of the covariance
+            P = S S' through the prediction and the filtering, and P is only
+            computed when it is read. The result can store the factors
+            instead of the covariances, so that no P is computed during the
+            filtering.
+
+        Args:
+            use: whether to use the stable mode. Default to True.
+            method: 'renew' or 'sqrt'. Default to 'renew'.
+            storeFactor: whether to store the factors of the filtered and
+                         predicted covariances instead of the covariances,
+                         only with method = 'sqrt'. The covariances are
+                         computed from the factors when they are needed.
+                         Default to False.
         """
+        if method not in ['renew', 'sqrt']:
+            raise NameError('The stable method has to be renew or sqrt.')
+        if storeFactor and (use is not True or method != 'sqrt'):
+            raise NameError('The factors can only be stored in the stable' +
+                            ' mode with the sqrt method.')
+
         # if option changes, reset everything
-        if self.options.stable != use:
+        if self.options.stable != use or \
+           self.options.stableMethod != method or \
+           self.options.storeFactor != storeFactor:
             self.initialized = False
 
         if use is True:
@@ -1010,6 +1555,8 @@ class dlm(_dlm):
             self.options.stable = False
         else:
             raise NameError('Incorrect option input')
+        self.options.stableMethod = method
+        self.options.storeFactor = storeFactor
 
     def evolveMode(self, evoType='dependent'):
         """ Control whether different component evolve indpendently. If true,
@@ -1058,6 +1605,243 @@ class dlm(_dlm):
         # for chaining
         return self
 
+    def historyMode(self, maxHistory=None, sink=None):
+        """ Only keep the data and the results of the last maxHistory dates,
+        for online models that keep receiving new data.
+
+            The results are stored in ring buffers, while the dates are
+            still indexed from the beginning of the time series. Once the
+            forward filter has run, the data and the features before the
+            history are dropped (or passed to sink), so the memory stays
+            bounded when new data is appended or updated. Prediction, the
+            result getters and the backward smoother work within the
+            history.
+
+        Args:
+            maxHistory: the number of dates to keep. None to keep all.
+                        Default to None.
+            sink: an optional function sink(record, date, value), which
+                  receives every result that leaves the history, e.g.,
+                  sink('filteredObs', 10, value), for writing it to disk.
+
+        Returns:
+            A dlm object (for chaining purpose)
+        """
+        if maxHistory is not None and \
+           (not isinstance(maxHistory, int) or maxHistory < 1):
+            raise NameError('maxHistory has to be a positive integer or None.')
+        if self._historyStart() > 0:
+            raise NameError('The history has been dropped and the model ' +
+                            'cannot be refitted.')
+
+        # if option changes, reset everything
+        if self.options.maxHistory != maxHistory or \
+           self.options.historySink is not sink:
+            self.options.maxHistory = maxHistory
+            self.options.historySink = sink
+            self.initialized = False
+
+        # for chaining
+        return self
+
+    def fixedLagMode(self, lag=None):
+        """ Keep the smoothed results of the last lag dates up to date when
+        new data comes in, for online models.
+
+            With the fixed-lag smoother, the forward filter (fitForwardFilter
+            and update) also smooths the last lag dates. Each new date only
+            propagates its correction backward over these dates with the
+            cached smoother gains, instead of re-running the backward
+            smoother from the last date. The dates before the window keep
+            their smoothed results, which were smoothed with lag dates of
+            data. fitBackwardSmoother continues from the window if the full
+            smoothing is needed.
+
+            For a model of dimension d, each new date costs O(lag d^3),
+            since the smoothed covariances of the whole window are
+            corrected with d x d products.
+
+        Args:
+            lag: the number of dates to smooth. None to turn off the
+                 fixed-lag smoother. Default to None.
+
+        Returns:
+            A dlm object (for chaining purpose)
+        """
+        if lag is not None and (not isinstance(lag, int) or lag < 1):
+            raise NameError('The lag has to be a positive integer or None.')
+
+        # if option changes, reset everything
+        if self.options.fixedLag != lag:
+            self.options.fixedLag = lag
+            self.initialized = False
+
+        # for chaining
+        return self
+
+    def steadyStateMode(self, use=True, tolerance=1e-6):
+        """ Reuse the steady-state gain of the forward filter once it has
+        converged.
+
+            For models without dynamic features, the filtered covariance in
+            the unit of the noise variance does not depend on the data and
+            converges for discount < 1. In the steady state mode, the filter
+            stops the covariance recursion once this scaled covariance
+            changes less than the tolerance (relative to its largest entry)
+            between two dates, and from then on only updates the mean, the
+            noise variance and the degree of freedom. The full recursion is
+            used again on a missing value, a refit from the prior (e.g., the
+            renew of the stable mode) or a change of the evaluation. The
+            results differ from the full recursion by the order of the
+            tolerance.
+
+        Args:
+            use: whether to use the steady state mode. Default to True.
+            tolerance: the relative tolerance on the change of the scaled
+                       covariance. Default to 1e-6.
+
+        Returns:
+            A dlm object (for chaining purpose)
+        """
+        if use is True:
+            if tolerance <= 0:
+                raise NameError('The tolerance has to be positive.')
+            steadyTolerance = tolerance
+        elif use is False:
+            steadyTolerance = None
+        else:
+            raise NameError('Incorrect option input')
+
+        # if option changes, reset everything
+        if self.options.steadyTolerance != steadyTolerance:
+            self.options.steadyTolerance = steadyTolerance
+            self.initialized = False
+
+        # for chaining
+        return self
+
+    def informationMode(self, use=True):
+        """ Run the forward filter in the information form, for static
+        models with many latent states (e.g., a regression with hundreds of
+        features).
+
+            The information filter works with the precision matrix (the
+            inverse of the latent covariance) and the information vector
+            instead of the covariance. Each observation adds a rank-1 term to
+            the precision, and the filter solves one linear system per date
+            instead of propagating the dense covariance. The results are the
+            same as the usual filter. The covariances are not kept but
+            computed from the stored precisions when they are requested,
+            e.g., by getLatentCov, getVar or the backward smoother.
+
+            All discounts have to be 1. The components whose transition is
+            not the identity (e.g., trends) are moved in the information
+            form with the inverse of their transition block, which is cheap
+            as long as these components are small. The prior covariance has
+            to be of full rank, so the seasonality components (whose prior
+            constrains the states to sum to zero) cannot be used, while
+            fourierSeason can.
+
+        Args:
+            use: whether to use the information filter. Default to True.
+
+        Returns:
+            A dlm object (for chaining purpose)
+        """
+        if use is not True and use is not False:
+            raise NameError('Incorrect option input')
+
+        # if option changes, reset everything
+        if self.options.information != use:
+            self.options.information = use
+            self.initialized = False
+
+        # for chaining
+        return self
+
+    def parallelMode(self, use=True, workers=None, chunkSize=None):
+        """ Run the forward filter and the backward smoother on all dates at
+        once with a parallel-in-time scan, for very long time series.
+
+            Each date of the filter (and of the smoother) is an affine map
+            on the filter status, and the maps are combined with an
+            associative operator. The dates are split into chunks which are
+            scanned with vectorized numpy operations on a thread pool, so the
+            cost is no longer one small matrix product per date in python.
+            The results are the same as the sequential filter up to rounding
+            errors.
+
+            The parallel forward filter needs all latent states to be
+            discounted by the same factor, i.e., all discounts equal 1, or
+            a uniform discount with evolveMode('dependent') (or a single
+            component), and it does not run with the renew stable method,
+            the steady state mode, the information filter, the checkpoint
+            mode or the stored covariance factors. Otherwise the usual
+            filter is used. Use stableMode(False) (or the 'sqrt' method)
+            together with the parallel mode. The parallel smoother works with
+            all models, except in the checkpoint mode.
+
+        Args:
+            use: whether to use the parallel mode. Default to True.
+            workers: the number of threads. Default to the number of cpus.
+            chunkSize: the number of dates in a chunk. Default to split the
+                       dates into 4 chunks per thread.
+
+        Returns:
+            A dlm object (for chaining purpose)
+        """
+        if use is not True and use is not False:
+            raise NameError('Incorrect option input')
+        if (workers is not None and
+            (not isinstance(workers, int) or workers < 1)) or \
+           (chunkSize is not None and
+            (not isinstance(chunkSize, int) or chunkSize < 1)):
+            raise NameError('workers and chunkSize have to be positive ' +
+                            'integers.')
+
+        # the results do not change, so there is no need to reset
+        self.options.parallel = use
+        self.options.workers = workers
+        self.options.chunkSize = chunkSize
+
+        # for chaining
+        return self
+
+    def checkpointMode(self, interval='sqrt'):
+        """ Only keep the latent covariances on checkpoints to save memory.
+
+            In the checkpoint mode, the forward filter keeps the full filter
+            status only every `interval` dates (and on the last filtered date).
+            The backward smoother recomputes the dropped covariances segment by
+            segment from the nearest checkpoint. The memory for the
+            covariances then goes from O(n) to O(n / interval + interval)
+            matrices, at the cost of running the forward filter roughly twice.
+            With interval = 'sqrt', the checkpoints are placed every sqrt(n)
+            dates, which gives O(sqrt(n)) memory. The latent covariances and
+            the component variances are only available on the checkpoints
+            (None on other dates).
+
+        Args:
+            interval: the number of dates between two checkpoints, or 'sqrt'
+                      to use sqrt(n). None to turn off the checkpoint mode.
+                      Default to 'sqrt'.
+
+        Returns:
+            A dlm object (for chaining purpose)
+        """
+        if interval is not None and interval != 'sqrt' and \
+           (not isinstance(interval, int) or interval < 1):
+            raise NameError('The checkpoint interval has to be a positive' +
+                            ' integer, \'sqrt\' or None.')
+
+        # if option changes, reset everything
+        if self.options.checkpoint != interval:
+            self.options.checkpoint = interval
+            self.initialized = False
+
+        # for chaining
+        return self
+
     def loadPlotLibrary(self):
         if not self.plotLibLoaded:
             global dlmPlot
@@ -9,9 +9,23 @@ This piece of code include all the hidden methods and members of the class dlm.
 It provides the basic modeling, filtering, forecasting and smoothing of a dlm.
 
 """
+import numpy as np
+from collections import deque
+from copy import deepcopy
+from itertools import product
 from numpy import matrix
 from numpy import dot
 from pydlm.base.kalmanFilter import kalmanFilter
+from pydlm.base.discountOptimizer import discountOptimizer
+from pydlm.base.discountTuner import discountTuner
+from pydlm.base.infoKalmanFilter import infoKalmanFilter
+from pydlm.base.parallelKalmanFilter import parallelKalmanFilter
+from pydlm.base.sqrtKalmanFilter import sqrtKalmanFilter
+from pydlm.base.tools import ringBuffer
+from pydlm.base.tools import cleanMissing
+from pydlm.base.tools import isMissing
+from pydlm.base.tools import logPredictiveDensity
+from pydlm.base.tools import sqrtFactor
 from pydlm.modeler.builder import builder
 
 # this class defines the basic functionalities for dlm, which is not supposed
@@ -43,12 +57,29 @@ class _dlm:
     Methods:
         _initialize: initialize the dlm (builder and kalmanFilter)
         _forwardFilter: run forward filter for a specific start and end date
+        _forwardStep: run forward filter for one date
+        _parallelFilter: run forward filter on all dates with a parallel scan
+        _rollingFilter: run the rolling window filter
+        _update: add one observation and filter it
+        _filterStream: a generator of the forward filter over a stream
+        _replayForwardFilter: recompute the filtered results from the nearest
+                              checkpoint
         _backwardSmoother: run backward smooth for a specific start and end
                            date
+        _parallelSmoother: run backward smooth on all dates with a parallel
+                           scan
+        _fixedLagSmoother: keep the smoothed results of the last few dates
+                           up to date with new data
         _predictInSample: predict the latent state and observation for a given
                           period of time (deprecated)
         _oneDayAheadPredict: predict one day a head.
         _continuePredict: continue predicting one day after _oneDayAheadPredict
+        _predictN: predict multiple days in one pass
+        _predictAhead: predict a given number of days ahead
+        _backtest: predict from every filtered date for given horizons
+        _predictScenarios: one day ahead prediction for many feature scenarios
+        _simulateForecast: simulate future paths of the observations
+        _predictionEvaluation: build the evaluation vector for prediction
         _resetModelStatus: reset the model status to its prior status
         _setModelStatus: set the model status to a specific date
         _defaultOptions: a class to store and set default options
@@ -64,12 +95,16 @@ class _dlm:
         _getComponentVar: get the variance of a given component
         _checkPlotOptions: set the correct options according to the fit
         _checkAndGetWorkingDates: get the correct filtering dates
+        _trimHistory: keep only the recent history of the data and features
+        _saveState: save the model layout and the last filtered status
+        _loadState: restore the model from a saved state
+        _coldStart: resume a saved state without the full history
     """
     # define the basic members
     # initialize the result
     def __init__(self, data):
 
-        self.data = list(data)
+        self.data = cleanMissing(data)
         self.n = len(data)
         self.result = None
         self.builder = builder()
@@ -78,6 +113,8 @@ class _dlm:
         self.options = self._defaultOptions()
         self.time = None
         self._printInfo = True
+        # the dates with missing features, see @_maskMissingDates
+        self._missingDates = None
 
     # an inner class to store all options
     class _defaultOptions:
@@ -87,7 +124,18 @@ class _dlm:
         def __init__(self):
             self.noise = 1.0
             self.stable = True
+            self.stableMethod = 'renew'
+            self.storeFactor = False
+            self.information = False
             self.innovationType='component'
+            self.checkpoint = None
+            self.maxHistory = None
+            self.historySink = None
+            self.fixedLag = None
+            self.steadyTolerance = None
+            self.parallel = False
+            self.workers = None
+            self.chunkSize = None
 
             self.plotOriginalData = True
             self.plotFilteredData = True
@@ -113,16 +161,25 @@ class _dlm:
         records = ['filteredObs', 'predictedObs', 'smoothedObs',
                    'filteredObsVar',
                    'predictedObsVar', 'smoothedObsVar', 'noiseVar',
-                   'df',
+                   'df', 'logLikelihood',
                    'filteredState', 'predictedState', 'smoothedState',
-                   'filteredCov', 'predictedCov', 'smoothedCov']
+                   'filteredCov', 'predictedCov', 'smoothedCov',
+                   'filteredCovFactor', 'predictedCovFactor',
+                   'filteredPrecision', 'predictedPrecision']
 
         # quantites to record the result
-        def __init__(self, n):
+        def __init__(self, n, maxHistory=None, sink=None):
 
-            # initialize all records to be [None] * n
+            # initialize all records to be [None] * n, or ring buffers of
+            # length n keeping the last maxHistory dates
             for variable in self.records:
-                setattr(self, variable, [None] * n)
+                if maxHistory is None:
+                    setattr(self, variable, [None] * n)
+                else:
+                    setattr(self, variable,
+                            ringBuffer(maxHistory,
+                                       sink=self._recordSink(sink, variable)))
+                    getattr(self, variable).grow(n)
 
             # record the dates that have been filtered
             self.filteredSteps = [0, -1]
@@ -133,17 +190,49 @@ class _dlm:
             # record the current prediction status in the form of
             # [start date, current date, [predictedObs1, predictedObs2,...]]
             self.predictStatus = None
-
-        # extend the current record by n blocks
+            # the dates where the full filter status is kept, when the
+            # covariances are only stored on checkpoints. In a form of
+            # {date: (prediction step, last renew point, renew)}
+            self.checkpoints = {}
+            self.checkpointInterval = None
+            # the last renew point of the forward filter, used when the
+            # filter is continued one date at a time
+            self.lastRenewPoint = 0
+            # the dates in the window of the fixed-lag smoother, in a form of
+            # [date, evaluation, smoother gain to the next date]
+            self.fixedLagCache = None
+
+        # pass the name of the record to the sink
+        def _recordSink(self, sink, variable):
+            if sink is None:
+                return None
+            return lambda date, value: sink(variable, date, value)
+
+        # extend the current record by n blocks. The lists over-allocate
+        # as they grow, so extending them one date at a time (see @_update)
+        # costs amortized O(1) per record, the same as preallocating.
         def _appendResult(self, n):
             for variable in self.records:
-                getattr(self, variable).extend([None] * n)
+                record = getattr(self, variable)
+                if isinstance(record, ringBuffer):
+                    record.grow(n)
+                else:
+                    record.extend([None] * n)
 
         # pop out a specific date
         def _popout(self, date):
             for variable in self.records:
                 getattr(self, variable).pop(date)
 
+            # the checkpoints after the date are no longer valid
+            for step in list(self.checkpoints):
+                if step >= date:
+                    del self.checkpoints[step]
+
+            # the fixed-lag window has to be rebuilt
+            if self.fixedLagCache is not None:
+                self.fixedLagCache.clear()
+
     # initialize the builder
     def _initialize(self):
         """ Initialize the model: initialize builder and filter.
@@ -155,12 +244,119 @@ class _dlm:
         #                           shrink = 1 - min(self.builder.discount),
         #                           shrinkageMatrix = self.builder.sysVarPrior)
         # else:
-        self.Filter = kalmanFilter(discount=self.builder.discount,
-                                   updateInnovation=self.options.innovationType,
-                                   index=self.builder.componentIndex)
-        self.result = self._result(self.n)
+        if self.options.information:
+            if self.options.checkpoint is not None or \
+               self.options.steadyTolerance is not None or \
+               (self.options.stable and self.options.stableMethod == 'sqrt'):
+                raise NameError('The information filter cannot be used ' +
+                                'with the checkpoint mode, the steady ' +
+                                'state mode or the sqrt stable method.')
+            # the prior precision has to exist, while e.g. the seasonality
+            # constrains its states to sum to zero with a singular prior
+            if np.linalg.matrix_rank(self.builder.sysVarPrior,
+                                     hermitian=True) < self.builder.dimension:
+                raise NameError('The information filter needs a prior ' +
+                                'covariance of full rank, which the ' +
+                                'seasonality components do not have. ' +
+                                'Use fourierSeason instead or turn off ' +
+                                'the information mode.')
+            self.Filter = infoKalmanFilter(
+                discount=self.builder.discount,
+                updateInnovation=self.options.innovationType,
+                index=self.builder.componentIndex)
+        elif self.options.stable and self.options.stableMethod == 'sqrt':
+            if self.options.storeFactor and \
+               self.options.checkpoint is not None:
+                raise NameError('The covariance factors cannot be stored ' +
+                                'in the checkpoint mode.')
+            if self.options.steadyTolerance is not None:
+                raise NameError('The steady state mode cannot be used ' +
+                                'with the sqrt stable method.')
+            self.Filter = sqrtKalmanFilter(
+                discount=self.builder.discount,
+                updateInnovation=self.options.innovationType,
+                index=self.builder.componentIndex)
+        else:
+            self.Filter = kalmanFilter(
+                discount=self.builder.discount,
+                updateInnovation=self.options.innovationType,
+                index=self.builder.componentIndex,
+                steadyTolerance=self.options.steadyTolerance)
+        self.result = self._result(self.n,
+                                   maxHistory=self.options.maxHistory,
+                                   sink=self.options.historySink)
+        self.result.checkpointInterval = self._getCheckpointInterval()
+        if self.options.fixedLag is not None:
+            self._checkFixedLag()
+            self.result.fixedLagCache = deque(maxlen=self.options.fixedLag)
         self.initialized = True
 
+    def _checkFixedLag(self):
+        """ Check the fixed-lag smoother is compatible with the other options.
+
+        """
+        if self.options.checkpoint is not None:
+            raise NameError('The fixed-lag smoother needs all the ' +
+                            'covariances and cannot be used in the ' +
+                            'checkpoint mode.')
+        if self.options.maxHistory is not None and \
+           self.options.fixedLag > self.options.maxHistory:
+            raise NameError('The lag of the fixed-lag smoother cannot be ' +
+                            'longer than maxHistory.')
+
+    def _trimHistory(self):
+        """ Keep only the last maxHistory dates of the data and the features
+        once they have been filtered. The data and the features of the
+        dynamic components are turned into ring buffers, so later appends
+        do not increase the memory.
+
+        """
+        maxHistory = self.options.maxHistory
+        if maxHistory is None or isinstance(self.data, ringBuffer):
+            return None
+        if self._useRenew() and maxHistory <= self.builder.renewTerm:
+            raise NameError('maxHistory has to be longer than the renew ' +
+                            'term ' + str(self.builder.renewTerm) + '.')
+
+        self.data = ringBuffer(maxHistory, self.data)
+        for name in self.builder.dynamicComponents:
+            comp = self.builder.dynamicComponents[name]
+            comp.features = ringBuffer(maxHistory, comp.features)
+        for name in self.builder.automaticComponents:
+            comp = self.builder.automaticComponents[name]
+            if comp.componentType == 'autoReg':
+                comp.features = ringBuffer(maxHistory, comp.features)
+        for step in list(self.result.checkpoints):
+            if step < self.data.start:
+                del self.result.checkpoints[step]
+
+    def _useRenew(self):
+        """ Whether the forward filter uses the renew strategy, i.e., the
+        stable mode with the 'renew' method.
+
+        """
+        return self.options.stable and self.options.stableMethod == 'renew'
+
+    def _historyStart(self):
+        """ The earliest date that is still kept in the history.
+
+        """
+        if isinstance(self.data, ringBuffer):
+            return self.data.start
+        return 0
+
+    def _getCheckpointInterval(self):
+        """ Get the number of dates between two checkpoints according to the
+        options.
+
+        """
+        if self.options.checkpoint is None:
+            return None
+        elif self.options.checkpoint == 'sqrt':
+            return max(1, int(np.sqrt(self.n)))
+        else:
+            return int(self.options.checkpoint)
+
     # use the forward filter to filter the data
     # start: the place where the filter started
     # end: the place where the filter ended
@@ -202,6 +398,8 @@ class _dlm:
         if start > end:
             return None
 
+        self._maskMissingDates()
+
         # also we need to make we save consectively
 #        if save == 'all' and start > self.result.filteredSteps[1] + 1:
 #            raise NameError('The data before start date has yet to be
@@ -227,28 +425,25 @@ class _dlm:
                                 ' <filteredSteps> in <result> object.')
             self._setModelStatus(date=start - 1)
 
+        # we only keep the covariances on checkpoints if required
+        useCheckpoint = self.result.checkpointInterval is not None and \
+                        save == 'all' and not ForgetPrevious
+
+        # in the parallel mode, all dates are filtered at once if the model
+        # supports it
+        if self.options.parallel and save == 'all' and not ForgetPrevious \
+           and not useCheckpoint and not renew and \
+           self._parallelFilter(start, end):
+            self.result.lastRenewPoint = start
+            return None
+
         # we run the forward filter sequentially
         lastRenewPoint = start  # record the last renew point
         for step in range(start, end + 1):
 
-            # first check whether we need to update evaluation or not
-            if len(self.builder.dynamicComponents) > 0 or \
-               len(self.builder.automaticComponents) > 0:
-                self.builder.updateEvaluation(step)
-
-            # check if rewnew is needed
-            if renew and step - lastRenewPoint > self.builder.renewTerm \
-               and self.builder.renewTerm > 0.0:
-                # we renew the state of the day
-                self._resetModelStatus()
-                for innerStep in range(step - int(self.builder.renewTerm),
-                                       step):
-                    self.Filter.forwardFilter(self.builder.model,
-                                              self.data[innerStep])
-                lastRenewPoint = step
-
-            # then we use the updated model to filter the state
-            self.Filter.forwardFilter(self.builder.model, self.data[step])
+            lastRenewPoint = self._forwardStep(step=step,
+                                               renew=renew,
+                                               lastRenewPoint=lastRenewPoint)
 
             # extract the result and record
             if save == 'all' or save == step:
@@ -257,8 +452,657 @@ class _dlm:
                            step=step,
                            filterType='forwardFilter')
 
+            if useCheckpoint:
+                self._checkpoint(step=step,
+                                 renew=renew,
+                                 lastRenewPoint=lastRenewPoint)
+
+        if not ForgetPrevious:
+            self.result.lastRenewPoint = lastRenewPoint
+
 #        self.result.filteredSteps = (0, end)
 
+    def _forwardStep(self, step, renew, lastRenewPoint):
+        """ Run forward filter for one date on the current model status
+
+        Args:
+            step: the date to filter
+            renew: whether the renew strategy is used, see @_forwardFilter
+            lastRenewPoint: the date of the last renew
+
+        Returns:
+            The date of the last renew after this step
+        """
+        # first check whether we need to update evaluation or not
+        if len(self.builder.dynamicComponents) > 0 or \
+           len(self.builder.automaticComponents) > 0:
+            self.builder.updateEvaluation(step)
+
+        # check if rewnew is needed
+        if renew and step - lastRenewPoint > self.builder.renewTerm \
+           and self.builder.renewTerm > 0.0:
+            # we renew the state of the day
+            self._resetModelStatus()
+            for innerStep in range(step - int(self.builder.renewTerm),
+                                   step):
+                self.Filter.forwardFilter(
+                    self.builder.model, self.data[innerStep],
+                    dealWithMissingEvaluation=self._missingEvaluation(step))
+            lastRenewPoint = step
+
+        # then we use the updated model to filter the state
+        self.Filter.forwardFilter(
+            self.builder.model, self.data[step],
+            dealWithMissingEvaluation=self._missingEvaluation(step))
+        return lastRenewPoint
+
+    def _maskMissingDates(self):
+        """ Find the dates whose features of the dynamic components are
+        missing (NaN or None) once for a fit, so the filter only looks up a
+        flag for each date instead of scanning the evaluation.
+
+        """
+        missing = np.zeros(self.n, dtype=bool)
+        start = self._historyStart()
+        for name in self.builder.dynamicComponents:
+            features = self.builder.dynamicComponents[name].features
+            features = np.array([features[step]
+                                 for step in range(start, self.n)],
+                                dtype=float).reshape((self.n - start, -1))
+            missing[start:] |= np.isnan(features).any(axis=1)
+        self._missingDates = missing
+
+    def _missingEvaluation(self, step=None, model=None):
+        """ Whether the evaluation has missing features (NaN), which have to
+        be skipped by the filter. For a date of the data, the flag comes from
+        @_maskMissingDates. Otherwise (e.g., a new date or a streamed model)
+        the evaluation is checked.
+
+        """
+        if model is None:
+            if len(self.builder.dynamicComponents) == 0:
+                return False
+            if self._missingDates is not None and step is not None and \
+               step < len(self._missingDates):
+                return bool(self._missingDates[step])
+            model = self.builder.model
+        return bool(np.isnan(model.evaluation).any())
+
+    def _parallelFilter(self, start, end):
+        """ Run the forward filter from start to end with the parallel scan
+        of @parallelKalmanFilter, starting from the current model status.
+        The results are the same as the sequential filter.
+
+        The parallel filter needs the discount to inflate the whole latent
+        covariance by the same factor (all discounts equal 1, or a uniform
+        discount in the 'whole' innovation mode or on a single component),
+        the usual or the sqrt filter without the stored factors, and a
+        transition that keeps the range of the current covariance.
+
+        Returns:
+            True if the dates have been filtered, False if the model is not
+            supported, in which case nothing is changed.
+        """
+        discount = np.asarray(self.builder.discount).ravel()
+        if np.ptp(discount) > 0 or \
+           (discount[0] < 1.0 and
+            self.Filter.updateInnovation != 'whole' and
+            len(self.builder.componentIndex) > 1) or \
+           self.options.information or self.options.storeFactor or \
+           self.options.steadyTolerance is not None:
+            return False
+
+        model = self.builder.model
+        engine = parallelKalmanFilter(discount=discount[0],
+                                      workers=self.options.workers,
+                                      chunkSize=self.options.chunkSize)
+        basis = engine.reducedBasis(model.transition, model.sysVar)
+        if basis is None:
+            return False
+        evaluations = np.array([np.asarray(self._evaluationAt(step)).ravel()
+                                for step in range(start, end + 1)])
+
+        discountFirst = start == 0 or self.data[start - 1] is not None
+        step = start
+        for output in engine.forwardFilter(
+                transition=model.transition,
+                evaluations=evaluations,
+                data=[self.data[step] for step in range(start, end + 1)],
+                state=model.state,
+                sysVar=model.sysVar,
+                noiseVar=model.noiseVar,
+                df=model.df,
+                discountFirst=discountFirst,
+                basis=basis):
+            self._copyParallel(output, step)
+            step += len(output['df'])
+
+        # leave the model on the last date as the sequential filter
+        self._reverseCopy(model=model, result=self.result, step=end)
+        model.prediction.step = 0 if self.data[end] is not None else 1
+        return True
+
+    def _copyParallel(self, output, start):
+        """ Copy a chunk of the output of @parallelKalmanFilter to the result
+        from start on, in the same form as @_copy.
+
+        """
+        result = self.result
+        records = {}
+        for variable in output:
+            value = output[variable]
+            if variable == 'df':
+                records[variable] = [int(df) for df in value]
+            else:
+                if value.ndim == 1:
+                    value = value.reshape((-1, 1, 1))
+                elif value.ndim == 2:
+                    value = value[:, :, None]
+                records[variable] = [item.view(matrix) for item in value]
+
+        for variable in records:
+            record = getattr(result, variable)
+            for i, value in enumerate(records[variable]):
+                record[start + i] = value
+        for i in range(len(records['df'])):
+            result.filteredPrecision[start + i] = None
+            result.predictedPrecision[start + i] = None
+            y = self.data[start + i]
+            result.logLikelihood[start + i] = None if y is None else \
+                logPredictiveDensity(y, records['predictedObs'][i].item(),
+                                     records['predictedObsVar'][i].item(),
+                                     records['df'][i] - 1)
+
+    def _rollingFilter(self, start, end, windowLength):
+        """ Run the rolling window filter from start to end, where the
+        filtered result on each date only uses the data of the last
+        windowLength dates up to it.
+
+        For static models (all discounts equal 1) with an invertible
+        transition matrix, the window is moved incrementally
+        (@_incrementalRollingFilter). Otherwise the filter is re-run from
+        the prior on each window.
+
+        """
+        self._maskMissingDates()
+        transition = self.builder.model.transition
+        if np.min(self.builder.discount) >= 1.0 and \
+           np.linalg.matrix_rank(transition) == transition.shape[0]:
+            self._incrementalRollingFilter(start, end, windowLength)
+        else:
+            for today in range(start, end + 1):
+                self._forwardFilter(start=today - windowLength + 1,
+                                    end=today,
+                                    save=today,
+                                    ForgetPrevious=True)
+
+    def _incrementalRollingFilter(self, start, end, windowLength):
+        """ The rolling window filter for static models, at a cost per date
+        that does not depend on windowLength.
+
+        Without innovation, every observation in the window is a linear
+        function of the state on the last date, y_s = F_s G^{s - T} x_T. So
+        the window is summarized by sum(H_s'H_s), sum(H_s'y_s), sum(y_s^2)
+        and the number of observations, with H_s = F_s G^{s - T}. Moving
+        the window by one date moves these sums to the new date with G^{-1},
+        adds the new observation and subtracts the one leaving the window.
+        The status before the last date is then the posterior of the prior
+        (moved to that date) given the sums, and the last date is filtered
+        as usual, so the results are the same as re-running the filter on
+        the window. The sums are rebuilt every windowLength dates, which
+        keeps the rounding errors bounded.
+
+        """
+        model = self.builder.model
+        transition = model.transition
+        d = transition.shape[0]
+        inverse = np.linalg.inv(transition)
+        leave = np.linalg.matrix_power(inverse, windowLength - 1)
+
+        # the prior moved to the date before the last date of the window,
+        # with the covariance in the unit of the noise variance
+        power = self.builder.transitionPower(windowLength - 1)
+        noisePrior = self.builder.noiseVar[0, 0]
+        priorState = power * self.builder.statePrior
+        priorCov = power * self.builder.sysVarPrior * power.T / noisePrior
+        priorFactor = sqrtFactor(priorCov)
+
+        summary = None
+        for today in range(start, end + 1):
+            if (today - start) % windowLength == 0:
+                summary = self._windowSummary(
+                    first=today - windowLength + 1, last=today - 1,
+                    inverse=inverse)
+            A, b, c, k = summary
+
+            # the posterior on the date before today (Woodbury form with
+            # the prior covariance U * U', which does not need the inverse of
+            # the prior covariance)
+            cov = priorFactor * np.linalg.solve(
+                np.eye(d) + priorFactor.T * A * priorFactor, priorFactor.T)
+            g = b - A * priorState
+            ssr = c - 2 * (priorState.T * b)[0, 0] + \
+                (priorState.T * A * priorState)[0, 0] - (g.T * cov * g)[0, 0]
+            noiseVar = (noisePrior + ssr) / (1.0 + k)
+            model.state = priorState + cov * g
+            model.sysVar = noiseVar * cov
+            model.sysVarFactor = None
+            model.precision = None
+            model.information = None
+            model.noiseVar = np.matrix(noiseVar)
+            model.df = 1 + k
+            model.prediction.step = 0
+
+            # filter today and save the result
+            self._forwardStep(step=today, renew=False, lastRenewPoint=today)
+            self._copy(model=model,
+                       result=self.result,
+                       step=today,
+                       filterType='forwardFilter')
+
+            # move the window to end on today
+            A = inverse.T * A * inverse
+            b = inverse.T * b
+            y = self.data[today]
+            if y is not None:
+                H = self._evaluationAt(today)
+                A = A + H.T * H
+                b = b + H.T * y
+                c += y * y
+                k += 1
+            y = self.data[today - windowLength + 1]
+            if y is not None:
+                H = self._evaluationAt(today - windowLength + 1) * leave
+                A = A - H.T * H
+                b = b - H.T * y
+                c -= y * y
+                k -= 1
+            summary = [A, b, c, k]
+
+    def _windowSummary(self, first, last, inverse):
+        """ The sums of the observations from first to last on the last
+        date, see @_incrementalRollingFilter.
+
+        Returns:
+            A list of [sum(H'H), sum(H'y), sum(y^2), number of observations]
+        """
+        d = inverse.shape[0]
+        A = np.matrix(np.zeros((d, d)))
+        b = np.matrix(np.zeros((d, 1)))
+        c = 0.0
+        k = 0
+        for step in range(first, last + 1):
+            A = inverse.T * A * inverse
+            b = inverse.T * b
+            y = self.data[step]
+            if y is not None:
+                evaluation = self._evaluationAt(step)
+                A = A + evaluation.T * evaluation
+                b = b + evaluation.T * y
+                c += y * y
+                k += 1
+        return [A, b, c, k]
+
+    def _update(self, y, featureDict=None):
+        """ Add one observation and run the forward filter on it, continuing
+        from the last filtered date.
+
+        Args:
+            y: the new observation, could be None
+            featureDict: the features of all dynamic components on the new
+                         date, in a form of {component_name: feature}
+
+        Returns:
+            A tuple of (prediction error, predicted variance) of the new
+            observation. The error is None if y is None.
+        """
+        for name in self.builder.dynamicComponents:
+            if featureDict is None or name not in featureDict:
+                raise NameError('The feature of the dynamic component ' +
+                                name + ' has to be provided.')
+
+        # extend the data, the components and the result by one date
+        step = self.n
+        if isMissing(y):
+            y = None
+        self.data.append(y)
+        self.n += 1
+        self.result._appendResult(1)
+        for name in self.builder.dynamicComponents:
+            self.builder.dynamicComponents[name].appendNewData(
+                [featureDict[name]])
+        for name in self.builder.automaticComponents:
+            self.builder.automaticComponents[name].appendNewData([y])
+
+        # resume the model from the last filtered date. When the last
+        # observation is missing, the prediction continues from the last
+        # prediction as in the forward filter
+        model = self.builder.model
+        self._reverseCopy(model=model, result=self.result, step=step - 1)
+        model.prediction.step = 0 if self.data[step - 1] is not None else 1
+
+        renew = self._useRenew()
+        self.result.lastRenewPoint = self._forwardStep(
+            step=step, renew=renew, lastRenewPoint=self.result.lastRenewPoint)
+        self._copy(model=model,
+                   result=self.result,
+                   step=step,
+                   filterType='forwardFilter')
+        if self.result.checkpointInterval is not None:
+            self._checkpoint(step=step,
+                             renew=renew,
+                             lastRenewPoint=self.result.lastRenewPoint)
+        self.result.filteredSteps[1] = step
+        if self.result.fixedLagCache is not None:
+            self._fixedLagSmoother(start=step, end=step)
+        self.result.predictStatus = None
+        self._trimHistory()
+
+        predictedObsVar = model.prediction.obsVar.item()
+        if y is None:
+            return (None, predictedObsVar)
+        return (y - model.prediction.obs.item(), predictedObsVar)
+
+    def _filterStream(self, stream, saveHistory=False):
+        """ A generator that runs the forward filter on a stream of
+        observations, continuing from the last filtered date.
+
+        Without saveHistory, the filter runs on a private copy of the model
+        and keeps only what the next step needs: the lags of the auto
+        regressive components and the last renewTerm observations for the
+        stable mode. The dlm itself is not changed.
+
+        Args:
+            stream: an iterable of observations, or of (observation,
+                    featureDict) tuples with the features of all dynamic
+                    components, see @_update
+            saveHistory: whether to add the observations to the dlm and
+                         record the results, in which case each item is
+                         passed to @_update
+
+        Yields:
+            A dictionary of the step, see @_streamRecord
+        """
+        if saveHistory:
+            for item in stream:
+                y, featureDict = self._parseStreamItem(item)
+                self._update(y=y, featureDict=featureDict)
+                yield self._streamRecord(self.builder.model, y)
+            return
+
+        model = deepcopy(self.builder.model)
+        self._reverseCopy(model=model, result=self.result, step=self.n - 1)
+        model.prediction.step = 0 if self.data[-1] is not None else 1
+
+        lags = {}
+        for name in self.builder.automaticComponents:
+            comp = self.builder.automaticComponents[name]
+            if comp.componentType == 'autoReg':
+                lags[name] = list(comp.features[-1][1:]) + [self.data[-1]]
+
+        # the observations needed by the renew of the stable mode
+        renewTerm = 0
+        if self._useRenew() and self.builder.renewTerm > 0.0:
+            renewTerm = int(self.builder.renewTerm)
+        history = deque(self.data[max(0, self.n - renewTerm):],
+                        maxlen=renewTerm)
+        lastRenewPoint = self.result.lastRenewPoint
+
+        step = self.n
+        for item in stream:
+            y, featureDict = self._parseStreamItem(item)
+            if featureDict is not None:
+                featureDict = dict((name, [featureDict[name]])
+                                   for name in featureDict)
+            model.evaluation = matrix(self._predictionEvaluation(
+                date=step, featureDict=featureDict, lags=lags), dtype=float)
+            missing = self._missingEvaluation(model=model)
+
+            if renewTerm > 0 and \
+               step - lastRenewPoint > self.builder.renewTerm:
+                self._resetModelStatus(model)
+                for value in history:
+                    self.Filter.forwardFilter(
+                        model, value, dealWithMissingEvaluation=missing)
+                lastRenewPoint = step
+
+            self.Filter.forwardFilter(model, y,
+                                      dealWithMissingEvaluation=missing)
+            yield self._streamRecord(model, y)
+
+            history.append(y)
+            for name in lags:
+                lags[name] = lags[name][1:] + [y]
+            step += 1
+
+    def _parseStreamItem(self, item):
+        """ Split an item of the stream into the observation and the
+        featureDict.
+
+        """
+        if isinstance(item, tuple):
+            y, featureDict = item
+        else:
+            y, featureDict = item, None
+        if isMissing(y):
+            y = None
+        return (y, featureDict)
+
+    def _streamRecord(self, model, y):
+        """ The record of one step of the stream.
+
+        Returns:
+            A dictionary with the predicted and filtered observations and
+            their variances, the standardized prediction error and the log
+            predictive density of y (both None if y is None).
+        """
+        predictedObsVar = model.prediction.obsVar.item()
+        record = {'predictedObs': model.prediction.obs.item(),
+                  'predictedObsVar': predictedObsVar,
+                  'filteredObs': model.obs.item(),
+                  'filteredObsVar': model.obsVar.item(),
+                  'standardizedError': None,
+                  'logLikelihood': self._logLikelihood(model, y)}
+        if y is not None:
+            record['standardizedError'] = \
+                (y - record['predictedObs']) / np.sqrt(predictedObsVar)
+        return record
+
+    def _logLikelihood(self, model, y):
+        """ The log density of y under the one-step prediction of the model,
+        after the model has been filtered on y. Since the noise variance is
+        learned, the prediction is a Student-t distribution with the degree
+        of freedom before the update.
+
+        Returns:
+            The log density, or None if y is None.
+        """
+        if y is None:
+            return None
+        return logPredictiveDensity(y, model.prediction.obs.item(),
+                                    model.prediction.obsVar.item(),
+                                    model.df - 1)
+
+    def _checkpoint(self, step, renew, lastRenewPoint):
+        """ Record a checkpoint on the date if it is on the checkpoint
+        schedule, and release the covariances of the previous date if it is
+        not a checkpoint. The covariances of the last filtered date are
+        always kept.
+
+        """
+        if step % self.result.checkpointInterval == 0:
+            self.result.checkpoints[step] = \
+                (self.builder.model.prediction.step, lastRenewPoint, renew)
+            # the checkpoints that have left the history
+            if self.options.maxHistory is not None:
+                for date in list(self.result.checkpoints):
+                    if date <= step - self.options.maxHistory:
+                        del self.result.checkpoints[date]
+        if step > 0:
+            self._releaseCovariance(step - 1)
+
+    def _releaseCovariance(self, step, keep=None):
+        """ Drop the filtered and predicted covariances of a date unless the
+        date is a checkpoint or the date to keep.
+
+        """
+        if step in self.result.checkpoints or step == keep:
+            return None
+        self.result.filteredCov[step] = None
+        self.result.predictedCov[step] = None
+        self.result.filteredCovFactor[step] = None
+        self.result.predictedCovFactor[step] = None
+        self.result.filteredPrecision[step] = None
+        self.result.predictedPrecision[step] = None
+
+    def _replayForwardFilter(self, date):
+        """ Recompute the filtered results from the nearest checkpoint before
+        date up to date. This recovers the covariances that were dropped in
+        the checkpoint mode. The model status after the call is the filtered
+        status on date.
+
+        Returns:
+            The list of dates that have been recomputed
+        """
+        checkpoint = max([step for step in self.result.checkpoints
+                          if step <= date])
+        predictionStep, lastRenewPoint, renew = \
+            self.result.checkpoints[checkpoint]
+        self._reverseCopy(model=self.builder.model,
+                          result=self.result,
+                          step=checkpoint)
+        self.builder.model.prediction.step = predictionStep
+
+        for step in range(checkpoint + 1, date + 1):
+            lastRenewPoint = self._forwardStep(step=step,
+                                               renew=renew,
+                                               lastRenewPoint=lastRenewPoint)
+            self._copy(model=self.builder.model,
+                       result=self.result,
+                       step=step,
+                       filterType='forwardFilter')
+        return list(range(checkpoint + 1, date + 1))
+
+    def _fixedLagSmoother(self, start, end):
+        """ Keep the smoothed results of the last fixedLag dates up to date
+        after the forward filter has run from start to end.
+
+        When the window ends right before start, it is moved forward one
+        date at a time with the cached smoother gains (@_advanceFixedLag).
+        Otherwise the window is rebuilt on end (@_initFixedLag).
+
+        """
+        cache = self.result.fixedLagCache
+        if len(cache) > 0 and cache[-1][0] == start - 1:
+            for step in range(start, end + 1):
+                self._advanceFixedLag(step)
+        else:
+            self._initFixedLag(end)
+        self._fixedLagObs(end)
+        self.result.smoothedSteps = [cache[0][0], end]
+
+    def _initFixedLag(self, end):
+        """ Smooth the window of the fixed-lag smoother ending on end from the
+        filtered results and cache the smoother gains.
+
+        """
+        result = self.result
+        cache = result.fixedLagCache
+        cache.clear()
+        first = max(end - cache.maxlen + 1, result.filteredSteps[0],
+                    self._historyStart())
+        for step in range(first, end + 1):
+            gain = None
+            if step < end:
+                gain = self._smootherGain(step)
+            cache.append([step, self._evaluationAt(step), gain])
+
+        result.smoothedState[end] = result.filteredState[end]
+        result.smoothedCov[end] = self._covariance('filteredCov', end)
+        for step in range(end - 1, first - 1, -1):
+            gain = cache[step - first][2]
+            result.smoothedState[step] = result.filteredState[step] + \
+                np.dot(gain, result.smoothedState[step + 1] -
+                       result.predictedState[step + 1])
+            result.smoothedCov[step] = \
+                self._covariance('filteredCov', step) + \
+                np.dot(np.dot(gain, result.smoothedCov[step + 1] -
+                              self._covariance('predictedCov', step + 1)),
+                       gain.T)
+
+    def _advanceFixedLag(self, step):
+        """ Move the window of the fixed-lag smoother forward to a newly
+        filtered date.
+
+        The change of the smoothed state (covariance) on one date is the
+        change on the next date multiplied by the smoother gain (on both
+        sides). So the new date only propagates its correction backward over
+        the window with the cached gains, and the dates before the window
+        are left untouched.
+
+        Only the gain of the previous date is new, which costs one O(d^3)
+        inversion. The state correction costs O(L d^2) over the L dates of
+        the window, but the covariance correction costs O(L d^3): the filter
+        rescales the covariance with the learned noise variance, so the
+        correction is of full rank and has no cheap rank-1 form.
+
+        """
+        result = self.result
+        cache = result.fixedLagCache
+        cache[-1][2] = self._smootherGain(step - 1)
+        cache.append([step, self._evaluationAt(step), None])
+
+        deltaState = result.filteredState[step] - result.predictedState[step]
+        filteredCov = self._covariance('filteredCov', step)
+        deltaCov = filteredCov - self._covariance('predictedCov', step)
+        result.smoothedState[step] = result.filteredState[step]
+        result.smoothedCov[step] = filteredCov
+        for date, evaluation, gain in list(cache)[-2::-1]:
+            deltaState = np.dot(gain, deltaState)
+            deltaCov = np.dot(np.dot(gain, deltaCov), gain.T)
+            result.smoothedState[date] = result.smoothedState[date] + \
+                deltaState
+            result.smoothedCov[date] = result.smoothedCov[date] + deltaCov
+
+    def _smootherGain(self, step):
+        """ The gain of the backward smoother from step + 1 to step.
+
+        """
+        return self.Filter.smootherGain(
+            self.builder.model.transition,
+            self._covariance('filteredCov', step),
+            self._covariance('predictedCov', step + 1))
+
+    def _evaluationAt(self, step):
+        """ The evaluation of the model on step.
+
+        """
+        if len(self.builder.dynamicComponents) > 0 or \
+           len(self.builder.automaticComponents) > 0:
+            self.builder.updateEvaluation(step)
+        evaluation = self.builder.model.evaluation.copy()
+        evaluation[np.isnan(evaluation)] = 0.0
+        return evaluation
+
+    def _fixedLagObs(self, end):
+        """ Compute the smoothed observations over the window of the
+        fixed-lag smoother, using the noise variance on end as the backward
+        smoother does.
+
+        """
+        result = self.result
+        noiseVar = result.noiseVar[end]
+        for step, evaluation, gain in result.fixedLagCache:
+            if step == end:
+                result.smoothedObs[step] = result.filteredObs[step]
+                result.smoothedObsVar[step] = result.filteredObsVar[step]
+            else:
+                result.smoothedObs[step] = \
+                    np.dot(evaluation, result.smoothedState[step])
+                result.smoothedObsVar[step] = \
+                    np.dot(np.dot(evaluation, result.smoothedCov[step]),
+                           evaluation.T) + noiseVar
+
     # use the backward smooth to smooth the state
     # start: the last date of the backward filtering chain
     # days: number of days to go back from start
@@ -288,12 +1132,14 @@ class _dlm:
         if self.result.filteredSteps[1] < start:
             raise NameError('The last day has to be filtered before smoothing! \
             check the <filteredSteps> in <result> object.')
+        self._maskMissingDates()
 
         # and we record the most recent day which does not need to be smooth
         if start == self.n - 1 or ignoreFuture is True:
             self.result.smoothedState[start] = self.result.filteredState[start]
             self.result.smoothedObs[start] = self.result.filteredObs[start]
-            self.result.smoothedCov[start] = self.result.filteredCov[start]
+            self.result.smoothedCov[start] = \
+                self._covariance('filteredCov', start)
             self.result.smoothedObsVar[start] \
                 = self.result.filteredObsVar[start]
             self.builder.model.noiseVar = self.result.noiseVar[start]
@@ -309,15 +1155,29 @@ class _dlm:
         self.builder.model.state = self.result.smoothedState[start + 1]
         self.builder.model.sysVar = self.result.smoothedCov[start + 1]
 
+        # in the parallel mode, all dates are smoothed at once
+        if self.options.parallel and \
+           self.result.checkpointInterval is None:
+            self._parallelSmoother(start=start, end=end)
+            return None
+
+        # in the checkpoint mode, the dropped filtered covariances are
+        # recomputed segment by segment and released after use
+        lastFiltered = self.result.filteredSteps[1]
+        replayed = []
+
         # we smooth the result sequantially from start - 1 to end
         dates = list(range(end, start + 1))
         dates.reverse()
         for day in dates:
+            if not self._hasCovariance('filteredCov', day):
+                replayed.extend(self._replaySegment(day))
+
             # we first update the model to be correct status before smooth
             self.builder.model.prediction.state \
                 = self.result.predictedState[day + 1]
             self.builder.model.prediction.sysVar \
-                = self.result.predictedCov[day + 1]
+                = self._covariance('predictedCov', day + 1)
 
             if len(self.builder.dynamicComponents) > 0 or \
                len(self.builder.automaticComponents) > 0:
@@ -327,7 +1187,8 @@ class _dlm:
             self.Filter.backwardSmoother(
                 model=self.builder.model,
                 rawState=self.result.filteredState[day],
-                rawSysVar=self.result.filteredCov[day])
+                rawSysVar=self._covariance('filteredCov', day),
+                dealWithMissingEvaluation=self._missingEvaluation(day))
 
             # extract the result
             self._copy(model=self.builder.model,
@@ -335,8 +1196,81 @@ class _dlm:
                        step=day,
                        filterType='backwardSmoother')
 
+            # the covariances of the next day are no longer needed
+            if self.result.checkpointInterval is not None:
+                self._releaseCovariance(day + 1, keep=lastFiltered)
+                if day + 1 not in self.result.checkpoints and \
+                   day + 1 != self.n - 1:
+                    self.result.smoothedCov[day + 1] = None
+
+        for day in replayed:
+            self._releaseCovariance(day, keep=lastFiltered)
+
 #        self.result.smoothedSteps = (end, start)
 
+    def _parallelSmoother(self, start, end):
+        """ Run the backward smoother from start to end (start >= end) with
+        the parallel scan of @parallelKalmanFilter, starting from the
+        smoothed status in the model. The results are the same as the
+        sequential smoother.
+
+        """
+        model = self.builder.model
+        result = self.result
+        days = range(end, start + 1)
+        evaluations = np.array([np.asarray(self._evaluationAt(day)).ravel()
+                                for day in days])
+        engine = parallelKalmanFilter(workers=self.options.workers,
+                                      chunkSize=self.options.chunkSize)
+        outputs = engine.backwardSmoother(
+            transition=model.transition,
+            filteredStates=np.array([np.asarray(result.filteredState[day])
+                                     .ravel() for day in days]),
+            filteredCovs=np.array([self._covariance('filteredCov', day)
+                                   for day in days]),
+            predictedStates=np.array([np.asarray(result.predictedState[day + 1])
+                                      .ravel() for day in days]),
+            predictedCovs=np.array([self._covariance('predictedCov', day + 1)
+                                    for day in days]),
+            state=model.state,
+            sysVar=model.sysVar)
+
+        noiseVar = np.asarray(model.noiseVar).item()
+        day = start
+        for states, covs in outputs:
+            index = np.arange(day - end, day - end - len(states), -1)
+            F = evaluations[index]
+            obs = np.sum(F * states, axis=1).reshape((-1, 1, 1))
+            obsVar = np.einsum('ti,tij,tj->t', F, covs, F) + noiseVar
+            obsVar = obsVar.reshape((-1, 1, 1))
+            states = states[:, :, None]
+            for i in range(len(index)):
+                result.smoothedState[day] = states[i].view(matrix)
+                result.smoothedCov[day] = covs[i].view(matrix)
+                result.smoothedObs[day] = obs[i].view(matrix)
+                result.smoothedObsVar[day] = obsVar[i].view(matrix)
+                day -= 1
+
+        # leave the model on the last smoothed date as the sequential
+        # smoother
+        model.state = result.smoothedState[end]
+        model.sysVar = result.smoothedCov[end]
+        model.obs = result.smoothedObs[end]
+        model.obsVar = result.smoothedObsVar[end]
+
+    def _replaySegment(self, day):
+        """ Recompute the filtered covariances up to day from the nearest
+        checkpoint while keeping the current (smoothing) model status.
+
+        Returns:
+            The list of dates that have been recomputed
+        """
+        model = self.builder.model
+        status = (model.state, model.sysVar, model.noiseVar)
+        replayed = self._replayForwardFilter(day)
+        model.state, model.sysVar, model.noiseVar = status
+        return replayed
+
     # Forecast the result based on filtered chains
     def _predictInSample(self, date, days=1):
         """ Predict the model's status based on the model of a specific day
@@ -440,13 +1374,14 @@ class _dlm:
             if len(self.result.predictStatus[2]) >= comp.d:
                 feature = self.result.predictStatus[2][-comp.d:]
             else:
-                extra = comp.d - len(self.predictStatus[2])
-                feature = self.data[(currentDate - extra + 1):
-                                    (currentDate + 1)] + self.result.predictStatus[2]
+                extra = comp.d - len(self.result.predictStatus[2])
+                startDate = self.result.predictStatus[0]
+                feature = self.data[(startDate - extra + 1):
+                                    (startDate + 1)] + self.result.predictStatus[2]
             if featureDict is None:
                 featureDict = {}
 
-            featureDict[name] = feature
+            featureDict[name] = [np.asarray(x).item() for x in feature]
 
         self._constructEvaluationForPrediction(featureDict=featureDict,
                                                date=currentDate + 1)
@@ -457,6 +1392,594 @@ class _dlm:
         self.result.predictStatus[2].append(predictedObs)
         return (predictedObs, predictedObsVar)
 
+    def _predictN(self, N, date, featureDict=None, fullCovariance=False):
+        """ Predict the next N days after date in one pass.
+
+        The one-step prior (a, R) is computed once. The k-step predictive
+        distribution then follows from the transition powers, with
+        H_k = F_k G^(k - 1): the means are H_k a and the joint covariance of
+        the N observations is H R H' + noiseVar * I.
+
+        Args:
+            N: the number of days to predict
+            date: the prediction starts (based on the observation before and
+                  on this date)
+            featureDict: the features for the dynamic components in a form of
+                         {component_name: [feature_day1, ..., feature_dayN]}.
+                         See @_predictionEvaluation
+            fullCovariance: whether to return the joint covariance of the N
+                            predicted observations
+
+        Returns:
+            A tuple of (predicted means, predicted variances), both numpy
+            arrays of length N, plus the N x N covariance matrix if
+            fullCovariance is True.
+        """
+        if date > self.n - 1:
+            raise NameError('The date is beyond the data range.')
+        if N < 1:
+            raise NameError('N has to be a positive integer.')
+
+        # get the correct status of the model and the one-step prior
+        self._setModelStatus(date=date)
+        model = self.builder.model
+        model.prediction.step = 0
+        self.Filter.predict(model)
+        state = model.prediction.state
+        sysVar = model.prediction.sysVar
+
+        # the lagged observations used by the auto regressive components,
+        # the predicted means are appended as the prediction moves on
+        lags = {}
+        for name in self.builder.automaticComponents:
+            comp = self.builder.automaticComponents[name]
+            if comp.componentType == 'autoReg':
+                lags[name] = list(comp.features[date][1:]) + [self.data[date]]
+
+        H = np.zeros((N, self.builder.dimension))
+        predictedObs = np.zeros(N)
+        for k in range(N):
+            evaluation = self._predictionEvaluation(date=date + k + 1,
+                                                    featureDict=featureDict,
+                                                    index=k,
+                                                    lags=lags)
+            H[k, :] = np.dot(evaluation, self.builder.transitionPower(k))
+            predictedObs[k] = np.dot(H[k, :], state).item()
+            for name in lags:
+                lags[name].append(predictedObs[k])
+        power = self.builder.transitionPower(N - 1)
+
+        HR = np.dot(H, sysVar).A
+        noiseVar = model.noiseVar.item()
+        predictedObsVar = np.sum(HR * H, axis=1) + noiseVar
+
+        # leave the model at the last predicted day so that
+        # continuePredict can carry on
+        model.evaluation = matrix(evaluation)
+        model.prediction.state = np.dot(power, state)
+        model.prediction.sysVar = np.dot(np.dot(power, sysVar), power.T)
+        model.prediction.sysVarFactor = None
+        model.prediction.precision = None
+        model.prediction.obs = matrix(predictedObs[-1])
+        model.prediction.obsVar = matrix(predictedObsVar[-1])
+        model.prediction.step = N
+        self.result.predictStatus = [date, date + N, list(predictedObs)]
+
+        if fullCovariance:
+            return (predictedObs, predictedObsVar,
+                    np.dot(HR, H.T) + noiseVar * np.eye(N))
+        return (predictedObs, predictedObsVar)
+
+    def _predictAhead(self, days, date, featureDict=None):
+        """ Predict the observation days after date without computing the
+        days in between. The k-step prior is G^(k - 1) a and
+        G^(k - 1) R G^(k - 1)', with (a, R) the one-step prior, so only the
+        evaluation on the target day is needed.
+
+        Args:
+            days: the number of days ahead
+            date: the prediction starts (based on the observation before and
+                  on this date)
+            featureDict: the features of the dynamic components on the target
+                         day, in a form of {component_name: feature}
+
+        Returns:
+            A tuple of (predicted_mean, predicted_variance)
+        """
+        if date > self.n - 1:
+            raise NameError('The date is beyond the data range.')
+        if days < 1:
+            raise NameError('days has to be a positive integer.')
+        for name in self.builder.automaticComponents:
+            if self.builder.automaticComponents[name].componentType \
+               == 'autoReg' and days > 1:
+                raise NameError('Auto regressive components need the ' +
+                                'predictions in between. Use predictN ' +
+                                'instead.')
+
+        # get the correct status of the model and the one-step prior
+        self._setModelStatus(date=date)
+        model = self.builder.model
+        model.prediction.step = 0
+        self.Filter.predict(model)
+
+        if featureDict is not None:
+            featureDict = dict((name, [featureDict[name]])
+                               for name in featureDict)
+        evaluation = self._predictionEvaluation(date=date + days,
+                                                featureDict=featureDict)
+        H = np.dot(evaluation, self.builder.transitionPower(days - 1))
+        predictedObs = np.dot(H, model.prediction.state)
+        predictedObsVar = np.dot(np.dot(H, model.prediction.sysVar), H.T) + \
+                          model.noiseVar
+        return (predictedObs, predictedObsVar)
+
+    def _simulateForecast(self, N, nPaths, date, featureDict=None,
+                          seed=None):
+        """ Simulate N days of future observations after date.
+
+        The first state is drawn from the one-step prior N(a, R), whose
+        square root is computed once and shared by all paths. The following
+        days follow the same rule as @_predictN: the discount innovation is
+        only added on the first day, so the state then evolves as G theta.
+        The auto regressive features of each path are its own simulated
+        observations.
+
+        Args:
+            N: the number of days to simulate
+            nPaths: the number of paths
+            date: the simulation starts (based on the observation before and
+                  on this date)
+            featureDict: the features of the dynamic components, see
+                         @_predictN
+            seed: the seed of the random number generator
+
+        Returns:
+            A nPaths x N numpy array of the simulated observations
+        """
+        if date > self.n - 1:
+            raise NameError('The date is beyond the data range.')
+        if N < 1 or nPaths < 1:
+            raise NameError('N and nPaths have to be positive integers.')
+
+        random = np.random.RandomState(seed)
+
+        # get the correct status of the model and the one-step prior
+        self._setModelStatus(date=date)
+        model = self.builder.model
+        model.prediction.step = 0
+        self.Filter.predict(model)
+        transition = model.transition.A
+        noiseSd = np.sqrt(model.noiseVar.item())
+        d = self.builder.dimension
+
+        # the lags of the auto regressive components of every path
+        lags = {}
+        for name in self.builder.automaticComponents:
+            comp = self.builder.automaticComponents[name]
+            if comp.componentType == 'autoReg':
+                lag = list(comp.features[date][1:]) + [self.data[date]]
+                lags[name] = np.tile(np.array(lag, dtype=float),
+                                     (nPaths, 1))
+
+        paths = np.zeros((nPaths, N))
+        states = np.tile(model.prediction.state.A1, (nPaths, 1)) + \
+                 np.dot(random.standard_normal((nPaths, d)),
+                        sqrtFactor(model.prediction.sysVar.A).T)
+        for k in range(N):
+            if k > 0:
+                states = np.dot(states, transition.T)
+
+            # the evaluation shared by all paths, and the
+            # auto regressive features of each path
+            evaluation = self._predictionEvaluation(
+                date=date + k + 1, featureDict=featureDict, index=k,
+                lags=dict((name, [0.0] * lags[name].shape[1])
+                          for name in lags))
+            evaluations = np.repeat(evaluation, nPaths, axis=0)
+            for name in lags:
+                indx = self.builder.componentIndex[name]
+                evaluations[:, indx[0]:(indx[1] + 1)] = lags[name]
+
+            paths[:, k] = np.sum(evaluations * states, axis=1) + \
+                          noiseSd * random.standard_normal(nPaths)
+            for name in lags:
+                lags[name] = np.column_stack([lags[name][:, 1:],
+                                              paths[:, k]])
+        return paths
+
+    def _predictScenarios(self, date, features):
+        """ One day ahead prediction for many feature scenarios of the dynamic
+        components, sharing the one-step prior of the date.
+
+        Args:
+            date: the prediction starts (based on the observation before and
+                  on this date)
+            features: either an S x d_dynamic array whose columns are the
+                      features of all dynamic components in the order of the
+                      latent states, or a dictionary {component_name: S x d_i
+                      array}. Dynamic components not in the dictionary use
+                      their stored features on date + 1.
+
+        Returns:
+            A tuple of (predicted means, predicted variances), both numpy
+            arrays of length S
+        """
+        if date > self.n - 1:
+            raise NameError('The date is beyond the data range.')
+
+        # convert the feature array to the dictionary form
+        names = [name for name, comp in self.builder.getComponents()
+                 if name in self.builder.dynamicComponents]
+        if not isinstance(features, dict):
+            features = np.atleast_2d(np.array(features, dtype=float))
+            featureDict = {}
+            loc = 0
+            for name in names:
+                d = self.builder.dynamicComponents[name].d
+                featureDict[name] = features[:, loc:(loc + d)]
+                loc += d
+            if loc != features.shape[1]:
+                raise NameError('The features should have ' + str(loc) +
+                                ' columns, one for each dynamic feature.')
+        else:
+            featureDict = dict((name, np.atleast_2d(np.array(features[name],
+                                                             dtype=float)))
+                               for name in features)
+            for name in featureDict:
+                if name not in self.builder.dynamicComponents:
+                    raise NameError(name + ' is not a dynamic component.')
+        if len(featureDict) == 0:
+            raise NameError('No feature scenario is provided.')
+        S = [featureDict[name].shape[0] for name in featureDict]
+        if min(S) != max(S):
+            raise NameError('All components need the same number of ' +
+                            'scenarios.')
+
+        # get the correct status of the model and the one-step prior
+        self._setModelStatus(date=date)
+        model = self.builder.model
+        model.prediction.step = 0
+        self.Filter.predict(model)
+
+        # the evaluations of all scenarios
+        evaluation = self._predictionEvaluation(date=date + 1,
+                                                featureDict=featureDict)
+        evaluations = np.repeat(evaluation, S[0], axis=0)
+        for name in featureDict:
+            indx = self.builder.componentIndex[name]
+            evaluations[:, indx[0]:(indx[1] + 1)] = featureDict[name]
+
+        predictedObs = np.dot(evaluations, model.prediction.state).A1
+        predictedObsVar = np.sum(
+            np.dot(evaluations, model.prediction.sysVar).A * evaluations,
+            axis=1) + model.noiseVar.item()
+        return (predictedObs, predictedObsVar)
+
+    def _backtest(self, horizons):
+        """ Compute the h-step ahead predictions from every filtered date in
+        one sweep over the stored filtered states.
+
+        For origin t, the one-step prior is a = G m_t and R = (G C_t G') * K
+        (see @kalmanFilter.innovationScale), and the h-step prediction uses
+        H = F_(t + h) G^(h - 1), the same as @_predictAhead. The evaluations
+        use the stored features, i.e., the auto regressive features are the
+        observed data.
+
+        Args:
+            horizons: a list of positive integers
+
+        Returns:
+            A tuple of (predicted means, predicted variances, metrics). The
+            means and variances are n x len(horizons) numpy arrays indexed by
+            the origin date, with nan if the target date is beyond the data.
+            The metrics is a dictionary of the mean squared error 'mse' and
+            the mean absolute error 'mae' for each horizon.
+        """
+        for h in horizons:
+            if h < 1:
+                raise NameError('The horizons have to be positive integers.')
+        covs = [self._covariance('filteredCov', step)
+                for step in range(self.n)]
+        if self.options.maxHistory is not None or \
+           any(x is None for x in covs):
+            raise NameError('The backtest needs the filtered covariances ' +
+                            'of all dates.')
+
+        n = self.n
+        model = self.builder.model
+        transition = model.transition.A
+        states = np.array([np.ravel(x) for x in self.result.filteredState])
+        covs = np.array([x.A for x in covs])
+        noiseVar = np.array([np.asarray(x).item()
+                             for x in self.result.noiseVar])
+
+        # the one-step priors of all origins
+        priorStates = np.dot(states, transition.T)
+        priorCovs = np.einsum('ij,tjk,lk->til', transition, covs, transition)
+        priorCovs *= self.Filter.innovationScale()
+
+        # the evaluations of all dates
+        evaluations = np.array([np.asarray(self._evaluationAt(step)).ravel()
+                                for step in range(n)])
+
+        mean = np.full((n, len(horizons)), np.nan)
+        var = np.full((n, len(horizons)), np.nan)
+        for j, h in enumerate(horizons):
+            if h >= n:
+                continue
+            H = np.dot(evaluations[h:], self.builder.transitionPower(h - 1).A)
+            mean[:(n - h), j] = np.sum(H * priorStates[:(n - h)], axis=1)
+            var[:(n - h), j] = np.einsum('ti,tij,tj->t', H,
+                                         priorCovs[:(n - h)], H) + \
+                               noiseVar[:(n - h)]
+
+        # the accuracy against the observed data
+        data = np.array([np.nan if x is None else x for x in self.data],
+                        dtype=float)
+        metrics = {'mse': np.full(len(horizons), np.nan),
+                   'mae': np.full(len(horizons), np.nan)}
+        for j, h in enumerate(horizons):
+            if h >= n:
+                continue
+            error = data[h:] - mean[:(n - h), j]
+            error = error[~np.isnan(error)]
+            if len(error) > 0:
+                metrics['mse'][j] = np.mean(error ** 2)
+                metrics['mae'][j] = np.mean(np.abs(error))
+        return (mean, var, metrics)
+
+    def _tune(self, space, metric, nSamples, workers, stopMargin, seed):
+        """ Evaluate the candidate discounts and noise priors with
+        @discountTuner, see @dlm.tune.
+
+        Returns:
+            A tuple of (the best configuration, the results table)
+        """
+        names = [name for name in space if name != 'noisePrior']
+        for name in names:
+            self._checkComponent(name)
+        configs = self._tuneCandidates(space, nSamples, seed)
+
+        # the discount vector of each candidate, with the components that
+        # are not tuned keeping their discount
+        baseDiscount = np.array(self.builder.discount, dtype=float).ravel()
+        candidates = []
+        for config in configs:
+            discount = baseDiscount.copy()
+            for name in names:
+                start, end = self.builder.componentIndex[name]
+                discount[start:(end + 1)] = config[name]
+            candidates.append((discount, config.get('noisePrior')))
+
+        if self.options.stable and self.options.stableMethod == 'sqrt':
+            Filter = sqrtKalmanFilter(
+                discount=baseDiscount,
+                updateInnovation=self.options.innovationType,
+                index=self.builder.componentIndex)
+        else:
+            Filter = kalmanFilter(
+                discount=baseDiscount,
+                updateInnovation=self.options.innovationType,
+                index=self.builder.componentIndex)
+        model = deepcopy(self.builder.model)
+        self._resetModelStatus(model)
+        evaluations = np.array([np.asarray(self._evaluationAt(step)).ravel()
+                                for step in range(self.n)])
+
+        tuner = discountTuner(metric=metric, workers=workers,
+                              stopMargin=stopMargin)
+        results = tuner.evaluate(Filter=Filter, model=model,
+                                 evaluations=evaluations, data=self.data,
+                                 candidates=candidates)
+
+        observed = max(1, sum(1 for y in self.data if y is not None))
+        table = []
+        for config, (loss, stoppedAt) in zip(configs, results):
+            row = dict(config)
+            row[metric] = None
+            if stoppedAt is None:
+                row[metric] = -loss if metric == 'loglik' else \
+                              loss / observed
+            row['stoppedAt'] = stoppedAt
+            table.append(row)
+
+        finished = [row for row in table if row[metric] is not None]
+        if len(finished) == 0:
+            raise NameError('All candidates failed in the forward filter.')
+        sign = -1.0 if metric == 'loglik' else 1.0
+        best = min(finished, key=lambda row: sign * row[metric])
+        return (dict((name, best[name]) for name in configs[0]), table)
+
+    def _optimizeDiscount(self, names, bounds, maxIter, tol):
+        """ Maximize the log-likelihood over the discounts of the components
+        with @discountOptimizer, see @dlm.optimizeDiscount.
+
+        Returns:
+            A tuple of (the best discounts, the path of the search)
+        """
+        for name in names:
+            self._checkComponent(name)
+        lower = []
+        upper = []
+        for name in names:
+            low, high = bounds[name] if isinstance(bounds, dict) else bounds
+            if not 0.0 < low <= high <= 1.0:
+                raise NameError('The bounds of the discount have to be ' +
+                                'within (0, 1].')
+            lower.append(low)
+            upper.append(high)
+
+        Filter = kalmanFilter(discount=self.builder.discount,
+                              updateInnovation=self.options.innovationType,
+                              index=self.builder.componentIndex)
+        model = deepcopy(self.builder.model)
+        self._resetModelStatus(model)
+        evaluations = np.array([np.asarray(self._evaluationAt(step)).ravel()
+                                for step in range(self.n)])
+
+        optimizer = discountOptimizer(
+            Filter=Filter, model=model, evaluations=evaluations,
+            data=self.data,
+            groups=[self.builder.componentIndex[name] for name in names])
+        discount, logLikelihood, path = optimizer.optimize(
+            start=np.array(self.builder.discount, dtype=float).ravel(),
+            lower=lower, upper=upper, maxIter=maxIter, tol=tol)
+
+        best = dict((name, discount[self.builder.componentIndex[name][0]])
+                    for name in names)
+        rows = []
+        for values, value in path:
+            row = dict(zip(names, values))
+            row['loglik'] = value
+            rows.append(row)
+        return (best, rows)
+
+    def _emStep(self):
+        """ The M-step of @dlm.fitPrior. It updates the prior of the latent
+        states of each component and the noise prior in closed form from the
+        stored smoothed moments, which are the E-step.
+
+        The prior is the status one date before the first date, so the
+        smoothed state of the first date is moved back one more step with the
+        gain of the smoother. The noise prior is the average of the expected
+        squared residuals, E[(y_t - F_t x_t)^2] = (y_t - F_t s_t)^2 +
+        F_t S_t F_t', over the observed dates, with s_t and S_t the smoothed
+        mean and covariance. The covariances between the components are not
+        kept, as the priors are set by component.
+
+        """
+        if self.result.smoothedSteps != [0, self.n - 1]:
+            raise NameError('The EM step needs the smoothed results of ' +
+                            'all dates.')
+
+        # the smoothed prior status
+        statePrior = self.builder.statePrior
+        sysVarPrior = self.builder.sysVarPrior
+        predictedCov = self._covariance('predictedCov', 0)
+        gain = self.Filter.smootherGain(self.builder.model.transition,
+                                        sysVarPrior, predictedCov)
+        state = statePrior + np.dot(
+            gain, self.result.smoothedState[0] - self.result.predictedState[0])
+        cov = sysVarPrior + np.dot(np.dot(
+            gain, self.result.smoothedCov[0] - predictedCov), gain.T)
+
+        # the smoother loses precision in the directions with little
+        # uncertainty, so the covariance is projected back to be positive
+        # semi-definite
+        eigenvalues, eigenvectors = np.linalg.eigh(
+            np.asarray(cov + cov.T) / 2.0)
+        cov = np.matrix(np.dot(eigenvectors * np.maximum(eigenvalues, 0.0),
+                               eigenvectors.T))
+
+        # the expected squared residuals
+        total = 0.0
+        count = 0
+        for step in range(self.n):
+            y = self.data[step]
+            if y is None:
+                continue
+            evaluation = self._evaluationAt(step)
+            err = y - np.dot(evaluation, self.result.smoothedState[step]).item()
+            total += err * err + np.dot(np.dot(
+                evaluation, self.result.smoothedCov[step]), evaluation.T).item()
+            count += 1
+        if count == 0:
+            raise NameError('There is no observed data.')
+
+        for name, comp in self.builder.getComponents():
+            start, end = self.builder.componentIndex[name]
+            comp.meanPrior = matrix(state[start:(end + 1), :])
+            comp.covPrior = matrix(cov[start:(end + 1), start:(end + 1)])
+        self.options.noise = total / count
+        self.initialized = False
+
+    def _savePrior(self):
+        """ Copy the priors that @_emStep changes. """
+        return ({name: (comp.meanPrior.copy(), comp.covPrior.copy())
+                 for name, comp in self.builder.getComponents()},
+                self.options.noise)
+
+    def _restorePrior(self, priors):
+        """ Restore the priors copied by @_savePrior. """
+        components, noise = priors
+        for name, comp in self.builder.getComponents():
+            comp.meanPrior, comp.covPrior = components[name]
+        self.options.noise = noise
+        self.initialized = False
+
+    def _tuneCandidates(self, space, nSamples, seed):
+        """ The candidate configurations of @_tune. When all values of space
+        are lists, the candidates are the full grid. Otherwise nSamples
+        candidates are drawn, uniformly within the (low, high) bounds and
+        from the lists.
+
+        Returns:
+            A list of {name: value}
+        """
+        if len(space) == 0:
+            raise NameError('Nothing to tune.')
+        for name in space:
+            if isinstance(space[name], tuple) and len(space[name]) != 2:
+                raise NameError('The bounds of ' + name + ' have to be ' +
+                                'a (low, high) tuple.')
+
+        names = list(space)
+        if not any(isinstance(space[name], tuple) for name in names):
+            return [dict(zip(names, values))
+                    for values in product(*[list(space[name])
+                                            for name in names])]
+
+        generator = np.random.RandomState(seed)
+        configs = []
+        for i in range(nSamples):
+            config = {}
+            for name in names:
+                if isinstance(space[name], tuple):
+                    config[name] = generator.uniform(*space[name])
+                else:
+                    values = list(space[name])
+                    config[name] = values[generator.randint(len(values))]
+            configs.append(config)
+        return configs
+
+    def _predictionEvaluation(self, date, featureDict=None, index=0,
+                              lags=None):
+        """ Build the evaluation vector on a given date for prediction without
+        changing the model.
+
+        Args:
+            date: the date of the evaluation
+            featureDict: {component_name: list of features}. The index-th
+                         feature is used for the component. Components not
+                         in featureDict use their stored features on date.
+            index: the position of the date in the lists of featureDict
+            lags: {autoReg_name: lagged observations}, the last degree
+                  entries are used as the auto regressive features
+
+        Returns:
+            A 1 x d numpy array
+        """
+        evaluation = np.array(self.builder.model.evaluation, dtype=float)
+        for name, comp in self.builder.getComponents():
+            if name in self.builder.staticComponents:
+                continue
+            indx = self.builder.componentIndex[name]
+            if lags is not None and name in lags:
+                feature = lags[name][-comp.d:]
+            elif featureDict is not None and name in featureDict:
+                feature = featureDict[name][index]
+            else:
+                if name in self.builder.dynamicComponents and \
+                   date >= comp.n:
+                    raise NameError('The features for component ' + name +
+                                    ' have to be provided for the dates' +
+                                    ' beyond the data.')
+                comp.updateEvaluation(date)
+                feature = comp.evaluation
+            evaluation[0, indx[0]:(indx[1] + 1)] = np.ravel(feature)
+        return evaluation
+
     def _constructEvaluationForPrediction(self,
                                           featureDict=None,
                                           date=None):
@@ -514,6 +2037,253 @@ class _dlm:
                         (self.builder.componentIndex[i][1] + 1)] = comp.evaluation
         self.builder.model.evaluation = matrix(self.builder.model.evaluation)
 
+# =========================== model persistence ==============================
+
+    # the quantities of the last filtered date needed to resume the model
+    _stateRecords = ['filteredObs', 'predictedObs', 'filteredObsVar',
+                     'predictedObsVar', 'noiseVar', 'df',
+                     'filteredState', 'predictedState',
+                     'filteredCov', 'predictedCov']
+
+    # the per-date records that are saved in columns (without covariances)
+    _columnRecords = ['filteredObs', 'predictedObs', 'smoothedObs',
+                      'filteredObsVar', 'predictedObsVar', 'smoothedObsVar',
+                      'noiseVar', 'df', 'logLikelihood',
+                      'filteredState', 'predictedState', 'smoothedState']
+
+    def _saveState(self, path, includeResult=False):
+        """ Save the model layout, the options, the discount and the status
+        of the last filtered date to a .npz file.
+
+        Args:
+            path: the file (or file object) to write to.
+            includeResult: whether to save the per-date results as well.
+                           The covariances are saved for the last date only.
+        """
+        if includeResult and self.options.maxHistory is not None:
+            raise NameError('The per-date results cannot be saved when ' +
+                            'only the recent history is kept.')
+
+        last = self.result.filteredSteps[1]
+        names = [name for name, comp in self.builder.getComponents()]
+        snapshot = {
+            'names': np.array(names),
+            'index': np.array([self.builder.componentIndex[name]
+                               for name in names], dtype=int),
+            'discount': np.array(self.builder.discount, dtype=float),
+            'innovationType': np.array(self.options.innovationType),
+            'noise': np.array(self.options.noise, dtype=float),
+            'stable': np.array(self.options.stable),
+            'stableMethod': np.array(self.options.stableMethod),
+            'storeFactor': np.array(self.options.storeFactor),
+            'information': np.array(self.options.information),
+            'steadyTolerance': np.array(
+                np.nan if self.options.steadyTolerance is None
+                else self.options.steadyTolerance, dtype=float),
+            'checkpoint': np.array(
+                '' if self.options.checkpoint is None
+                else str(self.options.checkpoint)),
+            'maxHistory': np.array(
+                -1 if self.options.maxHistory is None
+                else self.options.maxHistory),
+            'date': np.array(last),
+            'lastRenewPoint': np.array(self.result.lastRenewPoint),
+            'filteredSteps': np.array(self.result.filteredSteps),
+            'smoothedSteps': np.array(self.result.smoothedSteps)}
+
+        # the recent data replayed by the renew and the features of the
+        # saved date, so that a dlm without the history can be resumed
+        if self._useRenew():
+            first = max(self._historyStart(),
+                        last - int(self.builder.renewTerm))
+        else:
+            first = last
+        snapshot['recentData'] = np.array(
+            [np.nan if self.data[step] is None else self.data[step]
+             for step in range(first, last + 1)], dtype=float)
+        for name, comp in self._featureComponents():
+            snapshot['features_' + name] = \
+                np.array(comp.features[last], dtype=float)
+
+        for variable in self._stateRecords:
+            snapshot['last_' + variable] = \
+                np.array(self._covariance(variable, last), dtype=float)
+
+        if includeResult:
+            for variable in self._columnRecords:
+                records = getattr(self.result, variable)[:(last + 1)]
+                if variable == 'logLikelihood':
+                    # the missing dates have no log-likelihood
+                    records = [np.nan if item is None else item
+                               for item in records]
+                if any(item is None for item in records):
+                    continue
+                snapshot['result_' + variable] = \
+                    np.array([np.array(item, dtype=float).ravel()
+                              for item in records])
+
+        np.savez(path, **snapshot)
+
+    def _loadState(self, path):
+        """ Restore the model from a file written by _saveState. The dlm needs
+        to have the same components as the one that was saved, and it is put
+        in the same modes (sqrt, storeFactor, information, steady state,
+        checkpoint and history). The forward filter and the prediction can
+        continue from the saved date without refitting.
+
+        A dlm that holds fewer dates than the saved one is cold started: its
+        data (and features) are taken as the dates after the saved one, see
+        @_coldStart.
+
+        Args:
+            path: the file (or file object) to read from.
+        """
+        snapshot = np.load(path)
+        date = int(snapshot['date'])
+
+        # restore the options and the layout
+        self.options.innovationType = str(snapshot['innovationType'])
+        self.options.noise = float(snapshot['noise'])
+        self.options.stable = bool(snapshot['stable'])
+        if 'stableMethod' in snapshot.files:
+            self.options.stableMethod = str(snapshot['stableMethod'])
+        if 'maxHistory' in snapshot.files:
+            self.options.storeFactor = bool(snapshot['storeFactor'])
+            self.options.information = bool(snapshot['information'])
+            tolerance = float(snapshot['steadyTolerance'])
+            self.options.steadyTolerance = \
+                None if np.isnan(tolerance) else tolerance
+            checkpoint = str(snapshot['checkpoint'])
+            self.options.checkpoint = \
+                None if checkpoint == '' else \
+                checkpoint if checkpoint == 'sqrt' else int(checkpoint)
+            maxHistory = int(snapshot['maxHistory'])
+            self.options.maxHistory = None if maxHistory < 0 else maxHistory
+
+        if date > self.n - 1:
+            if 'recentData' not in snapshot.files:
+                raise NameError('The saved state is beyond the data range.')
+            self._coldStart(snapshot, date)
+        self._initialize()
+
+        names = [str(name) for name in snapshot['names']]
+        if names != [name for name, comp in self.builder.getComponents()]:
+            raise NameError('The components of the dlm do not match the' +
+                            ' saved state.')
+        for name, indx in zip(names, snapshot['index']):
+            if tuple(indx) != self.builder.componentIndex[name]:
+                raise NameError('The dimension of ' + name + ' does not' +
+                                ' match the saved state.')
+        self.builder.discount = snapshot['discount']
+        self.Filter.updateDiscount(self.builder.discount)
+
+        # restore the results
+        saved = [variable for variable in self._columnRecords
+                 if 'result_' + variable in snapshot]
+        for variable in saved:
+            column = snapshot['result_' + variable]
+            records = getattr(self.result, variable)
+            for step in range(len(column)):
+                records[step] = self._toRecord(variable, column[step])
+
+        for variable in self._stateRecords:
+            value = snapshot['last_' + variable]
+            getattr(self.result, variable)[date] = \
+                self._toRecord(variable, value)
+
+        if 'filteredState' in saved:
+            self.result.filteredSteps = [0, date]
+        else:
+            self.result.filteredSteps = [date, date]
+        if 'smoothedState' in saved:
+            self.result.smoothedSteps = \
+                [int(step) for step in snapshot['smoothedSteps']]
+        if 'lastRenewPoint' in snapshot.files:
+            self.result.lastRenewPoint = int(snapshot['lastRenewPoint'])
+        self.result.filteredType = 'non-rolling'
+        self._setModelStatus(date=date)
+
+    def _coldStart(self, snapshot, date):
+        """ Put the data of the dlm after the saved date, so a service can
+        resume from a snapshot without the full history. The dates up to the
+        saved one are filled from the snapshot: the recent data needed by the
+        renew and the features of the saved date are restored, and the older
+        dates read as missing. The autoReg features are rebuilt from the
+        restored data.
+
+        Args:
+            snapshot: the loaded snapshot from @_saveState.
+            date: the saved date.
+        """
+        recent = [None if np.isnan(value) else float(value)
+                  for value in snapshot['recentData']]
+        self.data = self._restoreHistory(date, recent, list(self.data))
+        self.n = len(self.data)
+        for name, comp in self._featureComponents():
+            if 'features_' + name not in snapshot.files:
+                raise NameError('The features of ' + name + ' are not in' +
+                                ' the saved state.')
+            feature = snapshot['features_' + name].tolist()
+            if comp.componentType == 'autoReg':
+                comp.features = self._restoreHistory(
+                    date, [feature], [], missing=feature)
+                comp.lastDay = recent[-1]
+                comp.n = date + 1
+                if self.n > date + 1:
+                    comp.appendNewData(self.data[(date + 1):])
+            else:
+                comp.features = self._restoreHistory(
+                    date, [feature], list(comp.features),
+                    missing=[np.nan] * comp.d)
+                comp.n = len(comp.features)
+        for name in self.builder.automaticComponents:
+            comp = self.builder.automaticComponents[name]
+            if comp.componentType == 'longSeason':
+                comp.n = self.n
+
+    def _restoreHistory(self, date, recent, later, missing=None):
+        """ The records of a cold started dlm: the dates up to date, of
+        which only the last ones (recent) are known and the older ones are
+        filled by missing, followed by the later dates. In the history mode,
+        the dates out of the window are not materialized.
+
+        """
+        older = date + 1 - len(recent)
+        maxHistory = self.options.maxHistory
+        if maxHistory is None:
+            return [missing] * older + recent + later
+
+        history = ringBuffer(maxHistory)
+        dropped = min(older, max(0, date + 1 + len(later) - maxHistory))
+        history.grow(dropped)
+        history.extend([missing] * (older - dropped) + recent + later)
+        return history
+
+    def _featureComponents(self):
+        """ The components whose features are stored, i.e., the dynamic and
+        the autoReg components.
+
+        """
+        components = list(self.builder.dynamicComponents.items())
+        for name in self.builder.automaticComponents:
+            comp = self.builder.automaticComponents[name]
+            if comp.componentType == 'autoReg':
+                components.append((name, comp))
+        return components
+
+    def _toRecord(self, variable, value):
+        """ Turn a saved array back into the form stored in _result
+
+        """
+        if variable == 'df':
+            return int(value)
+        if variable == 'logLikelihood':
+            value = float(value)
+            return None if np.isnan(value) else value
+        if variable in ['filteredState', 'predictedState', 'smoothedState']:
+            return matrix(value).reshape((-1, 1))
+        return matrix(value)
+
 # =========================== model helper function ==========================
 
     # to set model to a specific date
@@ -526,23 +2296,44 @@ class _dlm:
             raise NameError('The date has yet to be filtered yet. ' +
                             'Check the <filteredSteps> in <result> object.')
 
+        replayed = []
+        if not self._hasCovariance('filteredCov', date):
+            if len([step for step in self.result.checkpoints
+                    if step <= date]) == 0:
+                raise NameError('The filtered covariance on this date is' +
+                                ' not available.')
+
+            # recover the status from the nearest checkpoint
+            replayed = self._replayForwardFilter(date)
+
         self._reverseCopy(model=self.builder.model,
                           result=self.result,
                           step=date)
+        for step in replayed:
+            self._releaseCovariance(step, keep=self.result.filteredSteps[1])
         if len(self.builder.dynamicComponents) > 0 or \
            len(self.builder.automaticComponents) > 0:
             self.builder.updateEvaluation(date)
 
     # reset model to initial status
-    def _resetModelStatus(self):
+    def _resetModelStatus(self, model=None):
         """ Reset the model to the prior status
 
+        Args:
+            model: the model to reset. Default to the model of the builder.
         """
-        self.builder.model.state = self.builder.statePrior
-        self.builder.model.sysVar = self.builder.sysVarPrior
-        self.builder.model.noiseVar = self.builder.noiseVar
-        self.builder.model.df = 1
-        self.builder.model.initializeObservation()
+        if model is None:
+            model = self.builder.model
+        model.state = self.builder.statePrior
+        model.sysVar = self.builder.sysVarPrior
+        model.sysVarFactor = None
+        model.precision = None
+        model.information = None
+        model.noiseVar = self.builder.noiseVar
+        model.df = 1
+        # the next prediction starts from the prior state
+        model.prediction.step = 0
+        model.initializeObservation()
 
     # a function used to copy result from the model to the result
     def _copy(self, model, result, step, filterType):
@@ -557,10 +2348,21 @@ class _dlm:
             result.predictedObsVar[step] = model.prediction.obsVar
             result.filteredState[step] = model.state
             result.predictedState[step] = model.prediction.state
-            result.filteredCov[step] = model.sysVar
-            result.predictedCov[step] = model.prediction.sysVar
+            if self.options.storeFactor:
+                result.filteredCovFactor[step] = model.sysVarFactor
+                result.predictedCovFactor[step] = \
+                    model.prediction.sysVarFactor
+            else:
+                result.filteredCov[step] = self._fromFactor(
+                    model.sysVar, model.sysVarFactor)
+                result.predictedCov[step] = self._fromFactor(
+                    model.prediction.sysVar, model.prediction.sysVarFactor)
+                result.filteredPrecision[step] = model.precision
+                result.predictedPrecision[step] = model.prediction.precision
             result.noiseVar[step] = model.noiseVar
             result.df[step] = model.df
+            result.logLikelihood[step] = self._logLikelihood(model,
+                                                             self.data[step])
 
         elif filterType == 'backwardSmoother':
             result.smoothedState[step] = model.state
@@ -579,11 +2381,72 @@ class _dlm:
         model.prediction.obsVar = result.predictedObsVar[step]
         model.state = result.filteredState[step]
         model.prediction.state = result.predictedState[step]
-        model.sysVar = result.filteredCov[step]
-        model.prediction.sysVar = result.predictedCov[step]
+        model.sysVarFactor = result.filteredCovFactor[step]
+        model.prediction.sysVarFactor = result.predictedCovFactor[step]
+        model.precision = result.filteredPrecision[step]
+        model.prediction.precision = result.predictedPrecision[step]
+        model.information = None
+        # the information filter and the square root filter compute the
+        # covariances when needed
+        if model.precision is None and model.sysVarFactor is None:
+            model.sysVar = self._covariance('filteredCov', step)
+            model.prediction.sysVar = self._covariance('predictedCov', step)
+        else:
+            model.sysVar = None
+            model.prediction.sysVar = None
         model.noiseVar = result.noiseVar[step]
         model.df = result.df[step]
 
+    def _covarianceRange(self, variable, start, end):
+        """ Get the covariance records from start to end (exclusive), see
+        @_covariance.
+
+        """
+        end = min(end, len(getattr(self.result, variable)))
+        return [self._covariance(variable, step)
+                for step in range(start, end)]
+
+    def _covariance(self, variable, step):
+        """ Get the covariance record of a date. When the factors of the
+        covariances are stored instead (see @sqrtKalmanFilter), the
+        covariance is computed from the factor. When the precisions are
+        stored (see @infoKalmanFilter), it is the inverse of the precision.
+
+        """
+        cov = getattr(self.result, variable)[step]
+        if cov is None and variable + 'Factor' in self.result.records:
+            cov = self._fromFactor(
+                cov, getattr(self.result, variable + 'Factor')[step])
+            precision = getattr(self.result,
+                                variable.replace('Cov', 'Precision'))[step]
+            if precision is not None:
+                cov = np.matrix(np.linalg.inv(precision))
+        return cov
+
+    def _fromFactor(self, cov, factor):
+        """ The covariance, computed from its factor when only the factor is
+        kept (see @sqrtKalmanFilter).
+
+        """
+        if cov is None and factor is not None:
+            return np.dot(factor, factor.T)
+        return cov
+
+    def _hasCovariance(self, variable, step):
+        """ Whether the covariance of a date is available, without
+        computing it, see @_covariance.
+
+        """
+        if getattr(self.result, variable)[step] is not None:
+            return True
+        if variable + 'Factor' in self.result.records:
+            return getattr(self.result, variable + 'Factor')[step] \
+                is not None or \
+                getattr(self.result,
+                        variable.replace('Cov', 'Precision'))[step] \
+                is not None
+        return False
+
     # check if the data size matches the dynamic features
     def _checkFeatureSize(self):
         """ Check features's n matches the data's n
@@ -706,11 +2569,13 @@ class _dlm:
                  else x[indx[0]:(indx[1] + 1), indx[0]:(indx[1] + 1)]
 
         if filterType == 'forwardFilter':
-            return list(map(patten, self.result.filteredCov[start:end]))
+            return list(map(patten, self._covarianceRange('filteredCov',
+                                                          start, end)))
         elif filterType == 'backwardSmoother':
             return list(map(patten, self.result.smoothedCov[start:end]))
         elif filterType == 'predict':
-            return list(map(patten, self.result.predictedCov[start:end]))
+            return list(map(patten, self._covarianceRange('predictedCov',
+                                                          start, end)))
         else:
             raise NameError('Incorrect filter type')
 
@@ -764,6 +2629,10 @@ class _dlm:
                                           start=start, end=end)
         result = []
         for k, i in enumerate(range(start, end)):
+            # the covariance is not kept for this date (checkpoint mode)
+            if componentCov[k] is None:
+                result.append(None)
+                continue
             if name not in self.builder.staticComponents:
                 comp.updateEvaluation(i)
             result.append(dot(
@@ -804,6 +2673,8 @@ class _dlm:
         else:
             raise NameError('Incorrect filter type.')
 
+        # the dates before the history are no longer available
+        start = max(start, self._historyStart())
         return (start, end)
 
     # check the filter status and automatic turn off some plots
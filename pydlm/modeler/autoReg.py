@@ -13,6 +13,7 @@ similar to @dynamic.
 """
 from numpy import matrix
 from .dynamic import dynamic
+import pydlm.base.tools as tl
 
 
 class autoReg(dynamic):
@@ -119,11 +120,11 @@ class autoReg(dynamic):
     # check if there is any none data. We currently don't support missing data
     # for auto regression.
     def hasMissingData(self, aList):
-        """ Check whether the list contains None
+        """ Check whether the list contains None or NaN
 
         """
         for item in aList:
-            if item is None:
+            if tl.isMissing(item):
                 return True
 
         return False
@@ -15,7 +15,6 @@ view componets of a given dlm. Builder will finally assemble all the components
 # customized model
 import numpy as np
 from pydlm.base.baseModel import baseModel
-from pydlm.modeler.matrixTools import matrixTools as mt
 
 # The builder will be the main class for construting dlm
 # it featues two types of evaluation matrix and evaluation matrix
@@ -40,7 +39,9 @@ class builder:
         staticComponents: stores all the static components (trend and
                           seasonality)
         dynamicComponents: stores all the dynamic components
-        componentIndex: the location of each component in the latent states
+        componentIndex: the location of each component in the latent states.
+                        It is updated whenever a component is added or
+                        deleted, so initialize only needs to fill the blocks.
         statePrior: the prior mean of the latent state
         sysVarPrior: the prior of the covariance of the latent states
         noiseVar: the prior of the observation noise
@@ -58,12 +59,16 @@ class builder:
                        or if there is no seasonality, this will be the minimum
                        discount of all components. Used for computing
                        renewTerm.
+        maxPowerHorizon: the powers of the transition matrix up to this
+                         horizon are cached, see @transitionPower.
 
     Methods:
         add: add new component
         ls:  list out all components
         delete: delete a specific component by its name
         initialize: assemble all the component to construt a big model
+        getComponents: get all components in the order of the latent states
+        transitionPower: the k-th power of the model transition matrix
         updateEvaluation: update the valuation matrix of the big model
     """
 
@@ -110,6 +115,11 @@ class builder:
         self.renewTerm = -1.0
         self.renewDiscount = None  # used for adjusting renewTerm
 
+        # the cached powers of the transition matrix, {k: G^k}, for
+        # k <= maxPowerHorizon
+        self.maxPowerHorizon = 30
+        self._transitionPowers = {}
+
         # flag for determining whether the system info should be printed.
         self._printInfo = True
 
@@ -145,13 +155,7 @@ class builder:
                                 ' to a different name.')
             self.staticComponents[component.name] = component
 
-            # we use seasonality's discount to adjust the renewTerm
-            if component.componentType == 'seasonality':
-                if self.renewDiscount is None:
-                    self.renewDiscount = 1.0
-                self.renewDiscount = min(self.renewDiscount,
-                                         min(component.discount))
-
+        self._updateLayout()
         self.initialized = False
         return self
 
@@ -207,8 +211,83 @@ class builder:
         else:
             raise NameError('Such component does not exisit!')
 
+        self._updateLayout()
         self.initialized = False
 
+    # get all components in the order of the latent states
+    def getComponents(self):
+        """ Get all components in the order they appear in the latent states,
+        i.e., static components first, then dynamic and automatic ones.
+
+        Returns:
+            A list of (name, component) tuples.
+        """
+        components = []
+        for group in [self.staticComponents,
+                      self.dynamicComponents,
+                      self.automaticComponents]:
+            for name in group:
+                components.append((name, group[name]))
+        return components
+
+    # compute the location of all components and the discount
+    def _updateLayout(self):
+        """ Compute the location of each component in the latent states, the
+        model discount and the renew discount. Called when the components
+        change, so that initialize does not need to recompute the offsets.
+
+        """
+        componentIndex = {}
+        discount = []
+        self.renewDiscount = None
+        currentIndex = 0
+        for name, comp in self.getComponents():
+            componentIndex[name] = (currentIndex, currentIndex + comp.d - 1)
+            currentIndex += comp.d
+            discount.append(comp.discount)
+
+            # we use seasonality's discount to adjust the renewTerm
+            if comp.componentType == 'seasonality':
+                if self.renewDiscount is None:
+                    self.renewDiscount = 1.0
+                self.renewDiscount = min(self.renewDiscount,
+                                         min(comp.discount))
+
+        self.componentIndex = componentIndex
+        self.discount = np.concatenate(discount) if len(discount) > 0 \
+                        else np.array([])
+        self.dimension = currentIndex
+        self._transitionPowers = {}
+
+    # the power of the transition matrix for k-step prediction
+    def transitionPower(self, k):
+        """ Compute the k-th power of the model transition matrix. The powers
+        are assembled block by block from the closed forms of the components
+        and cached up to maxPowerHorizon, so that repeated multi-step
+        predictions do not need to multiply the transition matrix again. The
+        powers beyond the horizon are computed without being cached.
+
+        Args:
+            k: a non-negative integer
+
+        Returns:
+            The k-th power of the transition matrix
+        """
+        if not self.initialized:
+            raise NameError('The model has to be initialized before ' +
+                            'computing the transition power.')
+        if k in self._transitionPowers:
+            return self._transitionPowers[k]
+
+        power = np.matrix(np.zeros((self.dimension, self.dimension)))
+        for name, comp in self.getComponents():
+            start = self.componentIndex[name][0]
+            end = self.componentIndex[name][1] + 1
+            power[start:end, start:end] = comp.transitionPower(k)
+        if k <= self.maxPowerHorizon:
+            self._transitionPowers[k] = power
+        return power
+
     # initialize model for all the quantities
     # noise is the prior guess of the variance of the observed data
     def initialize(self, noise=1):
@@ -228,59 +307,29 @@ class builder:
         # construct transition, evaluation, prior state, prior covariance
         if self._printInfo:
             print('Initializing models...')
-        transition = None
-        evaluation = None
-        state = None
-        sysVar = None
-        self.discount = np.array([])
 
-        # first construct for the static components
+        # the layout is cheap to refresh (in case a component's discount has
+        # been changed after adding). We then allocate the full matrices once
+        # and write each component's block in place. The blocks are built by
+        # the components when they are created, so they are not recomputed.
         # the evaluation will be treated separately for static or dynamic
         # as the latter one will change over time
-        currentIndex = 0  # used for compute the index
-        for i in self.staticComponents:
-            comp = self.staticComponents[i]
-            transition = mt.matrixAddInDiag(transition, comp.transition)
-            evaluation = mt.matrixAddByCol(evaluation,
-                                           comp.evaluation)
-            state = mt.matrixAddByRow(state, comp.meanPrior)
-            sysVar = mt.matrixAddInDiag(sysVar, comp.covPrior)
-            self.discount = np.concatenate((self.discount, comp.discount))
-            self.componentIndex[i] = (currentIndex, currentIndex + comp.d - 1)
-            currentIndex += comp.d
-
-        # if the model contains the dynamic part, we add the dynamic components
-        if len(self.dynamicComponents) > 0:
-            self.dynamicEvaluation = None
-            for i in self.dynamicComponents:
-                comp = self.dynamicComponents[i]
-                comp.updateEvaluation(0)
-                transition = mt.matrixAddInDiag(transition, comp.transition)
-                evaluation = mt.matrixAddByCol(evaluation,
-                                               comp.evaluation)
-                state = mt.matrixAddByRow(state, comp.meanPrior)
-                sysVar = mt.matrixAddInDiag(sysVar, comp.covPrior)
-                self.discount = np.concatenate((self.discount, comp.discount))
-                self.componentIndex[i] = (currentIndex,
-                                          currentIndex + comp.d - 1)
-                currentIndex += comp.d
-
-        # if the model contains the automatic dynamic part, we add
-        # them to the builder
-        if len(self.automaticComponents) > 0:
-            self.automaticEvaluation = None
-            for i in self.automaticComponents:
-                comp = self.automaticComponents[i]
+        self._updateLayout()
+        d = self.dimension
+        transition = np.matrix(np.zeros((d, d)))
+        evaluation = np.matrix(np.zeros((1, d)))
+        state = np.matrix(np.zeros((d, 1)))
+        sysVar = np.matrix(np.zeros((d, d)))
+
+        for name, comp in self.getComponents():
+            if name not in self.staticComponents:
                 comp.updateEvaluation(0)
-                transition = mt.matrixAddInDiag(transition, comp.transition)
-                evaluation = mt.matrixAddByCol(evaluation,
-                                               comp.evaluation)
-                state = mt.matrixAddByRow(state, comp.meanPrior)
-                sysVar = mt.matrixAddInDiag(sysVar, comp.covPrior)
-                self.discount = np.concatenate((self.discount, comp.discount))
-                self.componentIndex[i] = (currentIndex,
-                                          currentIndex + comp.d - 1)
-                currentIndex += comp.d
+            start = self.componentIndex[name][0]
+            end = self.componentIndex[name][1] + 1
+            transition[start:end, start:end] = comp.transition
+            evaluation[0, start:end] = comp.evaluation
+            state[start:end, 0] = comp.meanPrior
+            sysVar[start:end, start:end] = comp.covPrior
 
         self.statePrior = state
         self.sysVarPrior = sysVar
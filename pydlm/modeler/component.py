@@ -11,6 +11,7 @@ components based on this abstract class.
 
 """
 from abc import ABCMeta, abstractmethod
+import numpy as np
 
 # We define an abstract class which can further be used
 # to create different types of model components, inclusing
@@ -26,6 +27,7 @@ class component:
         createMeanPrior: create a simple prior latent state
         checkDimensions: if user supplies their own covPrior and meanPrior, this can 
                          be used to check if the dimension matches
+        transitionPower: the k-th power of the transition matrix
     
     """
     __metaclass__ = ABCMeta
@@ -64,3 +66,17 @@ class component:
     """ Check the dimensionality of the state and covariance
 
     """
+
+    # the k-th power of the transition matrix, used for k-step prediction.
+    # Components with a structured transition override this with the
+    # closed form.
+    def transitionPower(self, k):
+        """ Compute the k-th power of the transition matrix
+
+        Args:
+            k: a non-negative integer
+
+        Returns:
+            The k-th power of the transition matrix
+        """
+        return np.matrix(np.linalg.matrix_power(self.transition, k))
@@ -89,10 +89,10 @@ class dynamic(component):
     def createEvaluation(self, step):
         """ The evaluation matrix for the dynamic component change over time.
         It equals to the value of the features or the controlled variables at a
-        given date
+        given date. Missing features (None or NaN) are NaN in the evaluation.
 
         """
-        self.evaluation = np.matrix([self.features[step]])
+        self.evaluation = np.matrix([self.features[step]], dtype=float)
 
     def createTransition(self):
         """ Create the transition matrix.
@@ -102,6 +102,13 @@ class dynamic(component):
         """
         self.transition = np.matrix(np.eye(self.d))
 
+    def transitionPower(self, k):
+        """ Compute the k-th power of the transition matrix, i.e., the
+        identity matrix.
+
+        """
+        return np.matrix(np.eye(self.d))
+
     def createCovPrior(self, cov = None, scale = 1e6):
         """ Create the prior covariance matrix for the latent states
 
@@ -135,7 +142,7 @@ class dynamic(component):
 
         """
         if step < self.n:
-            self.evaluation = np.matrix([self.features[step]])
+            self.evaluation = np.matrix([self.features[step]], dtype=float)
             self.step = step
         else:
             raise NameError('The step is out of range')
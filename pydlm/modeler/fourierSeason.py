@@ -0,0 +1,163 @@
+"""
+=========================================================================
+
+Code for the Fourier-form seasonality component
+
+=========================================================================
+
+This piece of code provide one building block for the dynamic linear model.
+It decribes a latent seasonality in the time series data through a sum of
+harmonics, i.e., the Fourier form of the seasonality in Hurrison and West
+(1999). Different from @seasonality, which carries one latent state for every
+date in the period, the Fourier form uses two states for each harmonic. Long
+periods, e.g., a yearly cycle on daily data, can then be modeled with a small
+number of states.
+
+"""
+import numpy as np
+from .component import component
+import pydlm.base.tools as tl
+
+# create the Fourier-form seasonality component
+# We create the seasonality using the component class
+
+class fourierSeason(component):
+    """The Fourier-form seasonality component that features the periodicity
+    behavior with a given number of harmonics, providing one building block
+    for the dynamic linear model. Each harmonic j contributes a pair of latent
+    states which rotate by the angle 2 * pi * j / period every step. The
+    seasonality is the sum of the first state of each pair.
+
+    Args:
+        period: the period of the seasonality, could be a non-integer, e.g.,
+                365.25 for a yearly cycle on daily data.
+        harmonics: the number of harmonics. Must be between 1 and period / 2.
+                   Default to the largest one, i.e., the full seasonality.
+        discount: the discount factor
+        name: the name of the seasonality component
+        w: the value to set the prior covariance. Default to a diagonal
+           matrix with 1e7 on the diagonal.
+
+    Examples:
+        >>>  # create a yearly seasonality with 4 harmonics:
+        >>> yearly = fourierSeason(period = 365.25, harmonics = 4,
+                                   name = 'yearly', discount = 0.99)
+        >>>  # change the yearly to have covariance with diagonals are 2
+        >>> yearly.createCovPrior(cov = 2)
+
+    Attributes:
+        d: the number of latent states, i.e., twice the harmonics (minus one
+           if the last harmonic is the Nyquist frequency of an even period)
+        period: the period of the seasonality
+        harmonics: the number of harmonics
+        componentType: the type of the component, in this case, 'seasonality'
+        name: the name of the seasonality component, to be supplied by user
+              used in modeling and result extraction
+        discount: the discount factor for this component. Details please refer
+                  to the @kalmanFilter
+        evaluation: the evaluation matrix for this component
+        transition: the transition matrix for this component
+        covPrior: the prior guess of the covariance matrix of the latent states
+        meanPrior: the prior guess of the latent states
+
+    """
+    def __init__(self,
+                 period = 7,
+                 harmonics = None,
+                 discount = 0.99,
+                 name = 'fourierSeason',
+                 w=1e7):
+
+        if period <= 1:
+            raise NameError('Period has to be greater than 1.')
+        if harmonics is None:
+            harmonics = int(np.floor(period / 2.0))
+        if harmonics < 1 or harmonics > period / 2.0:
+            raise NameError('The number of harmonics has to be between 1 ' +
+                            'and period / 2.')
+
+        self.period = period
+        self.harmonics = harmonics
+
+        # the Nyquist harmonic of an even period only has one state,
+        # as its sine part is always 0
+        self.nyquist = (2 * harmonics == period)
+        self.d = 2 * harmonics - 1 if self.nyquist else 2 * harmonics
+        self.componentType = 'seasonality'
+        self.name = name
+        self.discount = np.ones(self.d) * discount
+
+        # Initialize all basic quantities
+        self.evaluation = None
+        self.transition = None
+        self.covPrior = None
+        self.meanPrior = None
+
+        # create all basic quantities
+        self.createEvaluation()
+        self.createTransition()
+        self.createCovPrior(cov=w)
+        self.createMeanPrior()
+
+    def createEvaluation(self):
+        """ Create the evaluation matrix. It picks the first state of
+        every harmonic, i.e., [1 0 1 0 ... 1 0].
+
+        """
+        self.evaluation = np.matrix(np.zeros((1, self.d)))
+        self.evaluation[0, 0::2] = 1
+
+    def createTransition(self):
+        """ Create the transition matrix.
+
+        According to Hurrison and West (1999), the transition matrix of the
+        Fourier-form seasonality is block diagonal, with the j-th block
+        rotating the states of the j-th harmonic by w = 2 * pi * j / period\n
+
+        [[cos(w)  sin(w)],\n
+        [-sin(w) cos(w)]]
+
+        The Nyquist harmonic (when exists) has a single state with
+        transition -1.
+
+        """
+        self.transition = self.transitionPower(1)
+
+    def transitionPower(self, k):
+        """ Compute the k-th power of the transition matrix.
+
+        The k-th power of a rotation by w is the rotation by k * w, so each
+        block is built directly with the angle k * w.
+
+        """
+        power = np.matrix(np.zeros((self.d, self.d)))
+        for j in range(1, self.harmonics + 1):
+            loc = 2 * (j - 1)
+            if self.nyquist and j == self.harmonics:
+                power[loc, loc] = (-1) ** k
+            else:
+                omega = 2 * np.pi * j * k / self.period
+                power[loc:(loc + 2), loc:(loc + 2)] = \
+                    np.matrix([[np.cos(omega), np.sin(omega)],
+                               [-np.sin(omega), np.cos(omega)]])
+        return power
+
+    def createCovPrior(self, cov = 1e7):
+        """Create the prior covariance matrix for the latent states.
+
+        """
+        self.covPrior = np.matrix(np.eye(self.d)) * cov
+
+    def createMeanPrior(self, mean = 0):
+        """ Create the prior latent state
+
+        """
+        self.meanPrior = np.matrix(np.ones((self.d, 1))) * mean
+
+    def checkDimensions(self):
+        """ if user supplies their own covPrior and meanPrior, this can
+        be used to check if the dimension matches
+
+        """
+        tl.checker.checkVectorDimension(self.meanPrior, self.covPrior)
+        print('The dimension looks good!')
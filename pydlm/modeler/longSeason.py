@@ -16,12 +16,13 @@ The usecase for long seasonality is to model longer seasonality with the
 short-term seasonality. For example, the short-term seansonality can be
 used to model the day of a weak patten and the long seasonality can be used
 to model the week of a month patten in the same model.
-Different from the dynamic component, the features in the autoReg is generated
-from the data, and updated according to the data. All other features are
+Different from the dynamic component, the features in the longSeason are
+not stored but computed from the index of the date, i.e., the feature at
+date t selects the state (t // stay) % period. All other features are
 similar to @dynamic.
 
 """
-from numpy import matrix
+import numpy as np
 from .dynamic import dynamic
 
 
@@ -39,7 +40,8 @@ class longSeason(dynamic):
     to model the week of a month patten in the same model.
     This code implements the longSeason component as a sub-class of
     dynamic. Different from the dynamic component, the features in the
-    autoReg is generated from the data, and updated according to the data.
+    longSeason are not stored. The feature at date t is a one-hot vector
+    at (t // stay) % period, which is computed on the fly from the index.
     All other features are similar to @dynamic.
 
     Args:
@@ -57,6 +59,9 @@ class longSeason(dynamic):
         stay: the length of a state last.
         discount factor: the discounting factor
         name: the name of the component
+        features: the (materialized) feature matrix, only computed on request
+                  and read only. Use getFeature for a single date.
+        nextState: the [state, days stayed] of the next date after the data
 
     """
 
@@ -73,51 +78,84 @@ class longSeason(dynamic):
         if data is None:
             raise NameError('Data must be provided for longSeason.')
 
-        # create features. nextState and state are used to
-        # remember the next feature shap
-        features, self.nextState = self.createFeatureMatrix(period=period,
-                                                            stay=stay,
-                                                            n=len(data),
-                                                            state=[0, 0])
-
-        dynamic.__init__(self,
-                         features=features,
-                         discount=discount,
-                         name=name,
-                         w=w)
+        # the features are fully determined by the index, so we only
+        # need to record the length of the data
+        self.n = len(data)
+        self.d = period
+        self.componentType = 'longSeason'
+        self.name = name
+        self.discount = np.ones(self.d) * discount
+
+        # Initialize all basic quantities
+        self.evaluation = None
+        self.transition = None
+        self.covPrior = None
+        self.meanPrior = None
+
+        # create all basic quantities
+        self.createEvaluation(0)
+        self.createTransition()
+        self.createCovPrior(scale=w)
+        self.createMeanPrior()
+
+        # record current step in case of lost
+        self.step = 0
         self.checkDataLength()
 
-        # modify the type to be autoReg
-        self.componentType = 'longSeason'
+    def getStateIndex(self, step):
+        """ Get the index of the active state on a given date.
 
-    def createFeatureMatrix(self, period, stay, n, state):
-        """ Create the feature matrix based on the supplied data and the degree.
+        Args:
+            step: the date
+
+        Returns:
+            the location of the only non-zero entry of the feature.
+        """
+        return (step // self.stay) % self.period
+
+    def createEvaluation(self, step):
+        """ Create the evaluation matrix of a given date. It is a one-hot
+        row that selects the active state.
+
+        """
+        self.evaluation = np.matrix(np.zeros((1, self.d)))
+        self.evaluation[0, self.getStateIndex(step)] = 1
+
+    def getFeature(self, step):
+        """ Get the feature of a given date, without materializing the
+        feature matrix.
 
         Args:
-            period: the periodicity of the component
-            stay: the length of the base unit, i.e, how long before change to
-                  change to the next state.
+            step: the date
+
+        Returns:
+            the one-hot feature as a list.
         """
+        feature = [0] * self.period
+        feature[self.getStateIndex(step)] = 1
+        return feature
 
-        # initialize feature matrix
-        nextState = state
-        features = []
+    @property
+    def features(self):
+        """ The feature matrix in the list-of-lists form of @dynamic. It is
+        read only: a new matrix of n rows is created on every access, so use
+        getFeature (or getStateIndex) for a single date.
 
-        count = 0
-        while count < n:
-            # create new feature for next state
-            new_feature = [0] * period
-            new_feature[nextState[0]] = 1
-            features.append(new_feature)
+        """
+        return [self.getFeature(step) for step in range(self.n)]
 
-            # update the state
-            nextState[1] = (nextState[1] + 1) % stay
-            if nextState[1] == 0:
-                nextState[0] = (nextState[0] + 1) % period
+    @features.setter
+    def features(self, value):
+        raise NameError('The features of longSeason are determined by the ' +
+                        'index of the date and cannot be set.')
 
-            count += 1
+    @property
+    def nextState(self):
+        """ The [state, days stayed in the state] of the date right after
+        the data.
 
-        return features, nextState
+        """
+        return [self.getStateIndex(self.n), self.n % self.stay]
 
     # the degree cannot be longer than data
     def checkDataLength(self):
@@ -136,15 +174,7 @@ class longSeason(dynamic):
             newData: a list of new data
 
         """
-        # create the new features
-        incrementLength = len(newData) + self.n - len(self.features)
-        if incrementLength > 0:
-            newFeatures, \
-                self.nextState = self.createFeatureMatrix(period=self.period,
-                                                          stay=self.stay,
-                                                          n=incrementLength,
-                                                          state=self.nextState)
-        self.features.extend(newFeatures)
+        # the features of the new dates follow from the index
         self.n += len(newData)
 
     # override
@@ -172,20 +202,8 @@ class longSeason(dynamic):
               ' seasonality patten on the future' +
               'days unchanged. Please use ignore instead')
 
-        self.features.pop()
         self.n -= 1
 
-        # push currentState back by 1 day. Need to take care of all
-        # corner cases.
-        if self.nextState[1] == 0:
-            self.nextState[1] = self.stay - 1
-            if self.nextState[0] == 0:
-                self.nextState[0] = self.period - 1
-            else:
-                self.nextState[0] -= 1
-        else:
-            self.nextState[1] -= 1
-
     def alter(self, date, dataPoint):
         """ We do nothing to longSeason, when altering the main data
 
@@ -198,18 +216,10 @@ class longSeason(dynamic):
         """ update the evaluation matrix to a specific date
         This function is used when fitting the forward filter and
         backward smoother
-        in need of updating the correct evaluation matrix
+        in need of updating the correct evaluation matrix. Only the
+        previously active and the newly active entries are touched.
 
         """
-        if step < len(self.features):
-            self.evaluation = matrix(self.features[step])
-        else:
-            newFeatures, \
-                self.nextState = self.createFeatureMatrix(
-                    period=self.period,
-                    stay=self.stay,
-                    n=step + 1 - len(self.features),
-                    state=self.nextState)
-            self.features.extend(newFeatures)
-            self.evaluation = matrix(self.features[step])
+        self.evaluation[0, self.getStateIndex(self.step)] = 0
+        self.evaluation[0, self.getStateIndex(step)] = 1
         self.step = step
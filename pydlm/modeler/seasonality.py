@@ -114,6 +114,17 @@ class seasonality(component):
         self.transition = np.matrix(np.diag(np.ones(self.d - 1), 1))
         self.transition[self.d - 1, 0] = 1
 
+    def transitionPower(self, k):
+        """ Compute the k-th power of the transition matrix.
+
+        The transition is a cyclic permutation, so its k-th power moves the
+        i-th state to (i + k) mod d.
+
+        """
+        power = np.matrix(np.zeros((self.d, self.d)))
+        power[np.arange(self.d), (np.arange(self.d) + k) % self.d] = 1
+        return power
+
     def createCovPrior(self, cov = 1e7):
         """Create the prior covariance matrix for the latent states.
 
@@ -96,6 +96,23 @@ class trend(component):
         self.transition = np.matrix(np.zeros((self.d, self.d)))
         self.transition[np.triu_indices(self.d)] = 1
 
+    def transitionPower(self, k):
+        """ Compute the k-th power of the transition matrix.
+
+        The transition is (I - N)^(-1) with N the shift matrix, so its k-th
+        power is the sum of C(k + j - 1, j) * N^j, i.e., the entry on the
+        j-th super diagonal is C(k + j - 1, j).
+
+        """
+        power = np.matrix(np.eye(self.d))
+        if k == 0:
+            return power
+        coef = 1.0
+        for j in range(1, self.d):
+            coef = coef * (k + j - 1) / j
+            power += np.matrix(np.diag(np.ones(self.d - j) * coef, j))
+        return power
+
     def createCovPrior(self, cov=1e7):
         """Create the prior covariance matrix for the latent states.
 
@@ -0,0 +1,61 @@
+import numpy as np
+import unittest
+
+from pydlm.modeler.trends import trend
+from pydlm.modeler.seasonality import seasonality
+from pydlm.modeler.builder import builder
+from pydlm.base.kalmanFilter import kalmanFilter
+from pydlm.base.discountOptimizer import discountOptimizer
+
+
+class testDiscountOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [1.0, 3.0, None, -2.0, 0.5, 1.5, None, None, 2.0, 1.0,
+                     -1.0, 0.0, 2.5, 1.0, 2.0, -0.5, 0.5, 3.0, 1.0, 0.0]
+        self.dlm = builder()
+        self.dlm.add(trend(degree=2, discount=0.9, w=1.0))
+        self.dlm.add(seasonality(period=3, discount=0.95, w=1.0))
+        self.dlm.initialize()
+        self.groups = [self.dlm.componentIndex['trend'],
+                       self.dlm.componentIndex['seasonality']]
+        self.discount = np.array(self.dlm.discount, dtype=float)
+
+    def createOptimizer(self, updateInnovation):
+        kf = kalmanFilter(discount=self.discount,
+                          updateInnovation=updateInnovation,
+                          index=self.dlm.componentIndex)
+        evaluations = np.tile(np.asarray(self.dlm.model.evaluation),
+                              (len(self.data), 1))
+        return discountOptimizer(kf, self.dlm.model, evaluations, self.data,
+                                 self.groups)
+
+    def testGradient(self):
+        # the gradient agrees with the finite differences
+        for updateInnovation in ['whole', 'component']:
+            optimizer = self.createOptimizer(updateInnovation)
+            value, gradient = optimizer.logLikelihood(self.discount)
+            for k, (start, end) in enumerate(self.groups):
+                upper = self.discount.copy()
+                upper[start:(end + 1)] += 1e-6
+                lower = self.discount.copy()
+                lower[start:(end + 1)] -= 1e-6
+                difference = (optimizer.logLikelihood(upper)[0] -
+                              optimizer.logLikelihood(lower)[0]) / 2e-6
+                self.assertAlmostEqual(gradient[k], difference, places=4)
+
+    def testOptimize(self):
+        optimizer = self.createOptimizer('component')
+        start, _ = optimizer.logLikelihood(self.discount)
+        discount, value, path = optimizer.optimize(
+            self.discount, lower=[0.5, 0.5], upper=[1.0, 1.0])
+        self.assertTrue(value >= start)
+        self.assertAlmostEqual(path[-1][1], value)
+
+        # at the optimum, the gradient vanishes unless on a bound
+        _, gradient = optimizer.logLikelihood(discount)
+        for k, (start, end) in enumerate(self.groups):
+            if 0.5 < discount[start] < 1.0:
+                self.assertAlmostEqual(gradient[k], 0.0, places=2)
+
+unittest.main()
@@ -0,0 +1,69 @@
+import numpy as np
+import unittest
+
+from pydlm.modeler.trends import trend
+from pydlm.modeler.seasonality import seasonality
+from pydlm.modeler.builder import builder
+from pydlm.base.kalmanFilter import kalmanFilter
+from pydlm.base.discountTuner import discountTuner
+from pydlm.base.tools import logPredictiveDensity
+
+
+class testDiscountTuner(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [1.0, 3.0, None, -2.0, 0.5, 1.5, None, None, 2.0, 1.0,
+                     -1.0, 0.0, 2.5]
+        self.dlm = builder()
+        self.dlm.add(trend(degree=2, discount=0.9, w=1.0))
+        self.dlm.add(seasonality(period=3, discount=0.9, w=1.0))
+        self.dlm.initialize()
+        self.kf = kalmanFilter(discount=self.dlm.discount)
+        self.evaluations = np.tile(np.asarray(self.dlm.model.evaluation),
+                                   (len(self.data), 1))
+        self.candidates = [(np.array([0.9, 0.9, 0.95, 0.95, 0.95]), None),
+                           (np.array([0.99, 0.99, 0.8, 0.8, 0.8]), 2.0),
+                           (np.array([0.5, 0.5, 0.5, 0.5, 0.5]), None)]
+
+    def testEvaluate(self):
+        tuner = discountTuner(metric='loglik', workers=1, stopMargin=None)
+        results = tuner.evaluate(self.kf, self.dlm.model, self.evaluations,
+                                 self.data, self.candidates)
+
+        # the loss of the second candidate with the usual filter
+        self.kf.updateDiscount(self.candidates[1][0])
+        self.dlm.model.noiseVar = np.matrix([[2.0]])
+        self.dlm.model.initializeObservation()
+        loss = 0.0
+        for y in self.data:
+            self.kf.forwardFilter(self.dlm.model, y)
+            if y is not None:
+                loss -= logPredictiveDensity(
+                    y, self.dlm.model.prediction.obs.item(),
+                    self.dlm.model.prediction.obsVar.item(),
+                    self.dlm.model.df - 1)
+        self.assertAlmostEqual(results[1][0], loss)
+        self.assertTrue(results[1][1] is None)
+
+        # the same on the process pool
+        tuner = discountTuner(metric='loglik', workers=2, stopMargin=None)
+        self.dlm.initialize()
+        parallelResults = tuner.evaluate(self.kf, self.dlm.model,
+                                         self.evaluations, self.data,
+                                         self.candidates)
+        for result, parallelResult in zip(results, parallelResults):
+            self.assertAlmostEqual(result[0], parallelResult[0])
+
+    def testEarlyStop(self):
+        # the squared errors only grow, so a worse candidate is stopped
+        # before the end
+        tuner = discountTuner(metric='mse', workers=1)
+        results = tuner.evaluate(self.kf, self.dlm.model, self.evaluations,
+                                 self.data, self.candidates)
+        finished = [loss for loss, stoppedAt in results if stoppedAt is None]
+        stopped = [loss for loss, stoppedAt in results
+                   if stoppedAt is not None]
+        self.assertTrue(len(stopped) > 0)
+        self.assertTrue(min(stopped) > min(finished))
+
+unittest.main()
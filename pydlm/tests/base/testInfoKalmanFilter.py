@@ -0,0 +1,57 @@
+import numpy as np
+import unittest
+
+from pydlm.modeler.trends import trend
+from pydlm.modeler.dynamic import dynamic
+from pydlm.modeler.builder import builder
+from pydlm.base.kalmanFilter import kalmanFilter
+from pydlm.base.infoKalmanFilter import infoKalmanFilter
+
+
+class testInfoKalmanFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [1.0, 3.0, None, -2.0, 0.5, 1.5, None, 2.0]
+        self.features = np.random.random((8, 3)).tolist()
+
+    def createBuilder(self):
+        dlm = builder()
+        dlm.add(trend(degree=1, discount=1.0, w=1.0))
+        dlm.add(dynamic(features=self.features, discount=1.0, w=1.0))
+        dlm.initialize()
+        return dlm
+
+    def testForwardFilter(self):
+        dlm1 = self.createBuilder()
+        dlm2 = self.createBuilder()
+        kf1 = kalmanFilter(discount=dlm1.discount)
+        kf2 = infoKalmanFilter(discount=dlm2.discount)
+        for step, y in enumerate(self.data):
+            dlm1.updateEvaluation(step)
+            dlm2.updateEvaluation(step)
+            kf1.forwardFilter(dlm1.model, y)
+            kf2.forwardFilter(dlm2.model, y)
+            self.assertTrue(dlm2.model.sysVar is None)
+            self.assertAlmostEqual(np.sum(np.abs(
+                dlm1.model.state - dlm2.model.state)), 0.0)
+            self.assertAlmostEqual(np.sum(np.abs(
+                dlm1.model.sysVar - np.linalg.inv(dlm2.model.precision))),
+                                   0.0)
+            self.assertAlmostEqual(dlm1.model.obsVar[0, 0],
+                                   dlm2.model.obsVar[0, 0])
+            self.assertAlmostEqual(dlm1.model.prediction.obsVar[0, 0],
+                                   dlm2.model.prediction.obsVar[0, 0])
+            self.assertAlmostEqual(dlm1.model.noiseVar[0, 0],
+                                   dlm2.model.noiseVar[0, 0])
+
+        # the prediction computes the covariance from the precision
+        kf1.predict(dlm1.model)
+        kf2.predict(dlm2.model)
+        self.assertAlmostEqual(np.sum(np.abs(
+            dlm1.model.prediction.sysVar - dlm2.model.prediction.sysVar)),
+                               0.0)
+
+    def testDiscount(self):
+        self.assertRaises(NameError, infoKalmanFilter, [1.0, 0.9])
+
+unittest.main()
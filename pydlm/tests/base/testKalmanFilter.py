@@ -3,6 +3,7 @@ import unittest
 
 from pydlm.modeler.trends import trend
 from pydlm.modeler.seasonality import seasonality
+from pydlm.modeler.dynamic import dynamic
 from pydlm.modeler.builder import builder
 from pydlm.base.kalmanFilter import kalmanFilter
 
@@ -123,6 +124,25 @@ class testKalmanFilter(unittest.TestCase):
         self.assertAlmostEqual(dlm.model.obs, 0.0)
         self.assertAlmostEqual(dlm.model.transition, 1.0)
 
+        # the latent state of a missing (NaN) feature is kept
+        dlm = builder()
+        dlm.add(dynamic(features=[[1.0, np.nan]], discount=1, w=1.0))
+        dlm.initialize()
+        kf = kalmanFilter(discount=[1, 1])
+        kf.forwardFilter(dlm.model, 1.0, dealWithMissingEvaluation=True)
+        self.assertTrue(np.isnan(dlm.model.evaluation[0, 1]))
+        self.assertAlmostEqual(dlm.model.state[0, 0], 0.5)
+        self.assertAlmostEqual(dlm.model.state[1, 0], 0.0)
+
+    def testEvaluationSupport(self):
+        dlm = builder()
+        dlm.add(seasonality(period=4, discount=1, w=1.0))
+        dlm.initialize()
+        self.assertEqual(self.kf1._evaluationSupport(dlm.model).tolist(), [0])
+
+        dlm.model.evaluation = np.matrix([[1.0, 2.0, 3.0, 4.0]])
+        self.assertTrue(self.kf1._evaluationSupport(dlm.model) is None)
+
     def testEvolveMode(self):
         dlm = builder()
         dlm.add(trend(degree=1, discount=0.9, w=1.0))
@@ -136,6 +156,39 @@ class testKalmanFilter(unittest.TestCase):
         self.assertAlmostEqual(dlm.model.innovation[0, 1], 0.0)
         self.assertAlmostEqual(dlm.model.innovation[1, 0], 0.0)
 
+    def testSteadyState(self):
+        dlm1 = builder()
+        dlm1.add(trend(degree=2, discount=0.9, w=1.0))
+        dlm1.initialize()
+        dlm2 = builder()
+        dlm2.add(trend(degree=2, discount=0.9, w=1.0))
+        dlm2.initialize()
+
+        kf2 = kalmanFilter(discount=dlm1.discount)
+        kf3 = kalmanFilter(discount=dlm2.discount, steadyTolerance=1e-10)
+        data = np.sin(np.arange(400) / 5.0)
+        for y in data:
+            kf2.forwardFilter(dlm1.model, y)
+            kf3.forwardFilter(dlm2.model, y)
+        self.assertTrue(kf3._steady is not None)
+        self.assertAlmostEqual(np.sum(np.abs(dlm1.model.state -
+                                             dlm2.model.state)), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(dlm1.model.sysVar -
+                                             dlm2.model.sysVar)), 0.0)
+        self.assertAlmostEqual(dlm1.model.noiseVar[0, 0],
+                               dlm2.model.noiseVar[0, 0])
+
+        # a missing value goes back to the full recursion
+        kf3.forwardFilter(dlm2.model, None)
+        kf3.forwardFilter(dlm2.model, 1.0)
+        self.assertTrue(kf3._steady is None)
+
+        # a reset model is not filtered in the steady state
+        kf3.forwardFilter(dlm2.model, 1.0)
+        dlm2.initialize()
+        kf3.forwardFilter(dlm2.model, 1.0)
+        self.assertTrue(kf3._steady is None)
+
 unittest.main()
 #kf1 = kalmanFilter(discount = [1])
 #kf0 = kalmanFilter(discount = [0.01])
@@ -0,0 +1,107 @@
+import numpy as np
+import unittest
+
+from pydlm.modeler.trends import trend
+from pydlm.modeler.seasonality import seasonality
+from pydlm.modeler.builder import builder
+from pydlm.base.kalmanFilter import kalmanFilter
+from pydlm.base.parallelKalmanFilter import parallelKalmanFilter
+
+
+class testParallelKalmanFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [1.0, 3.0, None, -2.0, 0.5, 1.5, None, None, 2.0, 1.0,
+                     -1.0, 0.0, 2.5]
+
+    def createBuilder(self):
+        dlm = builder()
+        dlm.add(trend(degree=2, discount=0.9, w=1.0))
+        dlm.add(seasonality(period=3, discount=0.9, w=1.0))
+        dlm.initialize()
+        return dlm
+
+    def runFilter(self):
+        dlm = self.createBuilder()
+        kf = kalmanFilter(discount=dlm.discount, updateInnovation='whole')
+        filtered = []
+        for y in self.data:
+            kf.forwardFilter(dlm.model, y)
+            filtered.append((dlm.model.state, dlm.model.sysVar,
+                             dlm.model.prediction.state,
+                             dlm.model.prediction.sysVar,
+                             dlm.model.noiseVar, dlm.model.df))
+        return dlm, kf, filtered
+
+    def testForwardFilter(self):
+        dlm = self.createBuilder()
+        _, _, filtered = self.runFilter()
+        pkf = parallelKalmanFilter(discount=0.9, workers=2, chunkSize=3)
+        basis = pkf.reducedBasis(dlm.model.transition, dlm.sysVarPrior)
+        # the seasonality prior is not of full rank
+        self.assertEqual(basis.shape[1], 4)
+
+        outputs = list(pkf.forwardFilter(
+            transition=dlm.model.transition,
+            evaluations=np.tile(np.asarray(dlm.model.evaluation),
+                                (len(self.data), 1)),
+            data=self.data, state=dlm.statePrior, sysVar=dlm.sysVarPrior,
+            noiseVar=dlm.noiseVar, df=1, discountFirst=True, basis=basis))
+        self.assertEqual(len(outputs), 5)
+        result = dict((name, np.concatenate([output[name]
+                                             for output in outputs]))
+                      for name in outputs[0])
+        for step, status in enumerate(filtered):
+            state, sysVar, predState, predSysVar, noiseVar, df = status
+            self.assertAlmostEqual(np.sum(np.abs(
+                result['filteredState'][step] - np.asarray(state).ravel())),
+                                   0.0)
+            self.assertAlmostEqual(np.sum(np.abs(
+                result['filteredCov'][step] - sysVar)), 0.0)
+            self.assertAlmostEqual(np.sum(np.abs(
+                result['predictedState'][step] -
+                np.asarray(predState).ravel())), 0.0)
+            self.assertAlmostEqual(np.sum(np.abs(
+                result['predictedCov'][step] - predSysVar)), 0.0)
+            self.assertAlmostEqual(result['noiseVar'][step], noiseVar[0, 0])
+            self.assertEqual(result['df'][step], df)
+
+    def testBackwardSmoother(self):
+        dlm, kf, filtered = self.runFilter()
+        n = len(self.data)
+
+        # the sequential smoother
+        smoothed = [(filtered[-1][0], filtered[-1][1])]
+        for step in range(n - 2, -1, -1):
+            dlm.model.prediction.state = filtered[step + 1][2]
+            dlm.model.prediction.sysVar = filtered[step + 1][3]
+            kf.backwardSmoother(dlm.model, rawState=filtered[step][0],
+                                rawSysVar=filtered[step][1])
+            smoothed.append((dlm.model.state, dlm.model.sysVar))
+
+        pkf = parallelKalmanFilter(workers=2, chunkSize=4)
+        outputs = list(pkf.backwardSmoother(
+            transition=dlm.model.transition,
+            filteredStates=np.array([np.asarray(status[0]).ravel()
+                                     for status in filtered[:-1]]),
+            filteredCovs=np.array([status[1] for status in filtered[:-1]]),
+            predictedStates=np.array([np.asarray(status[2]).ravel()
+                                      for status in filtered[1:]]),
+            predictedCovs=np.array([status[3] for status in filtered[1:]]),
+            state=filtered[-1][0], sysVar=filtered[-1][1]))
+        states = np.concatenate([output[0] for output in outputs])
+        covs = np.concatenate([output[1] for output in outputs])
+        for i in range(n - 1):
+            self.assertAlmostEqual(np.sum(np.abs(
+                states[i] - np.asarray(smoothed[i + 1][0]).ravel())), 0.0)
+            self.assertAlmostEqual(np.sum(np.abs(
+                covs[i] - smoothed[i + 1][1])), 0.0)
+
+    def testReducedBasis(self):
+        pkf = parallelKalmanFilter()
+        # the range of the covariance is not kept by the transition
+        self.assertTrue(pkf.reducedBasis(np.matrix([[0.0, 1.0], [1.0, 0.0]]),
+                                         np.matrix([[1.0, 0.0], [0.0, 0.0]]))
+                        is None)
+
+unittest.main()
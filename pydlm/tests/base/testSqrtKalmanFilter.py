@@ -0,0 +1,75 @@
+import numpy as np
+import unittest
+
+from pydlm.modeler.trends import trend
+from pydlm.modeler.seasonality import seasonality
+from pydlm.modeler.builder import builder
+from pydlm.base.kalmanFilter import kalmanFilter
+from pydlm.base.sqrtKalmanFilter import sqrtKalmanFilter
+
+
+class testSqrtKalmanFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [1.0, 3.0, None, -2.0, 0.5, 1.5, None, 2.0]
+
+    def createBuilder(self):
+        dlm = builder()
+        dlm.add(trend(degree=2, discount=0.95, w=1.0))
+        dlm.add(seasonality(period=3, discount=0.99, w=1.0))
+        dlm.initialize()
+        return dlm
+
+    def testForwardFilter(self):
+        for mode in ['whole', 'component']:
+            dlm1 = self.createBuilder()
+            dlm2 = self.createBuilder()
+            kf1 = kalmanFilter(discount=dlm1.discount, updateInnovation=mode,
+                               index=dlm1.componentIndex)
+            kf2 = sqrtKalmanFilter(discount=dlm2.discount,
+                                   updateInnovation=mode,
+                                   index=dlm2.componentIndex)
+            for y in self.data:
+                kf1.forwardFilter(dlm1.model, y)
+                kf2.forwardFilter(dlm2.model, y)
+                factor = dlm2.model.sysVarFactor
+                predictedFactor = dlm2.model.prediction.sysVarFactor
+                self.assertAlmostEqual(np.sum(np.abs(
+                    dlm1.model.state - dlm2.model.state)), 0.0)
+                self.assertAlmostEqual(np.sum(np.abs(
+                    dlm1.model.sysVar - np.dot(factor, factor.T))), 0.0)
+                self.assertAlmostEqual(np.sum(np.abs(
+                    dlm1.model.prediction.sysVar -
+                    np.dot(predictedFactor, predictedFactor.T))), 0.0)
+                self.assertAlmostEqual(dlm1.model.obsVar[0, 0],
+                                       dlm2.model.obsVar[0, 0])
+
+    def testFactor(self):
+        dlm = self.createBuilder()
+        kf = sqrtKalmanFilter(discount=dlm.discount,
+                              updateInnovation='component',
+                              index=dlm.componentIndex)
+        for y in self.data:
+            kf.forwardFilter(dlm.model, y)
+
+        # the filter only keeps the factors, and predict computes the
+        # predicted covariance
+        self.assertTrue(dlm.model.sysVar is None)
+        self.assertTrue(dlm.model.prediction.sysVar is None)
+        kf.predict(dlm.model)
+        factor = dlm.model.prediction.sysVarFactor
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.dot(factor, factor.T) - dlm.model.prediction.sysVar)), 0.0)
+
+        # a reset covariance is factored again
+        dlm.model.sysVar = dlm.sysVarPrior
+        dlm.model.sysVarFactor = None
+        dlm.model.prediction.step = 0
+        kf.predict(dlm.model)
+        self.assertAlmostEqual(dlm.model.prediction.obsVar[0, 0],
+                               (np.dot(np.dot(dlm.model.evaluation,
+                                              dlm.model.prediction.sysVar),
+                                       dlm.model.evaluation.T) +
+                                dlm.model.noiseVar)[0, 0])
+
+unittest.main()
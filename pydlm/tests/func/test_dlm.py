@@ -78,6 +78,27 @@ class test_dlm(unittest.TestCase):
 
         self.assertAlmostEqual(np.sum(np.array(filtered1) - np.array(filtered2)), 0.0)
 
+    def testRollingFilter(self):
+        data = [np.sin(i) + 0.1 * i for i in range(30)]
+        data[12] = None
+        dlm6 = _dlm(data)
+        dlm7 = _dlm(data)
+        for model in [dlm6, dlm7]:
+            model.builder + trend(degree=2, discount=1, w=1.0) + \
+                seasonality(period=4, discount=1, w=1.0)
+            model._initialize()
+
+        # the incremental window agrees with re-running the filter
+        dlm6._rollingFilter(start=6, end=29, windowLength=6)
+        for today in range(6, 30):
+            dlm7._forwardFilter(start=today - 5, end=today, save=today,
+                                ForgetPrevious=True)
+        for record in ['filteredObs', 'filteredObsVar', 'predictedObs',
+                       'predictedObsVar', 'noiseVar']:
+            self.assertAlmostEqual(np.sum(np.abs(
+                np.array(getattr(dlm6.result, record)[6:]) -
+                np.array(getattr(dlm7.result, record)[6:]))), 0.0)
+
     def testBackwardSmoother(self):
         self.dlm1._forwardFilter(start = 0, end = 19, renew = False)
         self.dlm1.result.filteredSteps = (0, 19)
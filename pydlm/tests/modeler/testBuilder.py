@@ -5,6 +5,7 @@ from pydlm.modeler.trends import trend
 from pydlm.modeler.seasonality import seasonality
 from pydlm.modeler.dynamic import dynamic
 from pydlm.modeler.autoReg import autoReg
+from pydlm.modeler.fourierSeason import fourierSeason
 from pydlm.modeler.matrixTools import matrixTools as mt
 
 
@@ -52,6 +53,28 @@ class testBuilder(unittest.TestCase):
         self.builder1 = self.builder1 + self.autoReg
         self.assertEqual(len(self.builder1.automaticComponents), 1)
 
+    def testComponentIndex(self):
+        self.builder1 = self.builder1 + self.trend + self.dynamic \
+                        + self.seasonality
+        self.assertEqual(self.builder1.componentIndex,
+                         {'trend': (0, 2), 'seasonality': (3, 9),
+                          'dynamic': (10, 11)})
+
+        # deleting a component only shifts the offsets of the others
+        self.builder1.delete('trend')
+        self.assertEqual(self.builder1.componentIndex,
+                         {'seasonality': (0, 6), 'dynamic': (7, 8)})
+        self.builder1.initialize()
+        self.assertEqual(self.builder1.model.transition.shape, (9, 9))
+        self.assertAlmostEqual(np.sum(np.abs(
+            self.builder1.model.transition[0:7, 0:7]
+            - self.seasonality.transition)), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            self.builder1.sysVarPrior[7:9, 7:9]
+            - self.dynamic.covPrior)), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            self.builder1.sysVarPrior[0:7, 7:9])), 0.0)
+
     def testInitialize(self):
         self.builder1 = self.builder1 + self.trend + self.dynamic \
                         + self.autoReg
@@ -68,8 +91,9 @@ class testBuilder(unittest.TestCase):
         self.builder1 = self.builder1 + self.trend + self.dynamic
         self.builder1.dynamicComponents['dynamic'].updateEvaluation(8)
         self.builder1.initialize()
-        print self.builder1.model.evaluation, mt.matrixAddByCol(self.trend.evaluation,
-                                                 self.dynamic.evaluation)
+        print(self.builder1.model.evaluation,
+              mt.matrixAddByCol(self.trend.evaluation,
+                                self.dynamic.evaluation))
         self.assertAlmostEqual(np.sum(
             np.abs(self.builder1.model.evaluation -
                    mt.matrixAddByCol(self.trend.evaluation,
@@ -88,4 +112,25 @@ class testBuilder(unittest.TestCase):
                        np.matrix([self.features[2]])),
                                        np.matrix(self.autoReg.features[2])))), 0.0)
 
+    def testTransitionPower(self):
+        self.builder1 = self.builder1 + self.trend + self.seasonality \
+                        + fourierSeason(period=12, harmonics=6) \
+                        + self.dynamic + self.autoReg
+
+        self.builder1.initialize()
+        for k in [0, 1, 2, 9]:
+            self.assertAlmostEqual(np.sum(np.abs(
+                self.builder1.transitionPower(k) -
+                np.linalg.matrix_power(self.builder1.model.transition, k))),
+                                   0.0)
+
+        # the powers beyond the horizon are not cached
+        self.builder1.maxPowerHorizon = 5
+        self.assertAlmostEqual(np.sum(np.abs(
+            self.builder1.transitionPower(12) -
+            np.linalg.matrix_power(self.builder1.model.transition, 12))),
+                               0.0)
+        self.assertTrue(2 in self.builder1._transitionPowers)
+        self.assertTrue(12 not in self.builder1._transitionPowers)
+
 unittest.main()
@@ -0,0 +1,41 @@
+import numpy as np
+import unittest
+from pydlm.modeler.fourierSeason import fourierSeason
+from pydlm.modeler.builder import builder
+from pydlm.base.kalmanFilter import kalmanFilter
+
+
+class testFourierSeason(unittest.TestCase):
+
+    def setUp(self):
+        self.season = fourierSeason(period=12, harmonics=3, w=1.0)
+
+    def testInitialization(self):
+        self.assertEqual(self.season.d, 6)
+        self.assertEqual(self.season.componentType, 'seasonality')
+        self.assertEqual(self.season.evaluation.tolist(),
+                         [[1, 0, 1, 0, 1, 0]])
+        self.season.checkDimensions()
+
+        # the even period with all harmonics has a single Nyquist state
+        fullSeason = fourierSeason(period=4, harmonics=2)
+        self.assertEqual(fullSeason.d, 3)
+        self.assertAlmostEqual(fullSeason.transition[2, 2], -1.0)
+
+    def testTransitionPeriodicity(self):
+        power = np.linalg.matrix_power(self.season.transition, 12)
+        self.assertAlmostEqual(np.max(np.abs(power - np.eye(6))), 0.0)
+
+    def testFilterOnHarmonic(self):
+        dlm = builder()
+        dlm.add(fourierSeason(period=12, harmonics=1, discount=1, w=100.0))
+        dlm.initialize()
+        kf = kalmanFilter(discount=dlm.discount)
+        data = [np.cos(2 * np.pi * (t + 1) / 12) for t in range(48)]
+        for y in data:
+            kf.forwardFilter(dlm.model, y)
+        kf.predict(dlm.model)
+        self.assertAlmostEqual(dlm.model.prediction.obs[0, 0],
+                               np.cos(2 * np.pi * 49 / 12), places=3)
+
+unittest.main()
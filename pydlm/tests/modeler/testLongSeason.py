@@ -44,14 +44,26 @@ class testLongSeason(unittest.TestCase):
         self.assertEqual(self.longSeason.nextState, [2, 3])
         self.assertEqual(self.longSeason.n, 11)
 
+    def testGetFeature(self):
+        self.assertEqual(self.longSeason.getFeature(5), [0, 1, 0, 0])
+        self.assertEqual(self.longSeason.getFeature(100), [0, 1, 0, 0])
+        self.assertEqual(self.longSeason.getFeature(11),
+                         self.longSeason.features[11])
+
+        # the features are read only
+        with self.assertRaises(NameError):
+            self.longSeason.features = [[1, 0, 0, 0]]
+
     def testUpdateEvaluation(self):
-        trueFeatures = [[1, 0, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0],
-                        [0, 1, 0, 0], [0, 1, 0, 0], [0, 1, 0, 0], [0, 1, 0, 0],
-                        [0, 0, 1, 0], [0, 0, 1, 0], [0, 0, 1, 0], [0, 0, 1, 0],
-                        [0, 0, 0, 1]]
         self.longSeason.updateEvaluation(12)
-        self.assertEqual(self.longSeason.features, trueFeatures)
-        self.assertEqual(self.longSeason.nextState, [3, 1])
+        self.assertEqual(self.longSeason.evaluation.tolist(), [[0, 0, 0, 1]])
+        self.assertEqual(self.longSeason.nextState, [3, 0])
         self.assertEqual(self.longSeason.n, 12)
 
+        # the feature only depends on the index, even far out of the data
+        self.longSeason.updateEvaluation(100)
+        self.assertEqual(self.longSeason.evaluation.tolist(), [[0, 1, 0, 0]])
+        self.longSeason.updateEvaluation(3)
+        self.assertEqual(self.longSeason.evaluation.tolist(), [[1, 0, 0, 0]])
+
 unittest.main()
@@ -1,3 +1,4 @@
+import io
 import numpy as np
 import unittest
 
@@ -5,6 +6,7 @@ from pydlm.modeler.trends import trend
 from pydlm.modeler.seasonality import seasonality
 from pydlm.modeler.dynamic import dynamic
 from pydlm.modeler.autoReg import autoReg
+from pydlm.modeler.fourierSeason import fourierSeason
 from pydlm.dlm import dlm
 
 class testDlm(unittest.TestCase):
@@ -107,6 +109,40 @@ class testDlm(unittest.TestCase):
         self.assertAlmostEqual(np.sum(np.array(dlm4.result.filteredObs) - \
                                       np.array(dlm5.result.filteredObs)), 0.0)
 
+    def testMissingValues(self):
+        # NaN is the same as None in the data
+        data = np.array(self.data, dtype=float)
+        data[3] = np.nan
+        dlm4 = dlm(data) + trend(degree=1, discount=1, w=1.0)
+        dlm5 = dlm(self.data[:3] + [None] + self.data[4:]) + \
+            trend(degree=1, discount=1, w=1.0)
+        dlm4.fit()
+        dlm5.fit()
+        self.assertTrue(dlm4.data[3] is None)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm4.getMean()) - np.array(dlm5.getMean()))), 0.0)
+
+        # the missing features do not take part in the filter
+        features = [list(x) for x in self.features]
+        features[5][0] = None
+        features[8] = [np.nan, np.nan]
+        dlm6 = dlm(self.data) + trend(degree=1, discount=1, w=1.0) + \
+            dynamic(features=features, discount=1, w=1.0)
+        dlm6.fit()
+        self.assertEqual(list(np.where(dlm6._missingDates)[0]), [5, 8])
+        self.assertFalse(np.any(np.isnan(dlm6.getMean())))
+        self.assertFalse(np.any(np.isnan(
+            dlm6.getMean(filterType='backwardSmoother'))))
+        self.assertAlmostEqual(np.sum(np.abs(
+            dlm6.result.filteredState[8] - dlm6.result.predictedState[8])),
+                               0.0)
+
+        # the same holds for the rolling window
+        dlm7 = dlm(self.data) + trend(degree=1, discount=1, w=1.0) + \
+            dynamic(features=features, discount=1, w=1.0)
+        dlm7.fitForwardFilter(useRollingWindow=True, windowLength=5)
+        self.assertFalse(np.any(np.isnan(dlm7.getMean())))
+
     def testAppendAutomatic(self):
         # we feed the data to dlm4 via two segments
         dlm4 = dlm(self.data[0:11])
@@ -176,6 +212,142 @@ class testDlm(unittest.TestCase):
         self.assertAlmostEqual(np.sum(np.array(dlm4.result.filteredObs) - \
                                       np.array(dlm5.result.filteredObs)), 0.0)
 
+    def testSaveAndLoadState(self):
+        dlm6 = dlm(self.data[0:15]) + trend(degree=2, discount=0.95, w=1.0)
+        dlm6.fitForwardFilter()
+        snapshot = io.BytesIO()
+        dlm6.saveState(snapshot)
+
+        # the loaded model predicts without refitting
+        snapshot.seek(0)
+        dlm7 = dlm(self.data[0:15]) + trend(degree=2, discount=0.95, w=1.0)
+        dlm7.loadState(snapshot)
+        self.assertEqual(dlm7.result.filteredSteps, [14, 14])
+        self.assertAlmostEqual(dlm6.predict()[0][0, 0],
+                               dlm7.predict()[0][0, 0])
+        self.assertAlmostEqual(dlm6.predict()[1][0, 0],
+                               dlm7.predict()[1][0, 0])
+
+        # and the forward filter continues from the saved date
+        dlm6.append(self.data[15:20])
+        dlm7.append(self.data[15:20])
+        dlm6.fitForwardFilter()
+        dlm7.fitForwardFilter()
+        self.assertAlmostEqual(dlm6.result.filteredObs[19][0, 0],
+                               dlm7.result.filteredObs[19][0, 0])
+
+        # the per-date results are restored when saved
+        snapshot = io.BytesIO()
+        dlm6.saveState(snapshot, includeResult=True)
+        snapshot.seek(0)
+        dlm8 = dlm(self.data) + trend(degree=2, discount=0.95, w=1.0)
+        dlm8.loadState(snapshot)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean()) - np.array(dlm8.getMean()))), 0.0)
+
+        # the components have to match
+        snapshot.seek(0)
+        dlm9 = dlm(self.data) + trend(degree=1, discount=0.95, w=1.0)
+        self.assertRaises(NameError, dlm9.loadState, snapshot)
+
+        # the log-likelihood is restored with the missing dates
+        data = self.data[:3] + [None] + self.data[4:]
+        dlm10 = dlm(data) + trend(degree=2, discount=0.95, w=1.0)
+        dlm10.fitForwardFilter()
+        snapshot = io.BytesIO()
+        dlm10.saveState(snapshot, includeResult=True)
+        snapshot.seek(0)
+        dlm11 = dlm(data) + trend(degree=2, discount=0.95, w=1.0)
+        dlm11.loadState(snapshot)
+        self.assertTrue(dlm11.result.logLikelihood[3] is None)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm10.logLikelihood(perStep=True)) -
+            np.array(dlm11.logLikelihood(perStep=True)))), 0.0)
+
+    def testColdStartLoadState(self):
+        data = np.random.random(60).tolist()
+        features = np.random.random((60, 2)).tolist()
+
+        def build(start, end):
+            return dlm(data[start:end]) + \
+                trend(degree=1, discount=0.8, w=1.0) + \
+                dynamic(features=features[start:end], discount=0.9,
+                        w=1.0, name='d') + \
+                autoReg(degree=2, data=data[start:end], discount=0.9,
+                        w=1.0, name='ar')
+
+        dlm6 = build(0, 40)
+        dlm6.fitForwardFilter()
+        snapshot = io.BytesIO()
+        dlm6.saveState(snapshot)
+        dlm6.append(data[40:])
+        dlm6.append(features[40:], component='d')
+        dlm6.fitForwardFilter()
+
+        # the model resumes with only the data after the saved date
+        snapshot.seek(0)
+        dlm7 = build(40, 60)
+        dlm7.loadState(snapshot)
+        self.assertEqual(dlm7.n, 60)
+        self.assertEqual(dlm7.result.filteredSteps, [39, 39])
+        dlm7.fitForwardFilter()
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean()[39:]) - np.array(dlm7.getMean()))), 0.0)
+        self.assertAlmostEqual(
+            dlm6.predict(featureDict={'d': [0.5, 0.5]})[1][0, 0],
+            dlm7.predict(featureDict={'d': [0.5, 0.5]})[1][0, 0])
+
+        # the modes are restored as well
+        dlm8 = dlm(data[:40]) + trend(degree=2, discount=0.9, w=1.0)
+        dlm8.stableMode(True, method='sqrt', storeFactor=True)
+        dlm8.historyMode(maxHistory=25)
+        dlm8.fitForwardFilter()
+        snapshot = io.BytesIO()
+        dlm8.saveState(snapshot)
+        dlm8.append(data[40:])
+        dlm8.fitForwardFilter()
+
+        snapshot.seek(0)
+        dlm9 = dlm(data[40:]) + trend(degree=2, discount=0.9, w=1.0)
+        dlm9.loadState(snapshot)
+        self.assertEqual(dlm9.options.stableMethod, 'sqrt')
+        self.assertTrue(dlm9.options.storeFactor)
+        self.assertEqual(dlm9.options.maxHistory, 25)
+        dlm9.fitForwardFilter()
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm8.getMean()[-20:]) - np.array(dlm9.getMean()))), 0.0)
+
+    def testCheckpointMode(self):
+        data = np.random.random(30).tolist()
+        features = np.random.random((30, 2)).tolist()
+        dlm6 = dlm(data) + trend(degree=1, discount=0.9, w=1.0) + \
+            seasonality(period=4, discount=0.9, w=1.0) + \
+            dynamic(features=features, discount=0.95, w=1.0)
+        dlm7 = dlm(data) + trend(degree=1, discount=0.9, w=1.0) + \
+            seasonality(period=4, discount=0.9, w=1.0) + \
+            dynamic(features=features, discount=0.95, w=1.0)
+        dlm7.checkpointMode(interval=4)
+        dlm6.fit()
+        dlm7.fit()
+
+        # covariances are only kept on the checkpoints
+        self.assertTrue(dlm7.result.filteredCov[5] is None)
+        self.assertTrue(dlm7.result.filteredCov[8] is not None)
+        self.assertTrue(dlm7.result.filteredCov[29] is not None)
+
+        # the smoothed results are the same as the full storage
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean(filterType='backwardSmoother')) -
+            np.array(dlm7.getMean(filterType='backwardSmoother')))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getVar(filterType='backwardSmoother')) -
+            np.array(dlm7.getVar(filterType='backwardSmoother')))), 0.0)
+
+        # the status of a non-checkpoint date is recovered for prediction
+        self.assertAlmostEqual(dlm6.predict(date=10)[1][0, 0],
+                               dlm7.predict(date=10)[1][0, 0])
+        self.assertTrue(dlm7.result.filteredCov[10] is None)
+
     def testOneDayAheadPredictWithoutDynamic(self):
         self.dlm3.fitForwardFilter()
         (obs, var) = self.dlm3.predict(date=11)
@@ -225,6 +397,460 @@ class testDlm(unittest.TestCase):
         (obs, var) = self.dlm5.continuePredict()
         self.assertAlmostEqual(obs, 101.07480945)
 
+    def testUpdate(self):
+        dlm6 = dlm(self.data[0:15]) + trend(degree=1, discount=0.9, w=1.0) + \
+            seasonality(period=3, discount=0.8, w=1.0) + \
+            dynamic(features=self.features[0:15], discount=0.95, w=1.0)
+        dlm6.fitForwardFilter()
+        for i in range(15, 20):
+            (err, var) = dlm6.update(self.data[i],
+                                     features={'dynamic':
+                                               self.features[i]})
+            self.assertAlmostEqual(err, self.data[i] -
+                                   dlm6.result.predictedObs[i][0, 0])
+
+        dlm7 = dlm(self.data) + trend(degree=1, discount=0.9, w=1.0) + \
+            seasonality(period=3, discount=0.8, w=1.0) + \
+            dynamic(features=self.features, discount=0.95, w=1.0)
+        dlm7.fitForwardFilter()
+        self.assertEqual(dlm6.result.filteredSteps, [0, 19])
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean()) - np.array(dlm7.getMean()))), 0.0)
+        self.assertAlmostEqual(var, dlm7.result.predictedObsVar[19][0, 0])
+
+        # the features of the dynamic components are required
+        self.assertRaises(NameError, dlm6.update, 0)
+
+    def testFilterStream(self):
+        dlm6 = dlm(self.data[0:15]) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features[0:15], discount=0.95, w=1.0)
+        dlm6.fitForwardFilter()
+        stream = ((self.data[i], {'dynamic': self.features[i]})
+                  for i in range(15, 20))
+        records = list(dlm6.filterStream(stream))
+        self.assertEqual(dlm6.n, 15)
+
+        dlm7 = dlm(self.data) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features, discount=0.95, w=1.0)
+        dlm7.fitForwardFilter()
+        self.assertAlmostEqual(records[4]['filteredObs'],
+                               dlm7.result.filteredObs[19][0, 0])
+        self.assertAlmostEqual(records[4]['predictedObsVar'],
+                               dlm7.result.predictedObsVar[19][0, 0])
+
+        # the history is kept when asked
+        stream = ((self.data[i], {'dynamic': self.features[i]})
+                  for i in range(15, 20))
+        for record in dlm6.filterStream(stream, saveHistory=True):
+            pass
+        self.assertEqual(dlm6.n, 20)
+        self.assertAlmostEqual(dlm6.result.filteredObs[19][0, 0],
+                               dlm7.result.filteredObs[19][0, 0])
+
+    def testHistoryMode(self):
+        spilled = []
+        dlm6 = dlm(self.data[0:15]) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features[0:15], discount=0.95, w=1.0)
+        dlm6.stableMode(False)
+        dlm6.historyMode(maxHistory=8,
+                         sink=lambda name, date, value:
+                         spilled.append((name, date)))
+        dlm6.fitForwardFilter()
+        for i in range(15, 20):
+            dlm6.update(self.data[i],
+                        features={'dynamic': self.features[i]})
+        dlm6.fitBackwardSmoother()
+
+        dlm7 = dlm(self.data) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features, discount=0.95, w=1.0)
+        dlm7.stableMode(False)
+        dlm7.fit()
+
+        # only the last 8 dates are kept, with the global index
+        self.assertEqual(len(list(dlm6.result.filteredObs)), 8)
+        self.assertEqual(len(list(dlm6.data)), 8)
+        self.assertTrue(('filteredObs', 0) in spilled)
+        self.assertRaises(NameError, dlm6.predict, 5)
+        self.assertAlmostEqual(dlm6.predict(date=15)[0][0, 0],
+                               dlm7.predict(date=15)[0][0, 0])
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean()) - np.array(dlm7.getMean()[12:]))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean(filterType='backwardSmoother')) -
+            np.array(dlm7.getMean(filterType='backwardSmoother')[12:]))),
+                               0.0)
+
+    def testStableModeSqrt(self):
+        dlm6 = dlm(self.data) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features, discount=0.95, w=1.0)
+        dlm6.stableMode(True, method='sqrt')
+        dlm6.fitForwardFilter()
+
+        # a single pass over all the data, same as the plain filter
+        dlm7 = dlm(self.data) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features, discount=0.95, w=1.0)
+        dlm7.stableMode(False)
+        dlm7.fitForwardFilter()
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean()) - np.array(dlm7.getMean()))), 0.0)
+        for cov in dlm6.result.filteredCov:
+            self.assertTrue(np.min(np.linalg.eigvalsh(cov)) > -1e-10)
+        self.assertRaises(NameError, dlm6.stableMode, True, 'qr')
+
+        # only the factors are stored, and the covariances come from them
+        dlm6.stableMode(True, method='sqrt', storeFactor=True)
+        dlm6.fit()
+        self.assertTrue(dlm6.result.filteredCov[10] is None)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getLatentCov()) -
+            np.array(dlm7.getLatentCov()))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getVar()) - np.array(dlm7.getVar()))), 0.0)
+        self.assertRaises(NameError, dlm6.stableMode, True, 'renew', True)
+
+    def testFixedLagMode(self):
+        dlm6 = dlm(self.data[0:15]) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features[0:15], discount=0.95, w=1.0)
+        dlm6.fixedLagMode(lag=4)
+        dlm6.fitForwardFilter()
+        self.assertEqual(dlm6.result.smoothedSteps, [11, 14])
+        for i in range(15, 20):
+            dlm6.update(self.data[i],
+                        features={'dynamic': self.features[i]})
+
+        dlm7 = dlm(self.data) + trend(degree=1, discount=0.9, w=1.0) + \
+            dynamic(features=self.features, discount=0.95, w=1.0)
+        dlm7.fit()
+
+        # the last 4 dates agree with the full backward smoother
+        self.assertEqual(dlm6.result.smoothedSteps, [16, 19])
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean(filterType='backwardSmoother')) -
+            np.array(dlm7.getMean(filterType='backwardSmoother')[16:]))),
+                               0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getVar(filterType='backwardSmoother')) -
+            np.array(dlm7.getVar(filterType='backwardSmoother')[16:]))),
+                               0.0)
+
+        # the full smoother continues from the window
+        dlm6.fitBackwardSmoother()
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean(filterType='backwardSmoother')) -
+            np.array(dlm7.getMean(filterType='backwardSmoother')))), 0.0)
+
+        dlm6.checkpointMode(3)
+        self.assertRaises(NameError, dlm6.fitForwardFilter)
+
+    def testSteadyStateMode(self):
+        data = np.sin(np.arange(300) / 5.0).tolist()
+        data[200] = None
+        dlm6 = dlm(data) + trend(degree=1, discount=0.9, w=1.0)
+        dlm6.stableMode(False)
+        dlm6.steadyStateMode(tolerance=1e-10)
+        dlm6.fit()
+        dlm7 = dlm(data) + trend(degree=1, discount=0.9, w=1.0)
+        dlm7.stableMode(False)
+        dlm7.fit()
+        self.assertTrue(dlm6.Filter._steady is not None)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean()) - np.array(dlm7.getMean()))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getVar()) - np.array(dlm7.getVar()))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean(filterType='backwardSmoother')) -
+            np.array(dlm7.getMean(filterType='backwardSmoother')))), 0.0)
+
+        self.assertRaises(NameError, dlm6.steadyStateMode, True, 0.0)
+        dlm6.stableMode(True, method='sqrt')
+        self.assertRaises(NameError, dlm6.fitForwardFilter)
+
+    def testInformationMode(self):
+        dlm6 = dlm(self.data) + trend(degree=1, discount=1.0, w=1.0) + \
+            dynamic(features=self.features, discount=1.0, w=1.0)
+        dlm6.informationMode()
+        dlm6.fit()
+        dlm7 = dlm(self.data) + trend(degree=1, discount=1.0, w=1.0) + \
+            dynamic(features=self.features, discount=1.0, w=1.0)
+        dlm7.fit()
+
+        # only the precisions are stored
+        self.assertTrue(dlm6.result.filteredCov[10] is None)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean()) - np.array(dlm7.getMean()))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getVar()) - np.array(dlm7.getVar()))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getLatentCov(name='dynamic')) -
+            np.array(dlm7.getLatentCov(name='dynamic')))), 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm6.getMean(filterType='backwardSmoother')) -
+            np.array(dlm7.getMean(filterType='backwardSmoother')))), 0.0)
+        self.assertAlmostEqual(
+            dlm6.predict(featureDict={'dynamic': [1.0, 1.0]})[1][0, 0],
+            dlm7.predict(featureDict={'dynamic': [1.0, 1.0]})[1][0, 0])
+
+        dlm8 = dlm(self.data) + trend(degree=1, discount=0.9, w=1.0)
+        dlm8.informationMode()
+        self.assertRaises(NameError, dlm8.fitForwardFilter)
+
+        # the seasonality has a singular prior, fourierSeason does not
+        dlm9 = dlm(self.data) + trend(degree=1, discount=1.0) + \
+            seasonality(period=7, discount=1.0)
+        dlm9.informationMode()
+        self.assertRaises(NameError, dlm9.fitForwardFilter)
+        dlm10 = dlm(self.data) + trend(degree=1, discount=1.0) + \
+            fourierSeason(period=7, harmonics=2, discount=1.0)
+        dlm10.informationMode()
+        dlm10.fitForwardFilter()
+        dlm11 = dlm(self.data) + trend(degree=1, discount=1.0) + \
+            fourierSeason(period=7, harmonics=2, discount=1.0)
+        dlm11.fitForwardFilter()
+        self.assertAlmostEqual(np.sum(np.abs(
+            np.array(dlm10.getMean()) - np.array(dlm11.getMean()))), 0.0)
+
+    def testParallelMode(self):
+        data = [1.0, 3.0, None, -2.0, 0.5, 1.5, None, None, 2.0, 1.0,
+                -1.0, 0.0, 2.5, 1.0, 0.5]
+        dlm6 = dlm(data[:10]) + trend(degree=2, discount=0.9, w=1.0) + \
+            dynamic(features=self.features[:10], discount=0.9, w=1.0)
+        dlm7 = dlm(data[:10]) + trend(degree=2, discount=0.9, w=1.0) + \
+            dynamic(features=self.features[:10], discount=0.9, w=1.0)
+        for model in [dlm6, dlm7]:
+            model.evolveMode('dependent')
+            model.stableMode(False)
+        dlm6.parallelMode(workers=2, chunkSize=3)
+        dlm6.fit()
+        dlm7.fit()
+
+        # continue the filter on the new data
+        for model in [dlm6, dlm7]:
+            model.append(data[10:])
+            model.append(self.features[10:15], component='dynamic')
+            model.fit()
+        for filterType in ['forwardFilter', 'backwardSmoother']:
+            self.assertAlmostEqual(np.sum(np.abs(
+                np.array(dlm6.getMean(filterType=filterType)) -
+                np.array(dlm7.getMean(filterType=filterType)))), 0.0)
+            self.assertAlmostEqual(np.sum(np.abs(
+                np.array(dlm6.getVar(filterType=filterType)) -
+                np.array(dlm7.getVar(filterType=filterType)))), 0.0)
+            self.assertAlmostEqual(np.sum(np.abs(
+                np.array(dlm6.getLatentCov(filterType=filterType)) -
+                np.array(dlm7.getLatentCov(filterType=filterType)))), 0.0)
+        featureDict = {'dynamic': [1.0, 1.0]}
+        self.assertAlmostEqual(dlm6.predict(featureDict=featureDict)[1][0, 0],
+                               dlm7.predict(featureDict=featureDict)[1][0, 0])
+
+        self.assertRaises(NameError, dlm6.parallelMode, True, 0)
+
+    def testPredictN(self):
+        # agrees with predict followed by continuePredict
+        self.dlm5.fitForwardFilter()
+        (obs, var, cov) = self.dlm5.predictN(N=3, date=99,
+                                             fullCovariance=True)
+        (obs1, var1) = self.dlm5.predict(date=99)
+        (obs2, var2) = self.dlm5.continuePredict()
+        (obs3, var3) = self.dlm5.continuePredict()
+        self.assertAlmostEqual(obs[0], obs1[0, 0])
+        self.assertAlmostEqual(obs[2], obs3[0, 0])
+        self.assertAlmostEqual(var[1], var2[0, 0])
+        self.assertAlmostEqual(var[2], var3[0, 0])
+        self.assertAlmostEqual(np.sum(np.abs(np.diag(cov) - var)), 0.0)
+
+        # with features for the dynamic component
+        self.dlm4.fitForwardFilter()
+        (obs, var) = self.dlm4.predictN(N=2, date=9,
+                                        featureDict={'dynamic': [[2.0],
+                                                                 [3.0]]})
+        self.assertAlmostEqual(obs[0], 5.0/6 * 2)
+        self.assertAlmostEqual(obs[1], 5.0/6 * 3)
+        self.assertAlmostEqual(self.dlm4.result.predictStatus[1], 11)
+        self.assertRaises(NameError, self.dlm4.predictN, N=2, date=9)
+
+    def testPredictAhead(self):
+        self.dlm3.fitForwardFilter()
+        (obs, var) = self.dlm3.predictN(N=5)
+        (obs5, var5) = self.dlm3.predictAhead(days=5)
+        self.assertAlmostEqual(obs[4], obs5[0, 0])
+        self.assertAlmostEqual(var[4], var5[0, 0])
+
+        self.dlm5.fitForwardFilter()
+        self.assertRaises(NameError, self.dlm5.predictAhead, days=2)
+
+    def testPredictScenarios(self):
+        self.dlm4.fitForwardFilter()
+        (obs, var) = self.dlm4.predictScenarios(date=9,
+                                                features=[[2.0], [3.0]])
+        self.assertAlmostEqual(obs[0], 5.0/6 * 2)
+        self.assertAlmostEqual(obs[1], 5.0/6 * 3)
+        (obs3, var3) = self.dlm4.predict(date=9, featureDict={'dynamic': 3.0})
+        self.assertAlmostEqual(var[1], var3[0, 0])
+
+        (obs, var) = self.dlm4.predictScenarios(
+            date=9, features={'dynamic': [[2.0], [3.0]]})
+        self.assertAlmostEqual(obs[1], 5.0/6 * 3)
+        self.assertRaises(NameError, self.dlm4.predictScenarios, date=9,
+                          features=[[2.0, 1.0]])
+
+    def testSimulateForecast(self):
+        self.dlm5.fitForwardFilter()
+        paths = self.dlm5.simulateForecast(N=3, nPaths=2000, seed=1)
+        self.assertEqual(paths.shape, (2000, 3))
+
+        # the first day follows the one day ahead prediction
+        (obs, var) = self.dlm5.predict()
+        self.assertTrue(abs(np.mean(paths[:, 0]) - obs[0, 0]) <
+                        4 * np.sqrt(var[0, 0] / 2000))
+        np.testing.assert_array_equal(
+            paths, self.dlm5.simulateForecast(N=3, nPaths=2000, seed=1))
+
+        # the variance of each day agrees with predictN
+        dlm6 = dlm(self.data) + trend(degree=2, discount=0.9, w=1.0)
+        dlm6.fitForwardFilter()
+        paths = dlm6.simulateForecast(N=5, nPaths=20000, seed=1)
+        (obs, var) = dlm6.predictN(N=5)
+        np.testing.assert_allclose(np.var(paths, axis=0), var, rtol=0.05)
+
+    def testBacktest(self):
+        dlm6 = dlm(self.data) + trend(degree=2, discount=0.95, w=1.0) + \
+            dynamic(features=self.features, discount=0.9, w=1.0)
+        dlm6.fitForwardFilter()
+        (mean, var, metrics) = dlm6.backtest(horizons=[1, 3])
+        self.assertEqual(mean.shape, (20, 2))
+        self.assertTrue(np.isnan(mean[19, 0]))
+        self.assertTrue(np.isnan(var[17, 1]))
+
+        # agrees with the prediction from a single date
+        (obs, obsVar) = dlm6.predict(date=10)
+        self.assertAlmostEqual(mean[10, 0], obs[0, 0])
+        self.assertAlmostEqual(var[10, 0], obsVar[0, 0])
+        (obs, obsVar) = dlm6.predictAhead(days=3, date=10)
+        self.assertAlmostEqual(mean[10, 1], obs[0, 0])
+        self.assertAlmostEqual(var[10, 1], obsVar[0, 0])
+
+        self.assertAlmostEqual(metrics['mse'][0],
+                               np.mean((np.array(self.data[1:]) -
+                                        mean[:19, 0]) ** 2))
+
+        # the missing features are masked as in the filter
+        features = [list(x) for x in self.features]
+        features[12] = [np.nan, np.nan]
+        dlm7 = dlm(self.data) + trend(degree=2, discount=0.95, w=1.0) + \
+            dynamic(features=features, discount=0.9, w=1.0)
+        dlm7.fitForwardFilter()
+        (mean, var, metrics) = dlm7.backtest(horizons=[1, 3])
+        self.assertFalse(np.any(np.isnan(mean[:19, 0])))
+        self.assertFalse(np.any(np.isnan(var[:17, 1])))
+
+    def testLogLikelihoodInvalidVariance(self):
+        # without the stable mode, the rounding errors of a long fit make
+        # some predicted variances negative, whose dates are left out
+        random = np.random.RandomState(1)
+        data = (np.sin(np.arange(500) / 3.0) +
+                0.3 * random.randn(500)).tolist()
+        dlm6 = dlm(data) + trend(degree=2, discount=0.95) + \
+            seasonality(period=7, discount=0.95)
+        dlm6.stableMode(False)
+        dlm6.fitForwardFilter()
+        logLikelihood = dlm6.logLikelihood(perStep=True)
+        self.assertTrue(np.any(np.isnan(logLikelihood)))
+        self.assertAlmostEqual(dlm6.logLikelihood(),
+                               np.nansum(logLikelihood))
+        self.assertTrue(np.isfinite(dlm6.logLikelihood()))
+
+    def testLogLikelihood(self):
+        # the first prediction is a Cauchy distribution (df = 1) with
+        # location 0 and scale sqrt(2)
+        self.dlm1.fitForwardFilter()
+        logLikelihood = self.dlm1.logLikelihood(perStep=True)
+        self.assertEqual(len(logLikelihood), 20)
+        self.assertAlmostEqual(logLikelihood[0],
+                               -np.log(np.pi * np.sqrt(2.0)))
+        self.assertAlmostEqual(self.dlm1.logLikelihood(),
+                               np.sum(logLikelihood))
+
+        # the missing date contributes nothing and the other dates are the
+        # same with the parallel filter
+        dlm6 = dlm(self.data[:5] + [None] + self.data[6:]) + \
+            trend(degree=2, discount=0.9, w=1.0)
+        dlm6.evolveMode('dependent')
+        dlm6.stableMode(False)
+        dlm6.fitForwardFilter()
+        dlm7 = dlm(self.data[:5] + [None] + self.data[6:]) + \
+            trend(degree=2, discount=0.9, w=1.0)
+        dlm7.evolveMode('dependent')
+        dlm7.stableMode(False)
+        dlm7.parallelMode()
+        dlm7.fitForwardFilter()
+        self.assertEqual(dlm6.logLikelihood(perStep=True)[5], 0.0)
+        self.assertAlmostEqual(np.sum(np.abs(
+            dlm6.logLikelihood(perStep=True) -
+            dlm7.logLikelihood(perStep=True))), 0.0)
+
+    def testTune(self):
+        dlm6 = dlm(self.data) + trend(degree=2, discount=0.95, w=1.0) + \
+            dynamic(features=self.features, discount=0.9, w=1.0)
+        dlm6.stableMode(False)
+        best, table = dlm6.tune({'trend': [0.9, 0.99],
+                                 'noisePrior': [0.5, 1.0]},
+                                workers=2, stopMargin=None)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(set(best), set(['trend', 'noisePrior']))
+
+        # the log-likelihood of a candidate is the one of the refitted dlm
+        dlm7 = dlm(self.data) + trend(degree=2, discount=0.9, w=1.0) + \
+            dynamic(features=self.features, discount=0.9, w=1.0)
+        dlm7.stableMode(False)
+        dlm7.noisePrior(0.5)
+        dlm7.fitForwardFilter()
+        row = [row for row in table
+               if row['trend'] == 0.9 and row['noisePrior'] == 0.5][0]
+        self.assertAlmostEqual(row['loglik'], dlm7.logLikelihood())
+        bestRow = max(table, key=lambda row: row['loglik'])
+        self.assertEqual(best['trend'], bestRow['trend'])
+        self.assertEqual(best['noisePrior'], bestRow['noisePrior'])
+
+        # candidates drawn within the bounds
+        best, table = dlm6.tune({'trend': (0.8, 1.0)}, metric='mse',
+                                nSamples=3, workers=1, seed=1)
+        self.assertEqual(len(table), 3)
+        self.assertTrue(0.8 <= best['trend'] <= 1.0)
+
+    def testOptimizeDiscount(self):
+        dlm6 = dlm(self.data) + trend(degree=1, discount=0.95, w=1.0) + \
+            dynamic(features=self.features, discount=0.95, w=1.0)
+        best, path = dlm6.optimizeDiscount(bounds=(0.7, 1.0))
+        self.assertEqual(set(best), set(['trend', 'dynamic']))
+        self.assertTrue(path[-1]['loglik'] >= path[0]['loglik'])
+
+        # the log-likelihood is the one of the refitted dlm
+        dlm7 = dlm(self.data) + \
+            trend(degree=1, discount=best['trend'], w=1.0) + \
+            dynamic(features=self.features, discount=best['dynamic'], w=1.0)
+        dlm7.stableMode(False)
+        dlm7.fitForwardFilter()
+        self.assertAlmostEqual(path[-1]['loglik'], dlm7.logLikelihood())
+
+    def testFitPrior(self):
+        data = [10.0 + (i % 3) + 0.1 * ((i * 7) % 5) for i in range(60)]
+        data[20] = None
+        dlm6 = dlm(data) + trend(degree=1, discount=0.98, w=1.0) + \
+            seasonality(period=3, discount=0.99, w=1.0)
+        path = dlm6.fitPrior(maxIter=10)
+        self.assertTrue(len(path) > 1)
+        self.assertEqual(path[0]['noisePrior'], 1.0)
+        self.assertNotEqual(dlm6.options.noise, 1.0)
+
+        # the dlm is left with the priors of the best fit
+        best = max(step['loglik'] for step in path)
+        self.assertTrue(best > path[0]['loglik'])
+        self.assertAlmostEqual(dlm6.logLikelihood(), best)
+
+        # the smoothed covariances are not kept in the history mode
+        dlm6.historyMode(maxHistory=10)
+        self.assertRaises(NameError, dlm6.fitPrior)
+
     def testGetLatentState(self):
         # for forward filter
         self.dlm5.fitForwardFilter()